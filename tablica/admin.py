@@ -1,18 +1,35 @@
 from django.contrib import admin
 from .models import Project, Task, Comment, Attachment
+from .search import is_available, matching
+
+class FullTextSearchMixin:
+    """Wyszukiwarka listy przez indeks FTS5 zamiast LIKE '%...%' po search_fields."""
+    search_kind = None
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term or not is_available(queryset.db):
+            return super().get_search_results(request, queryset, search_term)
+        return matching(queryset, search_term, self.search_kind), False
 
 class ProjectAdmin(admin.ModelAdmin):
     list_display = ('name', 'owner', 'is_active', 'created_at')
     list_filter = ('is_active', 'created_at')
     search_fields = ('name', 'description')
 
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('title', 'project', 'assigned_to', 'status', 'due_date')
     list_filter = ('status', 'assigned_to')
     search_fields = ('title', 'description')
+    search_kind = 'task'
+
+class CommentAdmin(FullTextSearchMixin, admin.ModelAdmin):
+    list_display = ('task', 'author', 'created_at')
+    list_select_related = ('task', 'author')
+    search_fields = ('content',)
+    search_kind = 'comment'
 
 admin.site.register(Project, ProjectAdmin)
 admin.site.register(Task, TaskAdmin)
-admin.site.register(Comment)
+admin.site.register(Comment, CommentAdmin)
 admin.site.register(Attachment)
 
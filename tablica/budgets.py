@@ -0,0 +1,59 @@
+import logging
+import threading
+from contextlib import ExitStack
+
+from django.db import connections
+
+from .conf import get_setting
+from .sharding import is_sharded, shards, wrap_queries
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        # scatter() liczy z kilku wątków naraz
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self.lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+
+class QueryBudgetMixin:
+    """
+    Liczy zapytania SQL wykonane przez akcję i porównuje je z budżetem
+    zadeklarowanym w `query_budgets` (nazwa akcji -> maksymalna liczba zapytań).
+    Przy shardingu budżet dotyczy jednego shardu; liczone są też zapytania
+    z wątków scatter()/gather() (sharding.wrap_queries).
+    """
+    query_budgets = {}
+
+    def dispatch(self, request, *args, **kwargs):
+        counter = QueryCounter()
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(counter))
+            stack.enter_context(wrap_queries(counter))
+            response = super().dispatch(request, *args, **kwargs)
+        self.check_query_budget(counter.count)
+        return response
+
+    def check_query_budget(self, count):
+        budget = self.query_budgets.get(getattr(self, 'action', None))
+        if budget is not None and is_sharded():
+            budget *= len(shards())
+        if budget is None or count <= budget:
+            return
+        message = '%s.%s executed %d queries (budget %d)' % (
+            type(self).__name__, self.action, count, budget
+        )
+        if get_setting('QUERY_BUDGET_STRICT'):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
@@ -0,0 +1,356 @@
+"""
+Zbiorcze tworzenie, zmiana i usuwanie zadań (/api/tasks/bulk/).
+
+Paczka jest walidowana razem: pola elementów przez TaskItemSerializer (bez
+zapytań), istnienie projektów i użytkowników - jednym zapytaniem na
+relację. Poprawne elementy są zapisywane przez bulk_create / bulk_update
+w jednej transakcji na shard. bulk_* nie wysyłają sygnałów, więc liczniki
+i updated_at projektów (ETag) są aktualizowane tu, zbiorczo. Usuwanie idzie
+przez QuerySet.delete(), więc liczniki poprawiają sygnały post_delete.
+Wynik ma wpis dla każdego elementu, w kolejności z żądania.
+
+update_matching() zmienia wszystkie zadania pasujące do filtra (TaskFilter)
+jednym UPDATE ... WHERE na shard, bez wczytywania zadań.
+"""
+from collections import Counter, defaultdict
+
+from django.contrib.auth.models import User
+from django.db import router, transaction
+from django.db.models import Count
+from django.utils import timezone
+from rest_framework import serializers, status
+
+from .conf import get_setting
+from .counters import OPEN_TASKS, bump_project, is_open, recount
+from .fastpath import FastTaskSerializer
+from .filters import TaskFilter
+from .models import Project, Task
+from .sharding import is_sharded, scatter, shard_for, use_shard
+from .writer import run_write
+
+RELATIONS = {'project': Project, 'assigned_to': User}
+
+
+class TaskItemSerializer(serializers.ModelSerializer):
+    """Pola zadania; relacje jako same id, sprawdzane zbiorczo w check_relations()."""
+    project = serializers.IntegerField()
+    assigned_to = serializers.IntegerField(required=False, allow_null=True)
+
+    class Meta:
+        model = Task
+        fields = ['project', 'title', 'description', 'assigned_to', 'status', 'due_date']
+
+
+class TaskChangesSerializer(TaskItemSerializer):
+    """Pola, które można zmienić filtrem (przenoszenie między projektami - pojedynczo)."""
+
+    class Meta(TaskItemSerializer.Meta):
+        fields = ['status', 'assigned_to', 'due_date']
+
+
+def item_list(data):
+    if not isinstance(data, list):
+        raise serializers.ValidationError({'non_field_errors': ['Oczekiwano listy elementów.']})
+    limit = get_setting('BULK_MAX_ITEMS')
+    if len(data) > limit:
+        raise serializers.ValidationError({'non_field_errors': [f'Najwyżej {limit} elementów w żądaniu.']})
+    return data
+
+
+def item_id(item):
+    value = item.get('id') if isinstance(item, dict) else item
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def missing_object(pk):
+    message = serializers.PrimaryKeyRelatedField.default_error_messages['does_not_exist']
+    return [str(message).format(pk_value=pk)]
+
+
+def check_relations(entries):
+    """
+    Usuwa z `entries` ({index: dane}) elementy z nieistniejącym projektem
+    albo użytkownikiem; zwraca ich błędy. Jedno zapytanie na relację.
+    """
+    errors = {}
+    for name, model in RELATIONS.items():
+        wanted = {data[name] for data in entries.values() if data.get(name) is not None}
+        if not wanted:
+            continue
+        found = set(model.objects.filter(pk__in=wanted).values_list('pk', flat=True))
+        for index, data in list(entries.items()):
+            if data.get(name) is not None and data[name] not in found:
+                errors.setdefault(index, {})[name] = missing_object(data[name])
+                del entries[index]
+    return errors
+
+
+def group_by_shard(items, model, key):
+    """{alias: [(index, element)]}; alias None bez shardingu (decyduje router)."""
+    groups = defaultdict(list)
+    for index, item in items:
+        groups[shard_for(model, key(item))].append((index, item))
+    return groups
+
+
+def serialize_tasks(task_ids, context):
+    serializer = FastTaskSerializer(context=context)
+    rows = serializer.serialize_rows(list(serializer.values(Task.objects.filter(pk__in=task_ids))))
+    return {row['id']: row for row in rows}
+
+
+def failure(code, errors):
+    return {'status': code, 'errors': errors}
+
+
+def bump_projects(using, deltas):
+    for project_id, delta in deltas.items():
+        bump_project(project_id, using, **delta)
+
+
+def create_tasks(data, context=None):
+    """POST: lista zadań jak dla TaskSerializer."""
+    results = {}
+    entries = {}
+    for index, item in enumerate(item_list(data)):
+        serializer = TaskItemSerializer(data=item)
+        if serializer.is_valid():
+            entries[index] = serializer.validated_data
+        else:
+            results[index] = failure(status.HTTP_400_BAD_REQUEST, serializer.errors)
+    groups = group_by_shard(entries.items(), Project, lambda data: data['project'])
+    for alias, group in groups.items():
+        with use_shard(alias):
+            results.update(create_in_shard(dict(group), context))
+    return [results[index] for index in range(len(data))]
+
+
+def create_in_shard(entries, context):
+    results = {
+        index: failure(status.HTTP_400_BAD_REQUEST, errors)
+        for index, errors in check_relations(entries).items()
+    }
+    if not entries:
+        return results
+    tasks = {}
+    for index, data in entries.items():
+        data = dict(data)
+        data['project_id'] = data.pop('project')
+        data['assigned_to_id'] = data.pop('assigned_to', None)
+        tasks[index] = Task(**data)
+    using = router.db_for_write(Task)
+
+    def write():
+        with transaction.atomic(using=using):
+            Task.objects.using(using).bulk_create(tasks.values())
+            deltas = defaultdict(Counter)
+            for task in tasks.values():
+                deltas[task.project_id].update(task_count=1, open_task_count=int(is_open(task.status)))
+            bump_projects(using, deltas)
+
+    run_write(write)
+    data = serialize_tasks([task.pk for task in tasks.values()], context)
+    for index, task in tasks.items():
+        results[index] = {'status': status.HTTP_201_CREATED, 'id': task.pk, 'data': data[task.pk]}
+    return results
+
+
+def update_tasks(data, context=None):
+    """PATCH: lista zmian, każda z `id` zadania (pozostałe pola opcjonalne)."""
+    results = {}
+    entries = {}
+    for index, item in enumerate(item_list(data)):
+        pk = item_id(item) if isinstance(item, dict) else None
+        if pk is None:
+            results[index] = failure(status.HTTP_400_BAD_REQUEST, {'id': ['To pole jest wymagane.']})
+            continue
+        changes = {name: value for name, value in item.items() if name != 'id'}
+        serializer = TaskItemSerializer(data=changes, partial=True)
+        if serializer.is_valid():
+            entries[index] = (pk, serializer.validated_data)
+        else:
+            results[index] = failure(status.HTTP_400_BAD_REQUEST, serializer.errors)
+    groups = group_by_shard(entries.items(), Task, lambda entry: entry[0])
+    for alias, group in groups.items():
+        with use_shard(alias):
+            results.update(update_in_shard(dict(group), context))
+    return [results[index] for index in range(len(data))]
+
+
+def update_in_shard(entries, context):
+    results = {}
+    changes = {index: data for index, (_, data) in entries.items()}
+    for index, errors in check_relations(changes).items():
+        results[index] = failure(status.HTTP_400_BAD_REQUEST, errors)
+        del entries[index]
+    if not entries:
+        return results
+    using = router.db_for_write(Task)
+
+    def write():
+        # odczyt, zmiana i liczniki w jednej transakcji (BEGIN IMMEDIATE) -
+        # równoległe zapisy tych zadań nie zostaną nadpisane ani policzone dwa razy
+        with transaction.atomic(using=using):
+            tasks = Task.objects.using(using).in_bulk({pk for pk, _ in entries.values()})
+            missing = {index: pk for index, (pk, _) in entries.items() if pk not in tasks}
+            now = timezone.now()
+            fields = {'updated_at'}
+            updated = {}
+            for index, (pk, data) in entries.items():
+                if index in missing:
+                    continue
+                # kilka zmian tego samego zadania - w kolejności z żądania
+                task = tasks[pk]
+                for name, value in data.items():
+                    attname = Task._meta.get_field(name).attname
+                    setattr(task, attname, value)
+                    fields.add(attname)
+                task.updated_at = now
+                updated[index] = task
+            distinct = list({task.pk: task for task in updated.values()}.values())
+            if not distinct:
+                return missing, updated, distinct
+
+            moved, deltas = set(), defaultdict(Counter)
+            for task in distinct:
+                previous_project = task.loaded_value('project_id')
+                if previous_project != task.project_id:
+                    moved.update([previous_project, task.project_id])
+                else:
+                    delta = int(is_open(task.status)) - int(is_open(task.loaded_value('status')))
+                    deltas[task.project_id].update(open_task_count=delta)
+            Task.objects.using(using).bulk_update(distinct, sorted(fields))
+            if moved:
+                # przeniesione zadania zabierają komentarze i załączniki
+                recount(moved, using)
+            # przeliczonym projektom tylko podbijamy updated_at
+            bump_projects(using, {
+                project_id: {} if project_id in moved else deltas[project_id]
+                for project_id in moved | set(deltas)
+            })
+        return missing, updated, distinct
+
+    missing, updated, distinct = run_write(write)
+    for index, pk in missing.items():
+        results[index] = failure(status.HTTP_404_NOT_FOUND, {'id': missing_object(pk)})
+    for task in distinct:
+        task.remember_tracked_fields()
+    data = serialize_tasks([task.pk for task in distinct], context)
+    for index, task in updated.items():
+        results[index] = {'status': status.HTTP_200_OK, 'id': task.pk, 'data': data[task.pk]}
+    return results
+
+
+def delete_tasks(data, context=None):
+    """DELETE: lista id zadań (albo obiektów z `id`)."""
+    results = {}
+    ids = {}
+    for index, item in enumerate(item_list(data)):
+        pk = item_id(item)
+        if pk is None:
+            results[index] = failure(status.HTTP_400_BAD_REQUEST, {'id': ['Oczekiwano id zadania.']})
+        else:
+            ids[index] = pk
+    groups = group_by_shard(ids.items(), Task, lambda pk: pk)
+    for alias, group in groups.items():
+        with use_shard(alias):
+            results.update(delete_in_shard(dict(group)))
+    return [results[index] for index in range(len(data))]
+
+
+def delete_in_shard(ids):
+    using = router.db_for_write(Task)
+
+    def write():
+        # odczyt i usunięcie w jednej transakcji - wynik (204/404) opisuje to,
+        # co faktycznie usunęliśmy; liczniki poprawiają sygnały post_delete
+        with transaction.atomic(using=using):
+            tasks = Task.objects.using(using).filter(pk__in=set(ids.values()))
+            found = set(tasks.values_list('pk', flat=True))
+            if found:
+                tasks.filter(pk__in=found).delete()
+            return found
+
+    found = run_write(write)
+    results = {}
+    for index, pk in ids.items():
+        if pk in found:
+            results[index] = {'status': status.HTTP_204_NO_CONTENT, 'id': pk}
+        else:
+            results[index] = failure(status.HTTP_404_NOT_FOUND, {'id': missing_object(pk)})
+    return results
+
+
+def response_status(results, success=status.HTTP_200_OK):
+    """Kod całej odpowiedzi: wszystko się udało, nic się nie udało albo 207."""
+    failed = sum(1 for result in results if result['status'] >= 400)
+    if not failed:
+        return success
+    if failed == len(results):
+        return status.HTTP_400_BAD_REQUEST
+    return status.HTTP_207_MULTI_STATUS
+
+
+def task_filter(filters):
+    """TaskFilter z danych `filters`; pusty albo błędny filtr to ValidationError."""
+    if not isinstance(filters, dict):
+        raise serializers.ValidationError({'filter': ['Oczekiwano obiektu z warunkami.']})
+    filterset = TaskFilter(filters, queryset=Task.objects.all())
+    if not filterset.is_valid():
+        raise serializers.ValidationError({'filter': {name: list(errors) for name, errors in filterset.errors.items()}})
+    if filterset.is_empty():
+        # bez warunku UPDATE objąłby wszystkie zadania
+        raise serializers.ValidationError({'filter': ['Podaj co najmniej jeden warunek.']})
+    return filterset
+
+
+def update_matching(filters, changes):
+    """
+    Ustawia pola `changes` (status, assigned_to, due_date) we wszystkich
+    zadaniach pasujących do `filters`; zwraca liczbę zmienionych zadań.
+    Na shard: jedno zapytanie grupujące po projektach (liczniki), jeden
+    UPDATE zadań i jeden UPDATE na dotknięty projekt - w jednej transakcji.
+    """
+    filterset = task_filter(filters)
+    serializer = TaskChangesSerializer(data=changes if isinstance(changes, dict) else None, partial=True)
+    if not serializer.is_valid():
+        raise serializers.ValidationError({'set': serializer.errors})
+    values = dict(serializer.validated_data)
+    if not values:
+        raise serializers.ValidationError({'set': ['Podaj co najmniej jedno pole do zmiany.']})
+    if values.get('assigned_to') is not None and not User.objects.filter(pk=values['assigned_to']).exists():
+        raise serializers.ValidationError({'set': {'assigned_to': missing_object(values['assigned_to'])}})
+    if 'assigned_to' in values:
+        values['assigned_to_id'] = values.pop('assigned_to')
+    project = filterset.form.cleaned_data.get('project')
+    aliases = [shard_for(Project, project)] if project is not None and is_sharded() else None
+    matching = filterset.qs
+
+    def update_shard():
+        using = router.db_for_write(Task)
+        queryset = matching.using(using)
+
+        def write():
+            with transaction.atomic(using=using):
+                projects = (
+                    queryset.order_by().values_list('project_id')
+                    .annotate(total=Count('pk'), open_count=Count('pk', filter=OPEN_TASKS))
+                )
+                deltas = {}
+                for project_id, total, open_count in projects:
+                    delta = {}
+                    if 'status' in values:
+                        delta['open_task_count'] = (total if is_open(values['status']) else 0) - open_count
+                    deltas[project_id] = delta
+                updated = queryset.update(updated_at=timezone.now(), **values)
+                bump_projects(using, deltas)
+            return updated
+
+        return run_write(write)
+
+    return sum(scatter(update_shard, aliases))
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+from .conf import get_setting
+
+# cache osobny w każdym procesie - nie nadaje się do stanu dzielonego przez workery
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register()
+def shared_cache_check(app_configs, **kwargs):
+    """
+    Wersja użytkowników z ETagów (tablica/conditional.py) i znacznik
+    "niedawno zapisywał" (tablica/dbrouters.py) muszą być wspólne dla procesów.
+    """
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    errors = [Warning(
+        f"CACHES['default'] ({backend.rsplit('.', 1)[-1]}) is local to one process; "
+        'the users version in ETags is not shared between server workers, '
+        'so a renamed user can still be served from a cached (304) response.',
+        hint='Use a cache shared by all workers, e.g. FileBasedCache or RedisCache.',
+        id='tablica.W001',
+    )]
+    if get_setting('READ_REPLICAS'):
+        errors.append(Warning(
+            f"CACHES['default'] ({backend.rsplit('.', 1)[-1]}) is local to one process; "
+            'the read-your-writes marker set after a write is not seen by other workers, '
+            'so the next read may go to a replica that does not have the write yet.',
+            hint='Use a cache shared by all workers, e.g. FileBasedCache or RedisCache.',
+            id='tablica.W002',
+        ))
+    return errors
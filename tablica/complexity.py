@@ -0,0 +1,148 @@
+"""
+Statyczny koszt i głębokość zapytań GraphQL, liczone przy walidacji,
+czyli przed wykonaniem. Koszt pola to jego waga (TABLICA['GRAPHQL_FIELD_COSTS'],
+klucz "Typ.pole"; domyślnie 1 dla obiektów i 0 dla skalarów) plus koszt
+pól zagnieżdżonych - dla list pomnożony przez spodziewaną długość:
+argument first/last/limit, a bez niego TABLICA['GRAPHQL_LIST_SIZE'].
+Dla połączeń Relay mnożnikiem edges jest first/last pola połączenia,
+domyślnie TABLICA['PAGE_SIZE'] - tyle, ile zwróci resolver.
+Relacje są ładowane paczkami (tablica/loaders.py), więc waga listy jest
+liczona raz, a mnożnik dotyczy tylko tego, co pod nią.
+Pola introspekcji (__schema, __typename...) nie są liczone.
+"""
+from graphql import (
+    FieldNode, FragmentSpreadNode, GraphQLError, GraphQLInt, InlineFragmentNode,
+    ValidationRule, get_named_type, get_nullable_type, is_composite_type, is_leaf_type, is_list_type,
+)
+from graphql.utilities import value_from_ast
+
+from .conf import get_setting
+
+PAGINATION_ARGUMENTS = ('first', 'last', 'limit')
+
+
+def is_connection(graphql_type):
+    """Typ połączenia Relay (tablica/connections.py)."""
+    fields = getattr(graphql_type, 'fields', {})
+    return graphql_type.name.endswith('Connection') and 'edges' in fields and 'pageInfo' in fields
+
+
+class QueryCost:
+    """
+    Analiza jednego żądania: rule() daje regułę walidacji dla graphql.validate,
+    extensions() - koszt wybranej operacji do odpowiedzi.
+    """
+
+    def __init__(self, variables=None, operation_name=None):
+        self.variables = variables if isinstance(variables, dict) else {}
+        self.operation_name = operation_name
+        self.operations = {}
+        self.page_sizes = []
+
+    def rule(self):
+        analysis = self
+
+        class QueryCostRule(ValidationRule):
+            def enter_operation_definition(self, node, *args):
+                analysis.check(self.context, node)
+
+        return QueryCostRule
+
+    def check(self, context, operation):
+        root = context.schema.get_root_type(operation.operation)
+        if root is None:
+            return
+        cost, depth = self.selection_cost(context, root, operation.selection_set, 1, frozenset())
+        name = operation.name.value if operation.name else None
+        self.operations[name] = (cost, depth)
+        max_depth = get_setting('GRAPHQL_MAX_DEPTH')
+        max_cost = get_setting('GRAPHQL_MAX_COST')
+        if max_depth is not None and depth > max_depth:
+            context.report_error(GraphQLError(
+                f'Zapytanie ma głębokość {depth}, dozwolone {max_depth}.', operation,
+                extensions={'code': 'QUERY_TOO_DEEP', 'depth': depth, 'maxDepth': max_depth},
+            ))
+        if max_cost is not None and cost > max_cost:
+            context.report_error(GraphQLError(
+                f'Szacowany koszt zapytania {cost} przekracza limit {max_cost}.', operation,
+                extensions={'code': 'QUERY_TOO_COSTLY', 'cost': cost, 'maxCost': max_cost},
+            ))
+
+    def selection_cost(self, context, parent_type, selection_set, depth, fragments):
+        """(koszt, największa głębokość) pól `selection_set` leżących na głębokości `depth`."""
+        total, deepest = 0, depth - 1
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                cost, reached = self.field_cost(context, parent_type, selection, depth, fragments)
+            elif isinstance(selection, InlineFragmentNode):
+                condition = selection.type_condition
+                fragment_type = context.schema.get_type(condition.name.value) if condition else parent_type
+                if not is_composite_type(fragment_type):
+                    continue
+                cost, reached = self.selection_cost(context, fragment_type, selection.selection_set, depth, fragments)
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                fragment = context.get_fragment(name)
+                # cykle zgłasza reguła NoFragmentCycles
+                if fragment is None or name in fragments:
+                    continue
+                fragment_type = context.schema.get_type(fragment.type_condition.name.value)
+                if not is_composite_type(fragment_type):
+                    continue
+                cost, reached = self.selection_cost(
+                    context, fragment_type, fragment.selection_set, depth, fragments | {name}
+                )
+            else:
+                continue
+            total += cost
+            deepest = max(deepest, reached)
+        return total, deepest
+
+    def field_cost(self, context, parent_type, node, depth, fragments):
+        name = node.name.value
+        field = getattr(parent_type, 'fields', {}).get(name)
+        if name.startswith('__') or field is None:
+            return 0, depth - 1
+        named_type = get_named_type(field.type)
+        weight = get_setting('GRAPHQL_FIELD_COSTS').get(
+            f'{parent_type.name}.{name}', 0 if is_leaf_type(named_type) else 1
+        )
+        nested, reached = 0, depth
+        connection = is_connection(named_type)
+        if connection:
+            # edges połączenia mają tyle elementów, ile first/last pola
+            self.page_sizes.append(self.list_size(node, field, get_setting('PAGE_SIZE')))
+        try:
+            if node.selection_set is not None and is_composite_type(named_type):
+                nested, reached = self.selection_cost(context, named_type, node.selection_set, depth + 1, fragments)
+        finally:
+            if connection:
+                self.page_sizes.pop()
+        if is_list_type(get_nullable_type(field.type)):
+            nested *= self.page_sizes[-1] if is_connection(parent_type) else self.list_size(node, field)
+        return weight + nested, reached
+
+    def list_size(self, node, field, default=None):
+        for argument in node.arguments:
+            if argument.name.value in PAGINATION_ARGUMENTS:
+                value = value_from_ast(argument.value, GraphQLInt, self.variables)
+                if isinstance(value, int):
+                    return max(value, 0)
+        for name in PAGINATION_ARGUMENTS:
+            value = field.args[name].default_value if name in field.args else None
+            if isinstance(value, int):
+                return max(value, 0)
+        return default if default is not None else get_setting('GRAPHQL_LIST_SIZE')
+
+    def extensions(self):
+        """{'cost': ...} dla wykonywanej operacji albo None (np. błąd składni)."""
+        if self.operation_name in self.operations:
+            cost, depth = self.operations[self.operation_name]
+        elif self.operation_name is None and len(self.operations) == 1:
+            cost, depth = next(iter(self.operations.values()))
+        else:
+            return None
+        return {'cost': {
+            'requested': cost, 'maximum': get_setting('GRAPHQL_MAX_COST'),
+            'depth': depth, 'maxDepth': get_setting('GRAPHQL_MAX_DEPTH'),
+        }}
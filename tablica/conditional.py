@@ -0,0 +1,100 @@
+import hashlib
+import time
+from calendar import timegm
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+USERS_VERSION_KEY = 'tablica:conditional:users'
+
+
+def users_version():
+    """
+    Wersja danych użytkowników osadzanych w odpowiedziach (owner, members,
+    assigned_to, author) - User nie ma updated_at. Podbijana w signals.py;
+    po wypadnięciu z cache dostaje nową wartość, więc ETag najwyżej się zmieni.
+    Cache musi być wspólny dla procesów serwera (CACHES, tablica/checks.py).
+    """
+    return cache.get_or_set(USERS_VERSION_KEY, time.time_ns, None)
+
+
+def bump_users_version():
+    cache.set(USERS_VERSION_KEY, time.time_ns(), None)
+
+
+def object_state(queryset, pk):
+    try:
+        last_modified = queryset.filter(pk=pk).values_list('updated_at', flat=True).first()
+    except (TypeError, ValueError, ValidationError):
+        return None
+    if last_modified is None:
+        return None
+    return last_modified, 1
+
+
+def make_etag(request, last_modified, version):
+    parts = [
+        request.get_full_path(),
+        request.META.get('HTTP_ACCEPT', ''),
+        last_modified.isoformat() if last_modified else '',
+        str(version),
+    ]
+    return '"%s"' % hashlib.sha1('|'.join(parts).encode()).hexdigest()
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified dla list i szczegółów. Walidator liczony jest jednym
+    lekkim zapytaniem bez serializacji odpowiedzi: dla szczegółu - updated_at
+    obiektu, dla listy - klucze i updated_at wierszy serwowanej strony (LIMIT
+    po indeksie, bez agregatu po całej tabeli). Do tego wersja użytkowników
+    z cache. Jeśli klient ma aktualną wersję, dostaje 304 Not Modified.
+
+    Listy mają tylko ETag: data ostatniej zmiany wierszy strony nie zmienia
+    się po usunięciu wiersza. W Last-Modified szczegółu jest też czas
+    ostatniej zmiany użytkowników.
+    """
+
+    def get_state_queryset(self):
+        return self.queryset.model._default_manager.all()
+
+    def list_state(self, queryset):
+        if self.paginator is None:
+            return None
+        return None, self.paginator.page_state(queryset, self.request)
+
+    def conditional_get(self, request, state, render):
+        if state is None or request.method not in ('GET', 'HEAD'):
+            return render()
+        last_modified, version = state
+        users = users_version()
+        etag = make_etag(request, last_modified, '%s|%s' % (version, users))
+        timestamp = None
+        if last_modified is not None:
+            timestamp = max(timegm(last_modified.utctimetuple()), users // 10 ** 9)
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is not None:
+            return response
+        response = render()
+        if response.status_code == 200:
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_get(
+            request,
+            self.list_state(self.get_state_queryset()),
+            lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        return self.conditional_get(
+            request,
+            object_state(self.get_state_queryset(), lookup),
+            lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs),
+        )
@@ -0,0 +1,44 @@
+import os
+
+from django.conf import settings
+
+DEFAULTS = {
+    'QUERY_BUDGET_STRICT': False,
+    'PAGE_SIZE': 50,
+    # zapisy przez jeden wątek z kolejką (tablica/writer.py)
+    'SERIALIZED_WRITES': False,
+    'WRITE_QUEUE_SIZE': 1000,
+    'WRITE_BATCH_SIZE': 100,
+    # aliasy z DATABASES do odczytów (tablica/dbrouters.py)
+    'READ_REPLICAS': [],
+    'REPLICA_STICKY_SECONDS': 10,
+    # aliasy z DATABASES z projektami, pierwszy to "default" (tablica/sharding.py)
+    'SHARDS': ['default'],
+    'SHARD_WORKERS': 8,
+    # budżety czasu zapytań SQL w sekundach, None = bez limitu (tablica/timeouts.py)
+    'SQL_TIME_BUDGET': 5.0,
+    'SQL_TIME_BUDGETS': {},
+    'GRAPHQL_TIME_BUDGETS': {},
+    # tekst załączników do wyszukiwarki (tablica/extractors.py); 0 wątków = od razu po zapisie
+    'ATTACHMENT_EXTRACT_WORKERS': 2,
+    'ATTACHMENT_EXTRACT_BYTES': 5 * 1024 * 1024,
+    'ATTACHMENT_EXTRACTORS': {},
+    # limit elementów w jednym żądaniu /api/tasks/bulk/ (tablica/bulk.py)
+    'BULK_MAX_ITEMS': 500,
+    # limity zapytań GraphQL sprawdzane przed wykonaniem, None = bez limitu (tablica/complexity.py)
+    'GRAPHQL_MAX_DEPTH': 8,
+    'GRAPHQL_MAX_COST': 5000,
+    'GRAPHQL_LIST_SIZE': 10,
+    'GRAPHQL_FIELD_COSTS': {},
+    # zapytania utrwalone i cache dokumentów GraphQL (tablica/persisted.py); timeout None = bez wygasania
+    'GRAPHQL_PERSISTED_QUERY_TIMEOUT': None,
+    'GRAPHQL_DOCUMENT_CACHE_SIZE': 500,
+    'GRAPHQL_GET_MAX_AGE': 60,
+    # asynchroniczny widok GraphQL z równoległymi polami (tablica/graphql_view.py); włącza go trelloboard/asgi.py
+    'GRAPHQL_ASYNC': os.environ.get('TABLICA_GRAPHQL_ASYNC') == '1',
+    'GRAPHQL_WORKERS': 8,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'TABLICA', {}).get(name, DEFAULTS[name])
@@ -0,0 +1,113 @@
+"""
+Połączenia Relay (first/after/last/before) dla list z Query. Kursor krawędzi
+to klucz porządku jej wiersza (jak w tablica/pagination.py), więc strona to
+jedno zapytanie z warunkiem keyset i LIMIT na shard - bez OFFSET i bez
+COUNT(*). Porządek zawsze kończy się na id, żeby klucz był jednoznaczny;
+przed polami, które mogą być NULL (np. due_date), stoi flaga "IS NULL",
+więc wiersze bez wartości są na końcu każdego porządku (nulls_last).
+
+Filtry przychodzą jako argument `filter` i trafiają do FilterSetu
+(tablica/filters.py), ten sam dla REST i GraphQL.
+"""
+import graphene
+from django.core.exceptions import ValidationError
+from graphene.relay import PageInfo
+from graphql import GraphQLError
+
+from .conf import get_setting
+from .loaders import batched
+from .optimizer import node_selections, optimize
+from .pagination import (
+    KeysetPagination, decode_cursor, encode_cursor, invert_ordering, item_position,
+    keyset_filter, nulls_last, paginate_shards, parse_position,
+)
+
+
+def connection_field(connection, filter_input=None, order=None, **arguments):
+    """Pole z połączeniem `connection` i argumentami stronicowania."""
+    if filter_input is not None:
+        arguments['filter'] = filter_input()
+    if order is not None:
+        arguments['order_by'] = order()
+    return graphene.Field(
+        connection, first=graphene.Int(), after=graphene.String(),
+        last=graphene.Int(), before=graphene.String(), **arguments
+    )
+
+
+def ordering_value(order_by, default):
+    """Porządek z argumentu enum (graphene podaje element enuma albo wartość)."""
+    if order_by is None:
+        return list(default)
+    return list(getattr(order_by, 'value', order_by))
+
+
+def filtered(filterset_class, queryset, data):
+    """`queryset` zawężony przez `filterset_class` z argumentu `filter`."""
+    if not data:
+        return queryset
+    filterset = filterset_class(dict(data), queryset=queryset)
+    if not filterset.is_valid():
+        raise GraphQLError('; '.join(
+            f"{name}: {' '.join(errors)}" for name, errors in filterset.errors.items()
+        ))
+    return filterset.qs
+
+
+def page_size(value, name):
+    if value is None:
+        return None
+    if value < 0:
+        raise GraphQLError(f'Argument {name} nie może być ujemny.')
+    return min(value, KeysetPagination.max_page_size)
+
+
+def cursor_position(model, ordering, cursor):
+    try:
+        values, _ = decode_cursor(cursor)
+        return parse_position(model, ordering, values)
+    except (ValueError, ValidationError):
+        raise GraphQLError('Nieprawidłowy kursor.')
+
+
+def resolve_connection(connection, queryset, info, ordering, first=None, after=None, last=None, before=None):
+    """
+    Strona `queryset` w porządku `ordering` jako instancja `connection`.
+    Z `last` strona jest brana od końca (przed `before`), inaczej od początku
+    (za `after`); drugi kursor, jeśli podany, dodatkowo ogranicza zakres.
+    """
+    first, last = page_size(first, 'first'), page_size(last, 'last')
+    if first is not None and last is not None:
+        raise GraphQLError('Podaj first albo last, nie oba naraz.')
+    model = queryset.model
+    # pola modelu do only() - bez flag NULL z nulls_last()
+    queryset = optimize(queryset, info, ordering, node_selections(info))
+    queryset, ordering = nulls_last(queryset, ordering)
+    after = cursor_position(model, ordering, after) if after else None
+    before = cursor_position(model, ordering, before) if before else None
+    reverse = last is not None
+    if reverse:
+        position, size = before, last
+        if after is not None:
+            queryset = queryset.filter(keyset_filter(ordering, after))
+    else:
+        position, size = after, first if first is not None else get_setting('PAGE_SIZE')
+        if before is not None:
+            queryset = queryset.filter(keyset_filter(invert_ordering(ordering), before))
+
+    rows, has_more = paginate_shards(queryset, ordering, size, position, reverse) if size else ([], False)
+    rows = batched(rows)
+    if reverse:
+        has_next, has_previous = before is not None, has_more
+    else:
+        has_next, has_previous = has_more, after is not None
+    edges = [
+        connection.Edge(node=row, cursor=encode_cursor(item_position(row, ordering)))
+        for row in rows
+    ]
+    return connection(edges=edges, page_info=PageInfo(
+        has_next_page=has_next,
+        has_previous_page=has_previous,
+        start_cursor=edges[0].cursor if edges else None,
+        end_cursor=edges[-1].cursor if edges else None,
+    ))
@@ -0,0 +1,70 @@
+from django.apps import apps
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import TaskStatus
+
+OPEN_TASKS = ~Q(status=TaskStatus.DONE)
+
+
+def count_of(queryset, outer_field):
+    """Skorelowane podzapytanie: liczba wierszy `queryset` dla bieżącego wiersza zewnętrznego."""
+    counted = (
+        queryset.filter(**{outer_field: OuterRef('pk')})
+        .order_by()
+        .values(outer_field)
+        .annotate(n=Count('pk'))
+        .values('n')[:1]
+    )
+    return Coalesce(Subquery(counted), Value(0))
+
+
+def recount(project_ids=None, using='default'):
+    """Przelicza liczniki od zera (zbiorczymi UPDATE z podzapytaniami)."""
+    Project = apps.get_model('tablica', 'Project')
+    Task = apps.get_model('tablica', 'Task')
+    Comment = apps.get_model('tablica', 'Comment')
+    Attachment = apps.get_model('tablica', 'Attachment')
+
+    tasks = Task._base_manager.using(using).all()
+    projects = Project._base_manager.using(using).all()
+    if project_ids is not None:
+        tasks = tasks.filter(project_id__in=project_ids)
+        projects = projects.filter(pk__in=project_ids)
+
+    tasks.update(
+        comment_count=count_of(Comment._base_manager.all(), 'task'),
+        attachment_count=count_of(Attachment._base_manager.all(), 'task'),
+    )
+    return projects.update(
+        task_count=count_of(Task._base_manager.all(), 'project'),
+        open_task_count=count_of(Task._base_manager.filter(OPEN_TASKS), 'project'),
+        comment_count=count_of(Comment._base_manager.all(), 'task__project'),
+        attachment_count=count_of(Attachment._base_manager.all(), 'task__project'),
+    )
+
+
+def increments(**deltas):
+    return {name: F(name) + delta for name, delta in deltas.items() if delta}
+
+
+def bump_project(project_id, using, **deltas):
+    """Zmienia liczniki projektu i podbija jego updated_at (ETag) jednym UPDATE."""
+    Project = apps.get_model('tablica', 'Project')
+    Project.objects.using(using).filter(pk=project_id).update(
+        updated_at=timezone.now(), **increments(**deltas)
+    )
+
+
+def bump_task(task_id, using, **deltas):
+    """Zmienia liczniki zadania i jego projektu (te same nazwy pól)."""
+    Project = apps.get_model('tablica', 'Project')
+    Task = apps.get_model('tablica', 'Task')
+    now = timezone.now()
+    Task.objects.using(using).filter(pk=task_id).update(updated_at=now, **increments(**deltas))
+    Project.objects.using(using).filter(tasks=task_id).update(updated_at=now, **increments(**deltas))
+
+
+def is_open(status):
+    return status != TaskStatus.DONE
@@ -0,0 +1,121 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .conf import get_setting
+
+# alias repliki dla bieżącego żądania; None = primary
+read_alias = ContextVar('tablica_read_alias', default=None)
+
+
+def replicas():
+    return list(get_setting('READ_REPLICAS'))
+
+
+@contextmanager
+def read_from_replica():
+    """Odczyty w bloku idą do losowej repliki (jeśli jakaś jest skonfigurowana)."""
+    aliases = replicas()
+    token = read_alias.set(random.choice(aliases) if aliases else None)
+    try:
+        yield
+    finally:
+        read_alias.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Odczyty do repliki wybranej przez ReplicaMiddleware / widok GraphQL,
+    zapisy zawsze do primary. W otwartej transakcji na primary czytamy
+    z primary - inaczej transakcja nie widziałaby własnych zapisów
+    i nie dawałaby spójnego odczytu (np. eksport).
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = read_alias.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        # bez tego obiekt odczytany z repliki zapisałby się do repliki
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # repliki są kopiami primary (manage.py sync_replica), nie migrujemy ich
+        if db in replicas():
+            return False
+        return None
+
+
+def request_user_id(request):
+    """
+    Id użytkownika bez zapytań do bazy: z sesji albo z poświadczeń JWT
+    (DRF uwierzytelnia dopiero w widoku, po middleware).
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.pk
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else None
+    if raw_token is None:
+        return None
+    try:
+        return authentication.get_validated_token(raw_token).get(jwt_settings.USER_ID_CLAIM)
+    except InvalidToken:
+        return None
+
+
+def sticky_key(user_id):
+    return 'tablica:primary-until:%s' % user_id
+
+
+def is_sticky(request):
+    user_id = request_user_id(request)
+    return user_id is not None and cache.get(sticky_key(user_id)) is not None
+
+
+def mark_sticky(request):
+    user_id = request_user_id(request)
+    if user_id is not None:
+        cache.set(sticky_key(user_id), True, get_setting('REPLICA_STICKY_SECONDS'))
+
+
+class ReplicaMiddleware:
+    """
+    GET/HEAD/OPTIONS czytają z repliki, chyba że użytkownik niedawno
+    zapisywał (read-your-writes). Po żądaniu zapisującym użytkownik przez
+    TABLICA['REPLICA_STICKY_SECONDS'] czyta z primary. Znacznik jest
+    w cache, więc cache musi być wspólny dla procesów serwera (CACHES,
+    tablica/checks.py). Widok może sam ustawić `request.database_write`
+    (GraphQL: query vs mutation).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not replicas():
+            return self.get_response(request)
+        if request.method in SAFE_METHODS and not is_sticky(request):
+            with read_from_replica():
+                response = self.get_response(request)
+        else:
+            response = self.get_response(request)
+        if getattr(request, 'database_write', request.method not in SAFE_METHODS):
+            mark_sticky(request)
+        return response
@@ -0,0 +1,107 @@
+import csv
+import json
+from contextlib import nullcontext
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, router, transaction
+
+from .models import Project, Task, Comment, Attachment
+
+CHUNK_SIZE = 2000
+FLUSH_BYTES = 64 * 1024
+
+CSV_COLUMNS = [
+    'type', 'id', 'project', 'task', 'name', 'title', 'description', 'status',
+    'owner', 'members', 'assigned_to', 'author', 'content', 'file', 'due_date',
+    'is_active', 'created_at',
+]
+
+
+def iter_records(project_id, chunk_size=CHUNK_SIZE):
+    """
+    Rekordy eksportu tablicy: projekt, potem jego zadania, komentarze
+    i metadane załączników. Wszystko czytane w jednej transakcji i po
+    kawałkach (.iterator()), więc pamięć nie zależy od wielkości tablicy.
+    Transakcja tylko czyta, więc na backendzie z BEGIN IMMEDIATE otwieramy
+    ją jako DEFERRED - eksport nie blokuje wtedy zapisów.
+    """
+    using = router.db_for_read(Project)
+    deferred = getattr(connections[using], 'deferred_transactions', nullcontext)
+    with deferred(), transaction.atomic(using=using):
+        project = Project.objects.filter(pk=project_id).values(
+            'id', 'name', 'description', 'owner__username', 'is_active', 'created_at'
+        ).get()
+        project['owner'] = project.pop('owner__username')
+        project['members'] = list(
+            Project.members.through.objects.filter(project_id=project_id)
+            .order_by('user_id').values_list('user__username', flat=True)
+        )
+        yield {'type': 'project', **project}
+
+        tasks = Task.objects.filter(project_id=project_id).order_by('pk').values(
+            'id', 'title', 'description', 'status', 'assigned_to__username', 'due_date', 'created_at'
+        )
+        for row in tasks.iterator(chunk_size=chunk_size):
+            row['assigned_to'] = row.pop('assigned_to__username')
+            yield {'type': 'task', 'project': project_id, **row}
+
+        comments = Comment.objects.filter(task__project_id=project_id).order_by('pk').values(
+            'id', 'task_id', 'author__username', 'content', 'created_at'
+        )
+        for row in comments.iterator(chunk_size=chunk_size):
+            row['task'] = row.pop('task_id')
+            row['author'] = row.pop('author__username')
+            yield {'type': 'comment', **row}
+
+        attachments = Attachment.objects.filter(task__project_id=project_id).order_by('pk').values(
+            'id', 'task_id', 'file', 'uploaded_at'
+        )
+        for row in attachments.iterator(chunk_size=chunk_size):
+            row['task'] = row.pop('task_id')
+            row['created_at'] = row.pop('uploaded_at')
+            yield {'type': 'attachment', **row}
+
+
+def buffered(lines, flush_bytes=FLUSH_BYTES):
+    """Skleja krótkie linie w większe kawałki; pierwszą linię oddaje od razu."""
+    buffer, size, first = [], 0, True
+    for line in lines:
+        if first:
+            yield line
+            first = False
+            continue
+        buffer.append(line)
+        size += len(line)
+        if size >= flush_bytes:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def iter_ndjson(project_id, chunk_size=CHUNK_SIZE):
+    encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    return buffered(encoder.encode(record) + '\n' for record in iter_records(project_id, chunk_size))
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def iter_csv(project_id, chunk_size=CHUNK_SIZE):
+    writer = csv.DictWriter(Echo(), fieldnames=CSV_COLUMNS, extrasaction='ignore')
+
+    def lines():
+        yield writer.writeheader()
+        for record in iter_records(project_id, chunk_size):
+            if 'members' in record:
+                record['members'] = json.dumps(record['members'], ensure_ascii=False)
+            yield writer.writerow(record)
+    return buffered(lines())
+
+
+EXPORT_FORMATS = {
+    'ndjson': (iter_ndjson, 'application/x-ndjson'),
+    'csv': (iter_csv, 'text/csv; charset=utf-8'),
+}
@@ -0,0 +1,222 @@
+"""
+Wyciąganie tekstu z załączników do wyszukiwarki. Po zapisie załącznika
+(on_commit) plik trafia do puli wątków; tekst ląduje w
+Attachment.content_text, a trigger przenosi go do indeksu FTS5
+(tablica/search.py). Przy wyszukiwaniu pliki nie są już czytane.
+
+Ekstraktory są wybierane po rozszerzeniu: wbudowane w EXTRACTORS,
+dodatkowe z TABLICA['ATTACHMENT_EXTRACTORS'] ({'.pdf': 'modul.funkcja'}).
+Ekstraktor dostaje bajty pliku i zwraca tekst.
+"""
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .conf import get_setting
+from .models import Attachment
+from .sharding import use_shard
+from .writer import run_write
+
+# kodowania próbowane po kolei; latin-1 przyjmie każde bajty
+TEXT_ENCODINGS = ('utf-8-sig', 'cp1250', 'latin-1')
+
+
+def decode(data):
+    for encoding in TEXT_ENCODINGS:
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+
+
+def extract_plain(data):
+    return decode(data)
+
+
+RTF_TOKEN = re.compile(r"\\([a-z]{1,32})(-?\d{1,10})? ?|\\'([0-9a-f]{2})|\\([^a-z])|([{}])|[\r\n]+|([^\\{}\r\n]+)", re.I)
+# grupy, których treść nie jest tekstem dokumentu
+RTF_SKIP = {'fonttbl', 'colortbl', 'stylesheet', 'info', 'pict', 'object', 'header', 'footer', 'generator'}
+RTF_BREAKS = {'par': '\n', 'line': '\n', 'tab': '\t', 'cell': '\t', 'row': '\n'}
+
+
+def extract_rtf(data):
+    """Tekst z RTF: pomija grupy sterujące, dekoduje \\'xx (strona kodowa) i \\uN."""
+    source = data.decode('latin-1')
+    codepage = 'cp1252'
+    match = re.search(r'\\ansicpg(\d+)', source)
+    if match:
+        codepage = 'cp' + match.group(1)
+    charsets = {'238': 'cp1250', '204': 'cp1251', '161': 'cp1253', '0': 'cp1252'}
+    fonts = dict(re.findall(r'\\f(\d+)\\f[a-z]+\\fcharset(\d+)', source))
+    encoding = codepage
+    stack, skip, unicode_skip, out = [], False, 0, []
+    pending = bytearray()
+
+    def flush():
+        if pending:
+            try:
+                out.append(pending.decode(encoding))
+            except (UnicodeDecodeError, LookupError):
+                out.append(pending.decode('latin-1'))
+            pending.clear()
+
+    for word, arg, hex_byte, symbol, brace, text in RTF_TOKEN.findall(source):
+        if hex_byte:
+            if unicode_skip:
+                unicode_skip -= 1
+            elif not skip:
+                pending.append(int(hex_byte, 16))
+            continue
+        flush()
+        if brace == '{':
+            stack.append((skip, encoding))
+        elif brace == '}':
+            if stack:
+                skip, encoding = stack.pop()
+        elif word:
+            if word in RTF_SKIP:
+                skip = True
+            elif word == 'f' and arg in fonts:
+                encoding = charsets.get(fonts[arg], codepage)
+            elif word == 'u' and arg and not skip:
+                out.append(chr(int(arg) % 65536))
+                unicode_skip = 1
+            elif word in RTF_BREAKS and not skip:
+                out.append(RTF_BREAKS[word])
+        elif symbol:
+            if symbol == '*':
+                skip = True
+            elif symbol in '\\{}' and not skip:
+                out.append(symbol)
+        elif text and not skip:
+            if unicode_skip:
+                text, unicode_skip = text[unicode_skip:], 0
+            out.append(text)
+    flush()
+    return re.sub(r'[ \t]*\n[ \t]*', '\n', ''.join(out)).strip()
+
+
+class TextCollector(HTMLParser):
+    SKIP = {'script', 'style'}
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self.skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self.skipping += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP and self.skipping:
+            self.skipping -= 1
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.parts.append(data)
+
+
+def extract_html(data):
+    collector = TextCollector()
+    collector.feed(decode(data))
+    collector.close()
+    return ' '.join(' '.join(collector.parts).split())
+
+
+EXTRACTORS = {
+    '.txt': extract_plain,
+    '.md': extract_plain,
+    '.csv': extract_plain,
+    '.tsv': extract_plain,
+    '.log': extract_plain,
+    '.json': extract_plain,
+    '.xml': extract_plain,
+    '.ndjson': extract_plain,
+    '.rtf': extract_rtf,
+    '.html': extract_html,
+    '.htm': extract_html,
+}
+
+
+def get_extractor(name):
+    extension = os.path.splitext(name)[1].lower()
+    configured = get_setting('ATTACHMENT_EXTRACTORS')
+    if extension in configured:
+        return import_string(configured[extension])
+    return EXTRACTORS.get(extension)
+
+
+def extract_text(field_file):
+    """Tekst pliku albo None, gdy nie ma ekstraktora dla jego rozszerzenia."""
+    extractor = get_extractor(field_file.name)
+    if extractor is None:
+        return None
+    limit = get_setting('ATTACHMENT_EXTRACT_BYTES')
+    with field_file.open('rb') as stream:
+        data = stream.read(limit)
+    text = extractor(data) or ''
+    # NUL nie przechodzi przez FTS5 / sqlite3 bez obcięcia
+    return text.replace('\x00', '')
+
+
+def extract_attachment(pk, using):
+    """
+    Wyciąga tekst załącznika `pk` z bazy `using` i zapisuje go (przez
+    kolejkę zapisów, jeśli włączona). Zapis tylko, gdy plik się w międzyczasie
+    nie zmienił. Zwraca liczbę zaktualizowanych wierszy.
+    """
+    attachment = Attachment.objects.using(using).only('file').filter(pk=pk).first()
+    if attachment is None or not attachment.file:
+        return 0
+    try:
+        text = extract_text(attachment.file)
+    except (OSError, ValueError, LookupError):
+        # brak pliku albo uszkodzona treść - nie próbujemy w kółko
+        text = None
+    with use_shard(using):
+        return run_write(
+            Attachment.objects.using(using).filter(pk=pk, file=attachment.file.name).update,
+            content_text=text or '',
+            content_extracted_at=timezone.now(),
+        )
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                get_setting('ATTACHMENT_EXTRACT_WORKERS'), thread_name_prefix='tablica-extract'
+            )
+        return _executor
+
+
+def run_extraction(pk, using):
+    try:
+        return extract_attachment(pk, using)
+    finally:
+        connections[using].close_if_unusable_or_obsolete()
+
+
+def schedule_extraction(pk, using):
+    """
+    Po zatwierdzeniu transakcji wyciąga tekst w puli wątków; przy
+    TABLICA['ATTACHMENT_EXTRACT_WORKERS'] = 0 od razu, w bieżącym wątku.
+    """
+    def submit():
+        if get_setting('ATTACHMENT_EXTRACT_WORKERS'):
+            get_executor().submit(run_extraction, pk, using)
+        else:
+            extract_attachment(pk, using)
+    transaction.on_commit(submit, using=using)
@@ -0,0 +1,174 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.storage import FileSystemStorage
+from django.utils.encoding import filepath_to_uri
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from .models import Task, Comment, Attachment
+from .serializers import TaskSerializer, UserSerializer
+from .sharding import use_shard
+
+CHUNK_SIZE = 500
+
+
+def chunked(items, size=CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def identity(value):
+    return value
+
+
+def file_url(storage, request):
+    if isinstance(storage, FileSystemStorage):
+        # adres bazowy liczymy raz, a nie dla każdego pliku
+        base_url = storage.base_url
+        if request is not None:
+            base_url = request.build_absolute_uri(base_url)
+
+        def convert(name):
+            return base_url + filepath_to_uri(name).lstrip('/') if name else None
+        return convert
+
+    def convert(name):
+        if not name:
+            return None
+        url = storage.url(name)
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+    return convert
+
+
+def iso_datetime(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if not settings.USE_TZ or not output_format or output_format.lower() != ISO_8601:
+        return field.to_representation
+    tz = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+
+    def convert(value):
+        value = value.astimezone(tz).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return convert
+
+
+class CompiledSerializer:
+    """
+    Serializer "skompilowany" do listy (pole, klucz w .values(), konwersja).
+    Dzięki temu wiersze z .values() zamieniamy na JSON bez tworzenia
+    instancji modeli i bez wywoływania Field.get_attribute dla każdego wiersza.
+    """
+
+    def __init__(self, serializer, model):
+        self.model = model
+        self.accessors = []
+        self.nested = {}
+        request = serializer.context.get('request')
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.ListSerializer):
+                self.nested[name] = field.child
+                continue
+            lookup = field.source.replace('.', '__')
+            if isinstance(field, serializers.FileField):
+                storage = model._meta.get_field(field.source).storage
+                convert = file_url(storage, request) if getattr(field, 'use_url', True) else identity
+            elif isinstance(field, serializers.RelatedField):
+                convert = identity
+            elif isinstance(field, serializers.DateTimeField):
+                convert = iso_datetime(field)
+            else:
+                convert = field.to_representation
+            self.accessors.append((name, lookup, convert))
+
+    @property
+    def lookups(self):
+        return [lookup for _, lookup, _ in self.accessors]
+
+    def serialize(self, row):
+        data = {}
+        for name, lookup, convert in self.accessors:
+            value = row[lookup]
+            data[name] = None if value is None else convert(value)
+        return data
+
+
+class FastTaskSerializer:
+    """
+    Tylko do odczytu: buduje ten sam kształt odpowiedzi co TaskSerializer,
+    ale z wierszy .values(), a użytkowników, komentarze i załączniki pobiera
+    zbiorczo (po jednym zapytaniu na paczkę zadań).
+    """
+
+    def __init__(self, context=None):
+        serializer = TaskSerializer(context=context or {})
+        self.task = CompiledSerializer(serializer, Task)
+        self.user = CompiledSerializer(UserSerializer(context=context or {}), User)
+        nested = self.task.nested
+        self.comment = CompiledSerializer(nested['comments'], Comment) if 'comments' in nested else None
+        self.attachment = (
+            CompiledSerializer(nested['attachments'], Attachment) if 'attachments' in nested else None
+        )
+
+    def values(self, queryset):
+        lookups = set(self.task.lookups) | {'id', 'created_at'}
+        return queryset.values(*lookups)
+
+    def serialize(self, rows):
+        rows = list(rows)
+        aliases = {row.get('_shard') for row in rows}
+        if aliases <= {None}:
+            return self.serialize_rows(rows)
+        # wiersze z kilku shardów (paginacja scatter-gather) - powiązane
+        # obiekty pobieramy z shardu każdego wiersza
+        data = {}
+        for alias in aliases:
+            group = [row for row in rows if row.get('_shard') == alias]
+            with use_shard(alias):
+                data.update(zip(map(id, group), self.serialize_rows(group)))
+        return [data[id(row)] for row in rows]
+
+    def serialize_rows(self, rows):
+        task_ids = [row['id'] for row in rows]
+        users = self.load_users(rows)
+        comments = self.load_related(self.comment, Comment.objects.order_by('pk'), task_ids)
+        attachments = self.load_related(self.attachment, Attachment.objects.order_by('pk'), task_ids)
+
+        data = []
+        for row in rows:
+            item = self.task.serialize(row)
+            if item.get('assigned_to') is not None:
+                item['assigned_to'] = users.get(item['assigned_to'])
+            if self.comment is not None:
+                item['comments'] = comments.get(row['id'], [])
+            if self.attachment is not None:
+                item['attachments'] = attachments.get(row['id'], [])
+            data.append(item)
+        return data
+
+    def load_users(self, rows):
+        if 'assigned_to' not in self.task.lookups:
+            return {}
+        user_ids = list({row['assigned_to'] for row in rows if row['assigned_to'] is not None})
+        users = {}
+        for chunk in chunked(user_ids):
+            for row in User.objects.filter(pk__in=chunk).values(*self.user.lookups):
+                users[row['id']] = self.user.serialize(row)
+        return users
+
+    def load_related(self, compiled, queryset, task_ids):
+        grouped = defaultdict(list)
+        if compiled is None:
+            return grouped
+        lookups = set(compiled.lookups) | {'task'}
+        for chunk in chunked(task_ids):
+            for row in queryset.filter(task_id__in=chunk).values(*lookups):
+                grouped[row['task']].append(compiled.serialize(row))
+        return grouped
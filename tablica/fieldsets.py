@@ -0,0 +1,106 @@
+from rest_framework.permissions import SAFE_METHODS
+
+
+def split_param(value):
+    return {part.strip() for part in (value or '').split(',') if part.strip()}
+
+
+def join_path(path, name):
+    return '%s.%s' % (path, name) if path else name
+
+
+class FieldSelection:
+    """
+    Wybór pól odpowiedzi na podstawie parametrów zapytania:
+
+    ?fields=id,name,tasks.title  - pola (kropka oznacza pole obiektu zagnieżdżonego)
+    ?expand=tasks,tasks.comments - relacje, które mają zostać zagnieżdżone
+
+    Bez `expand` zagnieżdżane są wszystkie relacje (jak dotychczas).
+    """
+
+    def __init__(self, fields=None, expand=None):
+        self.fields = fields
+        self.expand = expand
+        if expand is not None:
+            # tasks.comments wymaga rozwinięcia tasks
+            self.expand = set()
+            for path in expand:
+                parts = path.split('.')
+                for i in range(1, len(parts) + 1):
+                    self.expand.add('.'.join(parts[:i]))
+
+    @classmethod
+    def from_request(cls, request):
+        if request is None or request.method not in SAFE_METHODS:
+            return None
+        params = getattr(request, 'query_params', request.GET)
+        fields = split_param(params.get('fields')) or None
+        expand = split_param(params.get('expand')) if 'expand' in params else None
+        if fields is None and expand is None:
+            return None
+        return cls(fields, expand)
+
+    def fields_for(self, path):
+        """Nazwy pól wybranych na poziomie `path` albo None, gdy wybrane są wszystkie."""
+        if self.fields is None:
+            return None
+        prefix = path.split('.') if path else []
+        depth = len(prefix)
+        names = set()
+        for field_path in self.fields:
+            parts = field_path.split('.')
+            if len(parts) > depth and parts[:depth] == prefix:
+                names.add(parts[depth])
+        if not names and depth:
+            return None
+        return names
+
+    def wants(self, path, name):
+        names = self.fields_for(path)
+        return names is None or name in names
+
+    def expands(self, path, name):
+        if not self.wants(path, name):
+            return False
+        return self.expand is None or join_path(path, name) in self.expand
+
+
+def wants(selection, path, name):
+    return selection is None or selection.wants(path, name)
+
+
+def expands(selection, path, name):
+    return selection is None or selection.expands(path, name)
+
+
+class SparseFieldsMixin:
+    """
+    Usuwa z serializera pola, których klient nie zażądał w `?fields=`,
+    oraz relacje z `expandable_fields`, których nie ma w `?expand=`.
+    """
+    expandable_fields = ()
+
+    def get_field_path(self):
+        names = []
+        node = self
+        while node.parent is not None:
+            if node.field_name:
+                names.append(node.field_name)
+            node = node.parent
+        return '.'.join(reversed(names))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selection = FieldSelection.from_request(self.context.get('request'))
+        if selection is None:
+            return fields
+        path = self.get_field_path()
+        for name in list(fields):
+            if name in self.expandable_fields:
+                keep = selection.expands(path, name)
+            else:
+                keep = selection.wants(path, name)
+            if not keep:
+                fields.pop(name)
+        return fields
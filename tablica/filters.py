@@ -0,0 +1,55 @@
+"""
+Filtry (django-filter) wspólne dla REST i GraphQL. Dane filtra mogą
+przyjść z parametrów URL (?status=TODO,INPR&assigned_to=3) albo jako
+słownik z JSON / argumentów GraphQL (listy zamiast wartości po przecinku).
+"""
+import django_filters
+from django_filters.widgets import CSVWidget
+
+from .models import Attachment, Comment, Task, TaskStatus
+
+
+class NumberInFilter(django_filters.BaseInFilter, django_filters.NumberFilter):
+    pass
+
+
+class TaskFilter(django_filters.FilterSet):
+    id = NumberInFilter(field_name='id', lookup_expr='in')
+    # same id, bez zapytania o istnienie projektu / użytkownika
+    project = django_filters.NumberFilter(field_name='project_id')
+    status = django_filters.MultipleChoiceFilter(choices=TaskStatus.choices, widget=CSVWidget)
+    assigned_to = django_filters.NumberFilter(field_name='assigned_to_id')
+    unassigned = django_filters.BooleanFilter(field_name='assigned_to', lookup_expr='isnull')
+    due_before = django_filters.DateFilter(field_name='due_date', lookup_expr='lt')
+    due_after = django_filters.DateFilter(field_name='due_date', lookup_expr='gte')
+    created_before = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='lt')
+    created_after = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='gte')
+
+    class Meta:
+        model = Task
+        fields = []
+
+    def is_empty(self):
+        """Czy żaden warunek nie jest ustawiony (po is_valid())."""
+        return all(value in (None, '', [], ()) for value in self.form.cleaned_data.values())
+
+
+class CommentFilter(django_filters.FilterSet):
+    task = django_filters.NumberFilter(field_name='task_id')
+    author = django_filters.NumberFilter(field_name='author_id')
+    created_before = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='lt')
+    created_after = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='gte')
+
+    class Meta:
+        model = Comment
+        fields = []
+
+
+class AttachmentFilter(django_filters.FilterSet):
+    task = django_filters.NumberFilter(field_name='task_id')
+    uploaded_before = django_filters.IsoDateTimeFilter(field_name='uploaded_at', lookup_expr='lt')
+    uploaded_after = django_filters.IsoDateTimeFilter(field_name='uploaded_at', lookup_expr='gte')
+
+    class Meta:
+        model = Attachment
+        fields = []
@@ -0,0 +1,221 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from inspect import isawaitable
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.db import connection, connections, transaction
+from django.http import HttpResponseNotAllowed
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.settings import graphene_settings
+from graphene_django.views import HttpError
+from graphene_file_upload.django import FileUploadGraphQLView
+from graphql import ExecutionContext, ExecutionResult, GraphQLError, OperationType, execute, get_operation_ast, validate
+
+from .complexity import QueryCost
+from .conf import get_setting
+from .dbrouters import is_sticky, read_from_replica, replicas
+from .persisted import documents, resolve_query
+from .timeouts import reset_budget, start_budget
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def operation_type(query, operation_name=None):
+    try:
+        operation = get_operation_ast(documents.parse(query), operation_name)
+    except Exception:
+        return None
+    return operation.operation if operation is not None else None
+
+
+class TablicaGraphQLView(FileUploadGraphQLView):
+    """
+    Widok GraphQL (z uploadem plików). Zapytania (query) czytają z repliki,
+    mutacje idą do primary i włączają read-your-writes dla użytkownika.
+    Cała operacja ma budżet czasu SQL TABLICA['SQL_TIME_BUDGET']. Zbyt
+    głębokie albo kosztowne zapytania są odrzucane przy walidacji, a koszt
+    trafia do "extensions" odpowiedzi. Obsługuje zapytania utrwalone
+    (tablica/persisted.py); sparsowane dokumenty są trzymane w LRU.
+    Udane zapytania przez GET dostają Cache-Control.
+    """
+    # stan jednego żądania - widok jest tworzony na każde żądanie
+    query_cost = None
+    persisted_query_error = None
+    cacheable = False
+
+    def dispatch(self, request, *args, **kwargs):
+        response = super().dispatch(request, *args, **kwargs)
+        max_age = get_setting('GRAPHQL_GET_MAX_AGE')
+        if self.cacheable and max_age and response.status_code == 200:
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                patch_cache_control(response, private=True, max_age=max_age)
+            else:
+                patch_cache_control(response, public=True, max_age=max_age)
+            patch_vary_headers(response, ['Authorization', 'Cookie'])
+        return response
+
+    def get_graphql_params(self, request, data):
+        query, variables, operation_name, id = super().get_graphql_params(request, data)
+        extensions = request.GET.get('extensions') or (data.get('extensions') if hasattr(data, 'get') else None)
+        try:
+            query = resolve_query(query, extensions)
+        except GraphQLError as error:
+            self.persisted_query_error = error
+        return query, variables, operation_name, id
+
+    def execute_graphql_request(self, request, data, query, variables, operation_name, show_graphiql=False):
+        if self.persisted_query_error is not None:
+            return ExecutionResult(errors=[self.persisted_query_error])
+        if not query:
+            return super().execute_graphql_request(request, data, query, variables, operation_name, show_graphiql)
+        schema = self.schema.graphql_schema
+        try:
+            document, errors = documents.validated(schema, query, graphene_settings.MAX_VALIDATION_ERRORS)
+        except GraphQLError as error:
+            return ExecutionResult(errors=[error])
+        if errors:
+            return ExecutionResult(data=None, errors=errors)
+        # reguła kosztu zna zmienne żądania, więc nie trafia do cache
+        self.query_cost = QueryCost(variables, operation_name)
+        errors = validate(schema, document, [self.query_cost.rule()])
+        if errors:
+            return ExecutionResult(data=None, errors=errors)
+
+        operation = get_operation_ast(document, operation_name)
+        if request.method.lower() == 'get' and operation is not None and operation.operation != OperationType.QUERY:
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseNotAllowed(
+                ['POST'], f'Can only perform a {operation.operation.value} operation from a POST request.'
+            ))
+        token = start_budget(get_setting('SQL_TIME_BUDGET'))
+        try:
+            result = self.execute_routed(request, document, operation, variables, operation_name)
+        finally:
+            reset_budget(token)
+        self.cacheable = request.method.lower() == 'get' and not result.errors
+        return result
+
+    def json_encode(self, request, d, pretty=False):
+        extensions = self.query_cost.extensions() if self.query_cost is not None else None
+        if extensions:
+            d['extensions'] = extensions
+        return super().json_encode(request, d, pretty)
+
+    def execute_routed(self, request, document, operation, variables, operation_name):
+        mutation = operation is not None and operation.operation == OperationType.MUTATION
+        if not replicas():
+            return self.execute_document(request, document, mutation, variables, operation_name)
+        request.database_write = mutation
+        if request.database_write or is_sticky(request):
+            return self.execute_document(request, document, mutation, variables, operation_name)
+        with read_from_replica():
+            return self.execute_document(request, document, mutation, variables, operation_name)
+
+    def execute_document(self, request, document, mutation, variables, operation_name):
+        """Wykonanie jak w GraphQLView.execute_graphql_request, na gotowym dokumencie."""
+        options = {
+            'root_value': self.get_root_value(request),
+            'context_value': self.get_context(request),
+            'variable_values': variables,
+            'operation_name': operation_name,
+            'middleware': self.get_middleware(request),
+        }
+        if self.execution_context_class:
+            options['execution_context_class'] = self.execution_context_class
+        try:
+            if mutation and (
+                graphene_settings.ATOMIC_MUTATIONS is True
+                or connection.settings_dict.get('ATOMIC_MUTATIONS', False) is True
+            ):
+                with transaction.atomic():
+                    result = execute(self.schema.graphql_schema, document, **options)
+                    if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                        transaction.set_rollback(True)
+                return result
+            return execute(self.schema.graphql_schema, document, **options)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(get_setting('GRAPHQL_WORKERS'), thread_name_prefix='tablica-graphql')
+        return _executor
+
+
+def run_in_worker(func, *args):
+    try:
+        return func(*args)
+    finally:
+        # wątek z puli - sprzątamy połączenia jak po żądaniu
+        for conn in connections.all(initialized_only=True):
+            conn.close_if_unusable_or_obsolete()
+
+
+class ThreadedExecutionContext(ExecutionContext):
+    """
+    Wykonanie asynchroniczne graphql-core, w którym każde pole najwyższego
+    poziomu (razem z całym poddrzewem) liczy się synchronicznie w wątku
+    z puli TABLICA['GRAPHQL_WORKERS']. Pola zapytania startują naraz,
+    a execute_fields czeka na nie przez asyncio.gather; mutacje graphql-core
+    wykonuje po kolei. Zmienne kontekstu (budżet czasu, replika, shard)
+    są kopiowane do wątku.
+    """
+
+    def execute_field(self, parent_type, source, field_nodes, path):
+        if path.prev is not None:
+            return super().execute_field(parent_type, source, field_nodes, path)
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(
+            get_executor(), copy_context().run, run_in_worker,
+            super().execute_field, parent_type, source, field_nodes, path,
+        )
+
+
+class AsyncTablicaGraphQLView(TablicaGraphQLView):
+    """
+    TablicaGraphQLView jako widok asynchroniczny (ASGI). Zapytania idą przez
+    ThreadedExecutionContext, więc niezależne pola jednej operacji (np.
+    activeProjects, recentTasks i taskStatusSummary) liczą się równolegle,
+    a całość trwa mniej więcej tyle, co najwolniejsze pole. Mutacje zostają
+    synchroniczne, w transakcji jak w widoku bazowym.
+
+    Resolvery zostają synchroniczne: asynchroniczny ORM Django (aget,
+    async for) wykonuje zapytania i tak po kolei w jednym wątku, więc
+    równoległość dają dopiero osobne wątki z własnymi połączeniami.
+    """
+    view_is_async = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        # parsowanie żądania i odpowiedź są synchroniczne (graphene-django)
+        return await sync_to_async(super().dispatch)(request, *args, **kwargs)
+
+    def execute_document(self, request, document, mutation, variables, operation_name):
+        if mutation:
+            return super().execute_document(request, document, mutation, variables, operation_name)
+        return async_to_sync(self.execute_concurrently)(request, document, variables, operation_name)
+
+    async def execute_concurrently(self, request, document, variables, operation_name):
+        try:
+            result = execute(
+                self.schema.graphql_schema, document,
+                root_value=self.get_root_value(request),
+                context_value=self.get_context(request),
+                variable_values=variables,
+                operation_name=operation_name,
+                middleware=self.get_middleware(request),
+                execution_context_class=ThreadedExecutionContext,
+            )
+            if isawaitable(result):
+                result = await result
+            return result
+        except Exception as e:
+            return ExecutionResult(errors=[e])
@@ -0,0 +1,483 @@
+import codecs
+import json
+import re
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.db import router, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .counters import recount
+from .models import Project, Task, Comment, Attachment, TaskStatus
+
+BATCH_SIZE = 1000
+CHUNK_SIZE = 64 * 1024
+LOOKUP_CHUNK = 500
+
+WHITESPACE = re.compile(r'\s*')
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+class JsonStream:
+    """
+    Przyrostowy czytnik dużego dokumentu JSON. Czyta strumień kawałkami
+    i dekoduje po jednym elemencie tablicy, więc w pamięci jest naraz
+    tylko jeden rekord, a nie cały plik.
+    """
+
+    def __init__(self, stream, chunk_size=CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.text_decoder = codecs.getincrementaldecoder('utf-8-sig')()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def read_more(self):
+        if self.eof:
+            return False
+        # przy bardzo długich elementach czytamy coraz większe kawałki
+        raw = self.stream.read(max(self.chunk_size, len(self.buffer) - self.pos))
+        chunk = self.text_decoder.decode(raw, final=not raw) if isinstance(raw, bytes) else raw
+        if not raw:
+            self.eof = True
+        if not chunk:
+            return not self.eof
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or not self.read_more():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ImportFormatError(f'Expected {char!r}, found {found!r}')
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as e:
+                if not self.read_more():
+                    raise ImportFormatError(str(e))
+                continue
+            # liczba na końcu bufora może być ucięta - doczytujemy i dekodujemy ponownie
+            if end == len(self.buffer) and self.read_more():
+                continue
+            self.pos = end
+            return value
+
+    def separator(self, closing):
+        char = self.peek()
+        self.pos += 1
+        if char == closing:
+            return False
+        if char != ',':
+            raise ImportFormatError(f'Expected "," or {closing!r}, found {char!r}')
+        return True
+
+    def items(self):
+        """Elementy tablicy, od bieżącej pozycji ('[' ... ']')."""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if not self.separator(']'):
+                return
+
+    def members(self):
+        """
+        Pola obiektu najwyższego poziomu jako (klucz, wartość, czy_element_tablicy).
+        Tablice są rozwijane element po elemencie.
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            if self.peek() == '[':
+                for item in self.items():
+                    yield key, item, True
+            else:
+                yield key, self.value(), False
+            if not self.separator('}'):
+                return
+
+
+def iter_ndjson(stream):
+    for number, line in enumerate(stream, start=1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8-sig')
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            raise ImportFormatError(f'Line {number}: {e}')
+
+
+def iter_json_records(stream):
+    yield from JsonStream(stream).items()
+
+
+TRELLO_STATUS_WORDS = (
+    (TaskStatus.DONE, ('done', 'complete', 'finished', 'zrobione', 'gotowe', 'zakończone')),
+    (TaskStatus.IN_PROGRESS, ('progress', 'doing', 'review', 'w toku', 'w trakcie', 'realizacji')),
+)
+
+
+def trello_status(list_name):
+    name = (list_name or '').lower()
+    for status, words in TRELLO_STATUS_WORDS:
+        if any(word in name for word in words):
+            return status
+    return TaskStatus.TODO
+
+
+def iter_trello_records(open_stream):
+    """
+    Eksport tablicy z Trello (JSON). Plik czytany jest trzy razy: najpierw
+    listy i członkowie (mało danych), potem karty, na końcu komentarze
+    (w eksporcie Trello akcje występują przed kartami).
+    """
+    board, lists, members = {}, {}, {}
+    for key, value, is_item in JsonStream(open_stream()).members():
+        if key == 'lists' and is_item:
+            lists[value.get('id')] = value.get('name')
+        elif key == 'members' and is_item:
+            members[value.get('id')] = value.get('username')
+        elif not is_item and key in ('id', 'name', 'desc', 'closed'):
+            board[key] = value
+
+    board_id = board.get('id') or 'trello'
+    yield {
+        'type': 'project',
+        'id': board_id,
+        'name': board.get('name') or 'Trello',
+        'description': board.get('desc') or '',
+        'is_active': not board.get('closed', False),
+        'members': [name for name in members.values() if name],
+    }
+
+    for key, card, is_item in JsonStream(open_stream()).members():
+        if key != 'cards' or not is_item:
+            continue
+        member_ids = card.get('idMembers') or []
+        yield {
+            'type': 'task',
+            'id': card.get('id'),
+            'project': board_id,
+            'title': card.get('name') or '',
+            'description': card.get('desc') or '',
+            'status': trello_status(lists.get(card.get('idList'))),
+            'assigned_to': members.get(member_ids[0]) if member_ids else None,
+            'due_date': card.get('due'),
+        }
+
+    for key, action, is_item in JsonStream(open_stream()).members():
+        if key != 'actions' or not is_item or action.get('type') != 'commentCard':
+            continue
+        data = action.get('data') or {}
+        creator = action.get('memberCreator') or {}
+        yield {
+            'type': 'comment',
+            'task': (data.get('card') or {}).get('id'),
+            'author': creator.get('username') or members.get(action.get('idMemberCreator')),
+            'content': data.get('text') or '',
+        }
+
+
+def detect_format(stream, name=''):
+    if name.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    head = stream.read(CHUNK_SIZE)
+    stream.seek(0)
+    if isinstance(head, bytes):
+        head = head.decode('utf-8-sig', errors='ignore')
+    head = head.lstrip()
+    if head.startswith('['):
+        return 'json'
+    if head.startswith('{'):
+        # jeden obiekt na linię to NDJSON, jeden duży obiekt to eksport Trello
+        first_line = head.split('\n', 1)[0].strip()
+        try:
+            record = json.loads(first_line)
+        except ValueError:
+            return 'trello'
+        return 'ndjson' if isinstance(record, dict) and 'type' in record else 'trello'
+    raise ImportFormatError('Unrecognized import format')
+
+
+def iter_file_records(stream, import_format='auto', name=''):
+    """Rekordy z pliku; strumień musi obsługiwać seek() (Trello czytane jest kilka razy)."""
+    if import_format == 'auto':
+        import_format = detect_format(stream, name)
+    if import_format == 'ndjson':
+        return iter_ndjson(stream)
+    if import_format == 'json':
+        return iter_json_records(stream)
+    if import_format == 'trello':
+        def reopen():
+            stream.seek(0)
+            return stream
+        return iter_trello_records(reopen)
+    raise ImportFormatError(f'Unknown import format: {import_format}')
+
+
+def chunked(items, size=LOOKUP_CHUNK):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def to_text(record, name, max_length=None):
+    value = record.get(name)
+    if value is None:
+        return ''
+    if not isinstance(value, str):
+        raise ImportFormatError(f'Field {name!r} must be a string, found {type(value).__name__}')
+    return value[:max_length] if max_length else value
+
+
+def to_key(record, name):
+    """Identyfikator rekordu albo nazwa użytkownika - klucz słownika, więc tekst albo liczba."""
+    value = record.get(name)
+    if value is None or isinstance(value, (str, int)) and not isinstance(value, bool):
+        return value
+    raise ImportFormatError(f'Field {name!r} must be a string or a number, found {type(value).__name__}')
+
+
+def to_usernames(record, name):
+    values = record.get(name) or []
+    if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+        raise ImportFormatError(f'Field {name!r} must be a list of usernames')
+    return values
+
+
+def to_datetime(record, name):
+    value = record.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_datetime(value) if isinstance(value, str) else None
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ImportFormatError(f'Field {name!r} is not a valid datetime: {value!r}')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def to_date(record, name):
+    value = record.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_date(value[:10]) if isinstance(value, str) else None
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ImportFormatError(f'Field {name!r} is not a valid date: {value!r}')
+    return parsed
+
+
+class BoardImporter:
+    """
+    Import rekordów {'type': 'project'|'task'|'comment'|'attachment', ...}
+    (format eksportu NDJSON). Rekordy są zbierane w paczki i zapisywane
+    przez bulk_create, każda paczka w osobnej transakcji, więc zapis nie
+    trzyma blokady bazy przez cały import. Po błędzie w połowie pliku
+    (np. ImportFormatError) zaimportowane już projekty są usuwane - nie
+    zostaje częściowo zaimportowana tablica. Użytkownicy są rozwiązywani
+    po nazwie jednym zapytaniem na paczkę i zapamiętywani.
+    """
+
+    def __init__(self, owner, batch_size=BATCH_SIZE):
+        self.owner = owner
+        self.batch_size = batch_size
+        # baza (shard) docelowa - ta sama dla transakcji i zapisów
+        self.using = router.db_for_write(Project)
+        self.users = {}
+        self.projects = {}
+        self.tasks = {}
+        self.current_project = None
+        self.pending_tasks = []
+        self.pending_comments = []
+        self.pending_attachments = []
+        self.stats = Counter()
+        self.project_ids = []
+
+    def run(self, records):
+        try:
+            for record in records:
+                self.add(record)
+            return self.finish()
+        except Exception:
+            self.discard()
+            raise
+
+    def discard(self):
+        """Usuwa projekty przerwanego importu (z zadaniami, kaskadowo), po jednym na transakcję."""
+        for project_id in self.project_ids:
+            with transaction.atomic(using=self.using):
+                # bulk_create nie ustawił liczników, a sygnały usuwania je zmniejszają
+                recount([project_id], self.using)
+                Project.objects.filter(pk=project_id).delete()
+        self.project_ids = []
+
+    def add(self, record):
+        handler = {
+            'project': self.add_project,
+            'task': self.add_task,
+            'comment': self.add_comment,
+            'attachment': self.add_attachment,
+        }.get(record.get('type') if isinstance(record, dict) else None)
+        if handler is None:
+            self.stats['skipped'] += 1
+            return
+        handler(record)
+
+    def finish(self):
+        self.flush_tasks()
+        self.flush_comments()
+        self.flush_attachments()
+        # bulk_create nie wysyła sygnałów - liczniki i wersję projektów ustawiamy sami
+        if self.project_ids:
+            with transaction.atomic(using=self.using):
+                recount(self.project_ids, self.using)
+                Project.objects.filter(pk__in=self.project_ids).update(updated_at=timezone.now())
+        return dict(self.stats, project_ids=self.project_ids)
+
+    def resolve_users(self, usernames):
+        missing = {name for name in usernames if name and name not in self.users}
+        for chunk in chunked(missing):
+            found = dict(User.objects.filter(username__in=chunk).values_list('username', 'id'))
+            for name in chunk:
+                self.users[name] = found.get(name)
+        return self.users
+
+    def add_project(self, record):
+        self.flush_tasks()
+        self.flush_comments()
+        self.flush_attachments()
+        owner, members = to_key(record, 'owner'), to_usernames(record, 'members')
+        is_active = record.get('is_active', True)
+        if not isinstance(is_active, bool):
+            raise ImportFormatError(f"Field 'is_active' must be a boolean, found {type(is_active).__name__}")
+        users = self.resolve_users([owner] + members)
+        with transaction.atomic(using=self.using):
+            project = Project.objects.create(
+                name=to_text(record, 'name', 255),
+                description=to_text(record, 'description'),
+                owner_id=users.get(owner) or self.owner.pk,
+                is_active=is_active,
+            )
+            member_ids = {users.get(name) for name in members} - {None}
+            if member_ids:
+                project.members.set(member_ids)
+        if to_key(record, 'id') is not None:
+            self.projects[record['id']] = project.pk
+        self.current_project = project.pk
+        self.project_ids.append(project.pk)
+        self.stats['projects'] += 1
+
+    def add_task(self, record):
+        self.pending_tasks.append(record)
+        if len(self.pending_tasks) >= self.batch_size:
+            self.flush_tasks()
+
+    def add_comment(self, record):
+        self.flush_tasks()
+        self.pending_comments.append(record)
+        if len(self.pending_comments) >= self.batch_size:
+            self.flush_comments()
+
+    def add_attachment(self, record):
+        self.flush_tasks()
+        self.pending_attachments.append(record)
+        if len(self.pending_attachments) >= self.batch_size:
+            self.flush_attachments()
+
+    def flush_tasks(self):
+        records, self.pending_tasks = self.pending_tasks, []
+        if not records:
+            return
+        users = self.resolve_users(to_key(record, 'assigned_to') for record in records)
+        statuses = set(TaskStatus.values)
+        kept, tasks = [], []
+        for record in records:
+            project_id = self.projects.get(to_key(record, 'project'), self.current_project)
+            if project_id is None:
+                self.stats['skipped'] += 1
+                continue
+            status = to_key(record, 'status')
+            kept.append(record)
+            tasks.append(Task(
+                project_id=project_id,
+                title=to_text(record, 'title', 255),
+                description=to_text(record, 'description'),
+                status=status if status in statuses else TaskStatus.TODO,
+                assigned_to_id=users.get(record.get('assigned_to')),
+                due_date=to_date(record, 'due_date'),
+                created_at=to_datetime(record, 'created_at') or timezone.now(),
+            ))
+        with transaction.atomic(using=self.using):
+            Task.objects.bulk_create(tasks, batch_size=self.batch_size)
+        for record, task in zip(kept, tasks):
+            if to_key(record, 'id') is not None:
+                self.tasks[record['id']] = task.pk
+        self.stats['tasks'] += len(tasks)
+
+    def flush_comments(self):
+        records, self.pending_comments = self.pending_comments, []
+        if not records:
+            return
+        users = self.resolve_users(to_key(record, 'author') for record in records)
+        comments = []
+        for record in records:
+            task_id = self.tasks.get(to_key(record, 'task'))
+            if task_id is None:
+                self.stats['skipped'] += 1
+                continue
+            comments.append(Comment(
+                task_id=task_id,
+                author_id=users.get(record.get('author')) or self.owner.pk,
+                content=to_text(record, 'content'),
+            ))
+        with transaction.atomic(using=self.using):
+            Comment.objects.bulk_create(comments, batch_size=self.batch_size)
+        self.stats['comments'] += len(comments)
+
+    def flush_attachments(self):
+        records, self.pending_attachments = self.pending_attachments, []
+        if not records:
+            return
+        attachments = []
+        for record in records:
+            task_id = self.tasks.get(to_key(record, 'task'))
+            file = to_text(record, 'file')
+            if task_id is None or not file:
+                self.stats['skipped'] += 1
+                continue
+            attachments.append(Attachment(task_id=task_id, file=file))
+        with transaction.atomic(using=self.using):
+            Attachment.objects.bulk_create(attachments, batch_size=self.batch_size)
+        self.stats['attachments'] += len(attachments)
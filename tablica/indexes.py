@@ -0,0 +1,148 @@
+import re
+from collections import Counter, defaultdict
+
+from django.apps import apps
+from django.db import connections
+
+COLUMN = r'(?:"(?P<table>\w+)"|(?P<alias>\w+))\."(?P<column>\w+)"'
+# warunki złączeń (kolumna = kolumna) pomijamy, skorelowane podzapytania zostają
+EQUALITY_RE = re.compile(COLUMN + r'\s*(?:=(?!\s*(?:"\w+"|\w+)\.")|IN\s*\()')
+ORDER_TERM_RE = re.compile(COLUMN + r'(?:\s+(?P<direction>ASC|DESC))?')
+ORDER_BY_RE = re.compile(r'\bORDER BY\b(?P<terms>.*?)(?:\bLIMIT\b|\)|$)', re.S)
+TABLE_RE = re.compile(r'\b(?:FROM|JOIN)\s+"(?P<table>\w+)"(?:\s+(?:AS\s+)?(?P<alias>(?!ON\b|WHERE\b|INNER\b|LEFT\b)\w+))?')
+SCAN_RE = re.compile(r'^SCAN (?P<table>\w+)(?: AS (?P<alias>\w+))?(?P<index> USING (?:COVERING )?INDEX)?')
+TEMP_BTREE = 'USE TEMP B-TREE'
+
+
+def explain(sql, using='default'):
+    """Szczegóły planu (kolumna `detail` z EXPLAIN QUERY PLAN)."""
+    with connections[using].cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def table_aliases(sql):
+    aliases = {}
+    for match in TABLE_RE.finditer(sql):
+        aliases[match['table']] = match['table']
+        if match['alias']:
+            aliases[match['alias']] = match['table']
+    return aliases
+
+
+def column_refs(regex, text, aliases):
+    refs = []
+    for match in regex.finditer(text):
+        table = match['table'] or aliases.get(match['alias'])
+        if table is None:
+            continue
+        ref = (table, match['column'])
+        if match.groupdict().get('direction') == 'DESC':
+            ref += ('DESC',)
+        if ref not in refs:
+            refs.append(ref)
+    return refs
+
+
+def index_columns(table, equality, ordering):
+    """
+    Kolumny proponowanego indeksu: najpierw równości z WHERE, potem ORDER BY.
+    Końcowe "id" pomijamy - w SQLite rowid jest w każdym indeksie.
+    """
+    columns = [column for name, column, *_ in equality if name == table]
+    order = [(column, bool(desc)) for name, column, *desc in ordering if name == table]
+    # ORDER BY w całości malejąco da się przejść indeksem od końca
+    descending = {desc for _, desc in order}
+    mixed = len(descending) > 1
+    for column, desc in order:
+        if column not in columns:
+            columns.append('-' + column if mixed and desc else column)
+    while columns and columns[-1].lstrip('-') == 'id':
+        columns.pop()
+    return tuple(columns)
+
+
+def existing_indexes(table, using='default'):
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    return [tuple(c['columns']) for c in constraints.values() if c['index'] or c['primary_key']]
+
+
+def is_covered(columns, indexes):
+    plain = tuple(column.lstrip('-') for column in columns)
+    return any(index[:len(plain)] == plain for index in indexes)
+
+
+class IndexAdvisor:
+    """
+    Zbiera zapytania (np. z CaptureQueriesContext), sprawdza ich plany
+    i grupuje problemy (pełne skany, sortowanie w temp B-tree) oraz
+    propozycje indeksów złożonych.
+    """
+
+    def __init__(self, using='default'):
+        self.using = using
+        self.findings = defaultdict(list)
+        self.proposals = Counter()
+        self.plans = {}
+        self.models = {model._meta.db_table: model for model in apps.get_models()}
+
+    def observe(self, label, queries):
+        for query in queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            for issue in self.analyze(sql):
+                if issue not in self.findings[label]:
+                    self.findings[label].append(issue)
+
+    def analyze(self, sql):
+        if sql not in self.plans:
+            self.plans[sql] = self.issues(sql, explain(sql, self.using))
+        return self.plans[sql]
+
+    def issues(self, sql, plan):
+        aliases = table_aliases(sql)
+        equality = column_refs(EQUALITY_RE, sql, aliases)
+        ordering = []
+        for match in ORDER_BY_RE.finditer(sql):
+            ordering += column_refs(ORDER_TERM_RE, match['terms'], aliases)
+
+        found = []
+        for detail in plan:
+            scan = SCAN_RE.match(detail)
+            if scan and not scan['index'] and scan['table'] in aliases:
+                found.append(('full scan', aliases[scan['table']], detail, sql))
+            elif detail.startswith(TEMP_BTREE) and ordering:
+                found.append(('temp b-tree', ordering[0][0], detail, sql))
+
+        for table in {table for _, table, _, _ in found}:
+            columns = index_columns(table, equality, ordering)
+            if columns and not is_covered(columns, existing_indexes(table, self.using)):
+                self.proposals[(table, columns)] += 1
+        return found
+
+    def field_names(self, table, columns):
+        model = self.models.get(table)
+        if model is None:
+            return None, list(columns)
+        by_column = {field.column: field.name for field in model._meta.concrete_fields}
+        names = []
+        for column in columns:
+            prefix = '-' if column.startswith('-') else ''
+            names.append(prefix + by_column.get(column.lstrip('-'), column.lstrip('-')))
+        return model, names
+
+    def suggestions(self):
+        """Propozycje będące prefiksem dłuższej doliczamy do tej dłuższej."""
+        merged = Counter()
+        for (table, columns), hits in self.proposals.items():
+            longer = [
+                other for other_table, other in self.proposals
+                if other_table == table and len(other) > len(columns) and other[:len(columns)] == columns
+            ]
+            merged[(table, max(longer, key=len) if longer else columns)] += hits
+        for (table, columns), hits in merged.most_common():
+            model, names = self.field_names(table, columns)
+            yield model, names, hits
@@ -0,0 +1,85 @@
+"""
+Grupowe ładowanie relacji w GraphQL - odpowiednik DataLoadera przy
+synchronicznym wykonaniu. Obiekty zwrócone razem (lista z resolvera albo
+wszystkie obiekty jednej relacji z poprzedniego poziomu) pamiętają swoją
+paczkę. Pierwsze odwołanie do relacji któregoś z nich ładuje ją dla całej
+paczki przez prefetch_related_objects (zapytanie na shard), pozostałe
+czytają z cache. Dowolnie zagnieżdżone zapytanie kosztuje więc O(głębokość)
+zapytań SQL, a nie O(liczba wierszy). Paczki żyją na instancjach modeli,
+czyli tyle co żądanie.
+"""
+from collections import defaultdict
+
+from django.db.models import Prefetch, prefetch_related_objects
+
+from .optimizer import relation_queryset
+
+BATCH_ATTR = '_graphql_batch'
+
+
+def batched(objects):
+    """Lista `objects` jako jedna paczka (wynik resolvera listy)."""
+    objects = list(objects)
+    for obj in objects:
+        setattr(obj, BATCH_ATTR, objects)
+    return objects
+
+
+def is_many(obj, name):
+    field = obj._meta.get_field(name)
+    return field.one_to_many or field.many_to_many
+
+
+def is_loaded(obj, name):
+    if is_many(obj, name):
+        return name in getattr(obj, '_prefetched_objects_cache', {})
+    return obj._meta.get_field(name).is_cached(obj)
+
+
+def loaded_objects(obj, name):
+    if is_many(obj, name):
+        return list(obj._prefetched_objects_cache[name])
+    value = getattr(obj, name)
+    return [] if value is None else [value]
+
+
+def load(obj, name, info=None):
+    """
+    Relacja `name` obiektu `obj` (lista albo obiekt), ładowana dla całej
+    paczki. Z `info` - tylko kolumny, o które pyta zapytanie (tablica/optimizer.py).
+    """
+    batch = getattr(obj, BATCH_ATTR, None) or [obj]
+    if not is_loaded(obj, name):
+        pending = defaultdict(list)
+        for item in batch:
+            if not is_loaded(item, name):
+                pending[item._state.db].append(item)
+        for items in pending.values():
+            # obiekty z różnych shardów - osobne zapytanie na shard
+            lookup = Prefetch(name, queryset=relation_queryset(obj.__class__, name, info)) if info else name
+            prefetch_related_objects(items, lookup)
+        mark_related(batch, name)
+    else:
+        values = loaded_objects(obj, name)
+        if values and not hasattr(values[0], BATCH_ATTR):
+            # relacja załadowana wcześniej (select_related/Prefetch) - dzieci też w paczkę
+            mark_related(batch, name)
+    if is_many(obj, name):
+        return list(obj._prefetched_objects_cache[name])
+    return getattr(obj, name)
+
+
+def mark_related(batch, name):
+    related = {}
+    for item in batch:
+        if is_loaded(item, name):
+            for value in loaded_objects(item, name):
+                related[id(value)] = value
+    batched(related.values())
+
+
+def related_resolver(name):
+    """resolve_<name> typu DjangoObjectType korzystający z load()."""
+    def resolve(root, info):
+        return load(root, name, info)
+    return resolve
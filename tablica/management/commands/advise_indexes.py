@@ -0,0 +1,181 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, URLResolver, reverse
+from graphql import GraphQLList, GraphQLNonNull, GraphQLObjectType, get_named_type
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIClient
+
+from tablica import urls
+from tablica.complexity import is_connection
+from tablica.indexes import IndexAdvisor
+from tablica.management.scratch import scratch_database, seed_boards
+from tablica.models import Task, TaskStatus
+from tablica.schema import schema
+
+URL_MODELS = {'task_id': Task}
+
+
+def iter_patterns(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from iter_patterns(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern):
+            yield pattern
+
+
+def first_pk(model):
+    return model.objects.order_by('pk').values_list('pk', flat=True).first()
+
+
+def rest_requests(params):
+    """Wszystkie nazwane widoki DRF z tablica.urls obsługujące GET."""
+    for pattern in iter_patterns(urls.urlpatterns):
+        view, cls = pattern.callback, getattr(pattern.callback, 'cls', None)
+        if cls is None or pattern.name is None:
+            continue
+        actions = getattr(view, 'actions', None)
+        if ('get' not in actions) if actions is not None else not hasattr(cls, 'get'):
+            continue
+        names = pattern.pattern.regex.groupindex
+        if 'format' in names:
+            continue
+        kwargs = {}
+        for name in names:
+            model = URL_MODELS.get(name) or (cls.queryset.model if name == 'pk' else None)
+            kwargs[name] = first_pk(model) if model is not None else None
+        if None in kwargs.values():
+            continue
+        yield reverse(pattern.name, kwargs=kwargs), params
+
+
+def unwrap(graphql_type):
+    while isinstance(graphql_type, (GraphQLNonNull, GraphQLList)):
+        graphql_type = graphql_type.of_type
+    return graphql_type
+
+
+def selection(graphql_type, depth=1):
+    """Wszystkie pola skalarne, a relacje (do `depth` poziomów) tylko z polami skalarnymi."""
+    graphql_type = unwrap(graphql_type)
+    if not isinstance(graphql_type, GraphQLObjectType):
+        return ''
+    if is_connection(graphql_type):
+        # edges { node } połączenia Relay nie zużywają poziomu
+        node = unwrap(graphql_type.fields['edges'].type).fields['node']
+        return '{ edges { node %s } pageInfo %s }' % (
+            selection(node.type, depth), selection(graphql_type.fields['pageInfo'].type)
+        )
+    parts = []
+    for name, field in graphql_type.fields.items():
+        if any(isinstance(arg.type, GraphQLNonNull) for arg in field.args.values()):
+            continue
+        if isinstance(get_named_type(field.type), GraphQLObjectType):
+            if depth > 0:
+                parts.append('%s %s' % (name, selection(field.type, depth - 1)))
+        else:
+            parts.append(name)
+    return '{ %s }' % ' '.join(parts)
+
+
+def graphql_documents(arguments):
+    """Po jednym zapytaniu na każde pole Query, z przykładowymi argumentami."""
+    for name, field in schema.graphql_schema.query_type.fields.items():
+        args = []
+        for arg_name, arg in field.args.items():
+            if arg_name in arguments:
+                args.append('%s: %s' % (arg_name, arguments[arg_name](field)))
+            elif isinstance(arg.type, GraphQLNonNull):
+                break
+        else:
+            call = '%s(%s)' % (name, ', '.join(args)) if args else name
+            yield name, 'query { %s %s }' % (call, selection(field.type))
+
+
+def model_of(field):
+    graphene_type = getattr(unwrap(field.type), 'graphene_type', None)
+    return getattr(getattr(graphene_type, '_meta', None), 'model', None)
+
+
+class Command(BaseCommand):
+    help = (
+        'Odtwarza akcje REST (GET) i pola GraphQL na zasianej bazie tymczasowej, '
+        'sprawdza EXPLAIN QUERY PLAN i proponuje indeksy złożone.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--projects', type=int, default=20)
+        parser.add_argument('--tasks', type=int, default=200, help='Zadań na projekt')
+        parser.add_argument('--graphql-path', default='/graphql/')
+
+    def handle(self, *args, **options):
+        # APIClient przedstawia się jako "testserver"
+        allowed_hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+        with scratch_database(), override_settings(ALLOWED_HOSTS=allowed_hosts):
+            seed_boards(projects=options['projects'], tasks_per_project=options['tasks'], users=50)
+            with connection.cursor() as cursor:
+                # statystyki dla planera, jak na produkcyjnej bazie po ANALYZE
+                cursor.execute('ANALYZE')
+            advisor = IndexAdvisor()
+            for label, run in self.requests(options):
+                with CaptureQueriesContext(connection) as captured:
+                    run()
+                advisor.observe(label, captured.captured_queries)
+            self.report(advisor)
+
+    def requests(self, options):
+        user = User.objects.order_by('pk').first()
+        user_id = Task.objects.exclude(assigned_to=None).values_list('assigned_to', flat=True).first()
+        client = APIClient()
+        client.force_authenticate(user)
+
+        def get(url, params):
+            def run():
+                response = client.get(url, params)
+                check(url, response)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                elif isinstance(getattr(response, 'data', None), dict) and response.data.get('next'):
+                    # druga strona: filtr keyset zamiast pierwszego LIMIT
+                    client.get(response.data['next'])
+            return run
+
+        def check(label, response):
+            if response.status_code >= 400:
+                self.stderr.write('%s: HTTP %d' % (label, response.status_code))
+
+        def post_graphql(document):
+            def run():
+                response = client.post(options['graphql_path'], {'query': document}, format='json')
+                check(document, response)
+            return run
+
+        params = {'status': TaskStatus.TODO, 'user_id': user_id}
+        for url, query in rest_requests(params):
+            yield 'GET %s' % url, get(url, query)
+
+        arguments = {
+            'id': lambda field: first_pk(model_of(field)),
+            'status': lambda field: '"%s"' % TaskStatus.TODO,
+            'userId': lambda field: user_id,
+        }
+        for name, document in graphql_documents(arguments):
+            yield 'GraphQL %s' % name, post_graphql(document)
+
+    def report(self, advisor):
+        for label, issues in advisor.findings.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            for kind, table, detail, sql in issues:
+                self.stdout.write('  [%s] %s: %s' % (kind, table, detail))
+                self.stdout.write('      %s' % (sql if len(sql) <= 160 else sql[:157] + '...'))
+        if not advisor.findings:
+            self.stdout.write('Brak pełnych skanów i sortowań w temp B-tree.')
+
+        suggestions = list(advisor.suggestions())
+        if not suggestions:
+            return
+        self.stdout.write(self.style.MIGRATE_HEADING('Proponowane indeksy:'))
+        for model, fields, hits in suggestions:
+            owner = model.__name__ if model is not None else '?'
+            self.stdout.write('  %s: models.Index(fields=%r)  # zapytań: %d' % (owner, fields, hits))
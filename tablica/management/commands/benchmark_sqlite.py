@@ -0,0 +1,135 @@
+import os
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+
+from tablica.writer import WriteQueue
+
+PROFILES = {
+    # domyślna konfiguracja Django: rollback journal, BEGIN DEFERRED
+    'rollback': {'ENGINE': 'django.db.backends.sqlite3', 'OPTIONS': {}},
+    'wal': {'ENGINE': 'trelloboard.sqlite3', 'OPTIONS': {'transaction_mode': 'IMMEDIATE'}},
+    # jak "wal", ale zapisy idą przez jeden wątek z group commit (tablica/writer.py)
+    'queue': {'ENGINE': 'trelloboard.sqlite3', 'OPTIONS': {'transaction_mode': 'IMMEDIATE'}},
+}
+
+
+class Worker(threading.Thread):
+
+    def __init__(self, alias, operation, deadline):
+        super().__init__()
+        self.alias = alias
+        self.operation = operation
+        self.deadline = deadline
+        self.done = 0
+        self.errors = 0
+        self.latencies = []
+
+    def run(self):
+        connection = connections[self.alias]
+        try:
+            while (start := time.perf_counter()) < self.deadline:
+                try:
+                    self.operation(connection)
+                    self.done += 1
+                except OperationalError:
+                    self.errors += 1
+                self.latencies.append(time.perf_counter() - start)
+        finally:
+            connection.close()
+
+
+def insert(alias):
+    # odczyt przed zapisem w tej samej transakcji - typowy wzorzec
+    # (walidacja, liczniki), który w trybie DEFERRED kończy się blokadą
+    with connections[alias].cursor() as cursor:
+        cursor.execute('SELECT MAX(id) FROM bench')
+        cursor.execute('INSERT INTO bench (value) VALUES (%s)', ['x'])
+
+
+def write(connection):
+    with transaction.atomic(using=connection.alias):
+        insert(connection.alias)
+
+
+def read(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT COUNT(*), MAX(id) FROM bench')
+        cursor.fetchone()
+
+
+class Command(BaseCommand):
+    help = (
+        'Przepustowość czytających i zapisujących wątków: rollback journal, '
+        'WAL + BEGIN IMMEDIATE oraz WAL z kolejką zapisów.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=5.0)
+        parser.add_argument(
+            '--synchronous', choices=['OFF', 'NORMAL', 'FULL'],
+            help='PRAGMA synchronous dla profili "wal" i "queue" (domyślnie NORMAL z backendu)',
+        )
+        parser.add_argument('--profile', choices=sorted(PROFILES), nargs='+', default=['rollback', 'wal', 'queue'])
+
+    def handle(self, *args, **options):
+        self.stdout.write('%-10s %10s %10s %14s %12s %12s' % (
+            'profile', 'reads/s', 'writes/s', 'write p99 [ms]', 'read errors', 'write errors'
+        ))
+        with tempfile.TemporaryDirectory() as directory:
+            for name in options['profile']:
+                path = os.path.join(directory, '%s.sqlite3' % name)
+                reads, writes = self.run_profile(name, path, options)
+                seconds = options['seconds']
+                latencies = sorted(latency for w in writes for latency in w.latencies)
+                p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0
+                self.stdout.write('%-10s %10.0f %10.0f %14.1f %12d %12d' % (
+                    name,
+                    sum(w.done for w in reads) / seconds,
+                    sum(w.done for w in writes) / seconds,
+                    p99,
+                    sum(w.errors for w in reads),
+                    sum(w.errors for w in writes),
+                ))
+
+    def run_profile(self, name, path, options):
+        alias = 'benchmark_%s' % name
+        profile = PROFILES[name]
+        if options['synchronous'] and profile['ENGINE'] == 'trelloboard.sqlite3':
+            pragmas = {'synchronous': options['synchronous']}
+            profile = {**profile, 'OPTIONS': {**profile['OPTIONS'], 'pragmas': pragmas}}
+        # configure_settings uzupełnia domyślne klucze (i wymaga aliasu "default")
+        connections.settings[alias] = connections.configure_settings({
+            DEFAULT_DB_ALIAS: connections.settings[DEFAULT_DB_ALIAS],
+            alias: {**profile, 'NAME': path},
+        })[alias]
+        try:
+            connection = connections[alias]
+            with connection.cursor() as cursor:
+                cursor.execute('CREATE TABLE bench (id INTEGER PRIMARY KEY, value TEXT)')
+            connection.close()
+
+            operation, writer = write, None
+            if name == 'queue':
+                writer = WriteQueue(alias).start()
+
+                def operation(connection):
+                    writer.call(insert, alias)
+
+            deadline = time.perf_counter() + options['seconds']
+            reads = [Worker(alias, read, deadline) for _ in range(options['readers'])]
+            writes = [Worker(alias, operation, deadline) for _ in range(options['writers'])]
+            for worker in reads + writes:
+                worker.start()
+            for worker in reads + writes:
+                worker.join()
+            if writer is not None:
+                writer.stop()
+            return reads, writes
+        finally:
+            del connections.settings[alias]
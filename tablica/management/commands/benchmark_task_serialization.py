@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tablica.fastpath import FastTaskSerializer
+from tablica.management.scratch import scratch_database, seed_boards
+from tablica.models import Task
+from tablica.queries import task_queryset
+from tablica.serializers import TaskSerializer
+
+
+def measure(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+class Command(BaseCommand):
+    help = 'Porównuje czas serializacji listy zadań: TaskSerializer vs FastTaskSerializer.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000])
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            seeded = 0
+            self.stdout.write('%10s %14s %14s %8s' % ('rows', 'serializer [s]', 'fast path [s]', 'speedup'))
+            for rows in sorted(options['rows']):
+                if rows > seeded:
+                    seed_boards(projects=1, tasks_per_project=rows - seeded, users=50, seed=rows)
+                    seeded = rows
+                ids = list(Task.objects.order_by('pk').values_list('pk', flat=True)[:rows])
+
+                def slow():
+                    return TaskSerializer(task_queryset().filter(pk__in=ids), many=True).data
+
+                def fast():
+                    serializer = FastTaskSerializer()
+                    return serializer.serialize(serializer.values(Task.objects.filter(pk__in=ids)))
+
+                slow_time = measure(slow, options['repeat'])
+                fast_time = measure(fast, options['repeat'])
+                self.stdout.write('%10d %14.3f %14.3f %7.1fx' % (
+                    rows, slow_time, fast_time, slow_time / fast_time
+                ))
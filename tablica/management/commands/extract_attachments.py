@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from tablica.extractors import extract_attachment, get_executor, run_extraction
+from tablica.models import Attachment
+from tablica.sharding import shards
+
+CHUNK_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = (
+        'Wyciąga tekst załączników do wyszukiwarki na każdym shardzie: oczekujące '
+        '(np. po import_board) albo wszystkie z --all.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Także załączniki już przetworzone.')
+        parser.add_argument('--inline', action='store_true', help='Bez puli wątków, w bieżącym wątku.')
+
+    def handle(self, *args, **options):
+        for alias in shards():
+            queryset = Attachment.objects.using(alias).order_by('pk')
+            if not options['all']:
+                queryset = queryset.filter(content_extracted_at__isnull=True)
+            ids = list(queryset.values_list('pk', flat=True))
+            if options['inline']:
+                updated = sum(extract_attachment(pk, alias) for pk in ids)
+            else:
+                executor = get_executor()
+                updated = 0
+                for start in range(0, len(ids), CHUNK_SIZE):
+                    futures = [executor.submit(run_extraction, pk, alias) for pk in ids[start:start + CHUNK_SIZE]]
+                    updated += sum(future.result() for future in futures)
+            self.stdout.write(f'{alias}: przetworzono {updated} z {len(ids)} załączników')
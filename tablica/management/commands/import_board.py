@@ -0,0 +1,37 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tablica.importer import BATCH_SIZE, BoardImporter, ImportFormatError, iter_file_records
+from tablica.sharding import choose_shard, use_shard
+
+
+class Command(BaseCommand):
+    help = 'Importuje tablice z pliku NDJSON/JSON (format eksportu) albo z eksportu Trello.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--owner', required=True, help='Nazwa użytkownika - właściciel i autor domyślny.')
+        parser.add_argument('--format', dest='import_format', default='auto',
+                            choices=['auto', 'ndjson', 'json', 'trello'])
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            owner = User.objects.get(username=options['owner'])
+        except User.DoesNotExist:
+            raise CommandError(f'Użytkownik {options["owner"]!r} nie istnieje.')
+
+        with open(options['path'], 'rb') as stream, use_shard(choose_shard()):
+            try:
+                records = iter_file_records(stream, options['import_format'], options['path'])
+                result = BoardImporter(owner, batch_size=options['batch_size']).run(records)
+            except ImportFormatError as e:
+                raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            'Zaimportowano: projekty %(projects)d, zadania %(tasks)d, komentarze %(comments)d, '
+            'załączniki %(attachments)d, pominięte %(skipped)d' % {
+                key: result.get(key, 0)
+                for key in ('projects', 'tasks', 'comments', 'attachments', 'skipped')
+            }
+        ))
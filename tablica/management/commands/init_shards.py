@@ -0,0 +1,46 @@
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from tablica.models import Project
+from tablica.sharding import is_sharded, mirror_users, register_projects, seed_sequences, shards
+
+CHUNK_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = (
+        'Przygotowuje shardy z TABLICA["SHARDS"]: migracje, zakresy id, '
+        'kopie użytkowników i katalog projektów. Można uruchamiać wielokrotnie.'
+    )
+
+    def handle(self, *args, **options):
+        if not is_sharded():
+            raise CommandError('TABLICA["SHARDS"] zawiera jeden shard - nie ma czego przygotować.')
+        aliases = shards()
+        if aliases[0] != DEFAULT_DB_ALIAS:
+            raise CommandError('Pierwszym shardem musi być "default".')
+        for alias in aliases:
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f'{alias}: init_shards obsługuje tylko shardy SQLite.')
+
+        for alias in aliases:
+            call_command('migrate', database=alias, verbosity=0)
+            seed_sequences(alias)
+
+        users = User.objects.using(DEFAULT_DB_ALIAS).order_by('pk')
+        batch = []
+        for user in users.iterator(chunk_size=CHUNK_SIZE):
+            batch.append(user)
+            if len(batch) == CHUNK_SIZE:
+                mirror_users(batch)
+                batch = []
+        if batch:
+            mirror_users(batch)
+
+        for alias in aliases:
+            project_ids = list(Project.objects.using(alias).values_list('pk', flat=True))
+            register_projects(project_ids, alias)
+            self.stdout.write(f'{alias}: projekty {len(project_ids)}')
+        self.stdout.write(self.style.SUCCESS(f'Shardy gotowe, użytkownicy: {users.count()}.'))
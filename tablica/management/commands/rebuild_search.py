@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from tablica.search import TABLE, is_available, rebuild_index
+from tablica.sharding import shards
+
+
+class Command(BaseCommand):
+    help = 'Przebudowuje indeks pełnotekstowy (FTS5) zadań, komentarzy i załączników na każdym shardzie.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--optimize', action='store_true', help='Tylko scala segmenty indeksu (FTS5 optimize).')
+
+    def handle(self, *args, **options):
+        for alias in shards():
+            if not is_available(alias):
+                raise CommandError(f'{alias}: wyszukiwanie FTS5 wymaga SQLite.')
+            connection = connections[alias]
+            with transaction.atomic(using=alias):
+                if options['optimize']:
+                    with connection.cursor() as cursor:
+                        cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+                else:
+                    rebuild_index(connection)
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT count(*) FROM {TABLE}')
+                self.stdout.write(f'{alias}: {cursor.fetchone()[0]} wpisów w indeksie')
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from tablica.counters import recount
+
+
+class Command(BaseCommand):
+    help = 'Przelicza od zera liczniki zadań, komentarzy i załączników w projektach i zadaniach.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', type=int, action='append', dest='projects',
+                            help='Tylko wskazane projekty (można podać wielokrotnie).')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        with transaction.atomic(using=options['database']):
+            updated = recount(options['projects'], using=options['database'])
+        self.stdout.write(self.style.SUCCESS(f'Przeliczono liczniki w {updated} projektach.'))
@@ -0,0 +1,42 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from tablica.conf import get_setting
+
+
+def copy_database(source_alias, replica_alias):
+    """Spójna kopia primary -> replika przez SQLite backup API."""
+    source = connections[source_alias]
+    source.ensure_connection()
+    target = sqlite3.connect(connections[replica_alias].settings_dict['NAME'])
+    try:
+        source.connection.backup(target)
+    finally:
+        target.close()
+
+
+class Command(BaseCommand):
+    help = 'Kopiuje bazę primary do replik SQLite (jednorazowo albo co --interval sekund).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--replica', action='append', help='Alias repliki (domyślnie TABLICA["READ_REPLICAS"])')
+        parser.add_argument('--interval', type=float, default=0, help='Odświeżanie co N sekund; 0 = jednorazowo')
+
+    def handle(self, *args, **options):
+        aliases = options['replica'] or get_setting('READ_REPLICAS')
+        if not aliases:
+            raise CommandError('Brak replik: podaj --replica albo ustaw TABLICA["READ_REPLICAS"].')
+        for alias in aliases:
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f'{alias}: sync_replica obsługuje tylko repliki SQLite.')
+        while True:
+            for alias in aliases:
+                start = time.perf_counter()
+                copy_database(DEFAULT_DB_ALIAS, alias)
+                self.stdout.write(f'{alias}: skopiowano w {time.perf_counter() - start:.2f}s')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
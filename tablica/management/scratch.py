@@ -0,0 +1,71 @@
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import connections
+from django.utils import timezone
+
+from tablica.counters import recount
+from tablica.models import Project, Task, Comment, Attachment, TaskStatus
+
+
+@contextmanager
+def scratch_database(alias='default'):
+    """
+    Tymczasowa baza testowa (jak w `manage.py test`) na potrzeby benchmarków
+    i analiz - nie dotyka danych z db.sqlite3.
+    """
+    connection = connections[alias]
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def seed_boards(projects=10, tasks_per_project=100, comments_per_task=2,
+                attachments_per_task=1, users=20, batch_size=2000, seed=0):
+    rng = random.Random(seed)
+    people = User.objects.bulk_create(
+        User(username=f'seed-{seed}-user-{i}', email=f'seed-{seed}-user-{i}@example.com') for i in range(users)
+    )
+    now = timezone.now()
+    statuses = list(TaskStatus.values)
+    boards = Project.objects.bulk_create(
+        Project(name=f'Projekt {i}', description='Opis ' * 20, owner=rng.choice(people))
+        for i in range(projects)
+    )
+    for board in boards:
+        board.members.set(rng.sample(people, min(5, len(people))))
+        tasks = Task.objects.bulk_create(
+            (
+                Task(
+                    project=board,
+                    title=f'Zadanie {board.pk}-{i}',
+                    description='Opis zadania ' * 10,
+                    assigned_to=rng.choice(people + [None]),
+                    status=rng.choice(statuses),
+                    created_at=now - timedelta(minutes=rng.randrange(100000)),
+                )
+                for i in range(tasks_per_project)
+            ),
+            batch_size=batch_size,
+        )
+        Comment.objects.bulk_create(
+            (
+                Comment(task=task, author=rng.choice(people), content='Komentarz ' * 5)
+                for task in tasks for _ in range(comments_per_task)
+            ),
+            batch_size=batch_size,
+        )
+        Attachment.objects.bulk_create(
+            (
+                Attachment(task=task, file=f'attachments/seed-{task.pk}-{i}.txt')
+                for task in tasks for i in range(attachments_per_task)
+            ),
+            batch_size=batch_size,
+        )
+    # bulk_create omija sygnały, liczniki liczymy na końcu (jak importer)
+    recount([board.pk for board in boards])
+    return boards
@@ -0,0 +1,29 @@
+"""
+Proste liczniki w pamięci procesu (np. przekroczenia budżetów czasu SQL),
+do podglądu przez /api/metrics/ i strojenia ustawień.
+"""
+import threading
+from collections import Counter
+
+_counters = Counter()
+_lock = threading.Lock()
+
+
+def incr(name, label='', amount=1):
+    with _lock:
+        _counters[name, label] += amount
+
+
+def snapshot():
+    """{nazwa: {etykieta: wartość}}"""
+    with _lock:
+        items = list(_counters.items())
+    result = {}
+    for (name, label), value in sorted(items):
+        result.setdefault(name, {})[label] = value
+    return result
+
+
+def reset():
+    with _lock:
+        _counters.clear()
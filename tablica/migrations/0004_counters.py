@@ -0,0 +1,69 @@
+# Generated by ProjektZAI 5.2.1 on 2026-10-17 02:57
+
+from django.db import migrations, models
+
+
+# liczniki od zera dla istniejących danych; SQL zamrożony tutaj, bo kod
+# aplikacji (tablica/counters.py) zmienia się razem z modelami
+RECOUNT_TASKS = """
+UPDATE tablica_task SET
+    comment_count = (SELECT COUNT(*) FROM tablica_comment c WHERE c.task_id = tablica_task.id),
+    attachment_count = (SELECT COUNT(*) FROM tablica_attachment a WHERE a.task_id = tablica_task.id)
+"""
+
+RECOUNT_PROJECTS = """
+UPDATE tablica_project SET
+    task_count = (SELECT COUNT(*) FROM tablica_task t WHERE t.project_id = tablica_project.id),
+    open_task_count = (
+        SELECT COUNT(*) FROM tablica_task t WHERE t.project_id = tablica_project.id AND t.status <> 'DONE'
+    ),
+    comment_count = (
+        SELECT COUNT(*) FROM tablica_comment c JOIN tablica_task t ON t.id = c.task_id
+        WHERE t.project_id = tablica_project.id
+    ),
+    attachment_count = (
+        SELECT COUNT(*) FROM tablica_attachment a JOIN tablica_task t ON t.id = a.task_id
+        WHERE t.project_id = tablica_project.id
+    )
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tablica', '0003_task_comment_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='attachment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='open_task_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='task_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='attachment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunSQL([RECOUNT_TASKS, RECOUNT_PROJECTS], migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by ProjektZAI 5.2.1 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tablica', '0005_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectShard',
+            fields=[
+                ('project_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('shard', models.CharField(db_index=True, max_length=64)),
+            ],
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by ProjektZAI 5.2.1 on 2026-10-17 11:40
+
+from django.db import migrations
+
+# stan schematu z tej migracji (aktualny jest w tablica/search.py)
+SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE tablica_search USING fts5(
+        title, body, kind UNINDEXED, object_id UNINDEXED, task_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER tablica_task_search_insert AFTER INSERT ON tablica_task BEGIN
+        INSERT INTO tablica_search (rowid, title, body, kind, object_id, task_id)
+        VALUES (new.id * 2, new.title, new.description, 'task', new.id, new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER tablica_task_search_update AFTER UPDATE OF title, description ON tablica_task
+    WHEN old.title IS NOT new.title OR old.description IS NOT new.description BEGIN
+        UPDATE tablica_search SET title = new.title, body = new.description WHERE rowid = new.id * 2;
+    END
+    """,
+    """
+    CREATE TRIGGER tablica_task_search_delete AFTER DELETE ON tablica_task BEGIN
+        DELETE FROM tablica_search WHERE rowid = old.id * 2;
+    END
+    """,
+    """
+    CREATE TRIGGER tablica_comment_search_insert AFTER INSERT ON tablica_comment BEGIN
+        INSERT INTO tablica_search (rowid, title, body, kind, object_id, task_id)
+        VALUES (new.id * 2 + 1, '', new.content, 'comment', new.id, new.task_id);
+    END
+    """,
+    """
+    CREATE TRIGGER tablica_comment_search_update AFTER UPDATE OF content, task_id ON tablica_comment
+    WHEN old.content IS NOT new.content OR old.task_id IS NOT new.task_id BEGIN
+        UPDATE tablica_search SET body = new.content, task_id = new.task_id WHERE rowid = new.id * 2 + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER tablica_comment_search_delete AFTER DELETE ON tablica_comment BEGIN
+        DELETE FROM tablica_search WHERE rowid = old.id * 2 + 1;
+    END
+    """,
+    """
+    INSERT INTO tablica_search (rowid, title, body, kind, object_id, task_id)
+    SELECT id * 2, title, description, 'task', id, id FROM tablica_task
+    """,
+    """
+    INSERT INTO tablica_search (rowid, title, body, kind, object_id, task_id)
+    SELECT id * 2 + 1, '', content, 'comment', id, task_id FROM tablica_comment
+    """,
+]
+
+DROP_SCHEMA = [
+    'DROP TRIGGER IF EXISTS tablica_task_search_insert',
+    'DROP TRIGGER IF EXISTS tablica_task_search_update',
+    'DROP TRIGGER IF EXISTS tablica_task_search_delete',
+    'DROP TRIGGER IF EXISTS tablica_comment_search_insert',
+    'DROP TRIGGER IF EXISTS tablica_comment_search_update',
+    'DROP TRIGGER IF EXISTS tablica_comment_search_delete',
+    'DROP TABLE IF EXISTS tablica_search',
+]
+
+
+def create_search(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in SCHEMA:
+        schema_editor.execute(sql)
+
+
+def drop_search(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_SCHEMA:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tablica', '0006_projectshard'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search, drop_search),
+    ]
@@ -0,0 +1,143 @@
+# Generated by ProjektZAI 5.2.1 on 2026-10-17 13:05
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+
+# stan schematu z tej migracji (aktualny jest w tablica/search.py);
+# indeks obejmuje teraz załączniki, a rowid to 3 * id + rodzaj
+SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE tablica_search USING fts5(
+        title, body, kind UNINDEXED, object_id UNINDEXED, task_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER tablica_task_search_insert AFTER INSERT ON tablica_task BEGIN
+        INSERT INTO tablica_search (rowid, title, body, kind, object_id, task_id)
+        VALUES (new.id * 3, new.title, new.description, 'task', new.id, new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER tablica_task_search_update AFTER UPDATE OF title, description ON tablica_task
+    WHEN old.title IS NOT new.title OR old.description IS NOT new.description BEGIN
+        UPDATE tablica_search SET title = new.title, body = new.description WHERE rowid = new.id * 3;
+    END
+    """,
+    """
+    CREATE TRIGGER tablica_task_search_delete AFTER DELETE ON tablica_task BEGIN
+        DELETE FROM tablica_search WHERE rowid = old.id * 3;
+    END
+    """,
+    """
+    CREATE TRIGGER tablica_comment_search_insert AFTER INSERT ON tablica_comment BEGIN
+        INSERT INTO tablica_search (rowid, title, body, kind, object_id, task_id)
+        VALUES (new.id * 3 + 1, '', new.content, 'comment', new.id, new.task_id);
+    END
+    """,
+    """
+    CREATE TRIGGER tablica_comment_search_update AFTER UPDATE OF content, task_id ON tablica_comment
+    WHEN old.content IS NOT new.content OR old.task_id IS NOT new.task_id BEGIN
+        UPDATE tablica_search SET body = new.content, task_id = new.task_id WHERE rowid = new.id * 3 + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER tablica_comment_search_delete AFTER DELETE ON tablica_comment BEGIN
+        DELETE FROM tablica_search WHERE rowid = old.id * 3 + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER tablica_attachment_search_insert AFTER INSERT ON tablica_attachment BEGIN
+        INSERT INTO tablica_search (rowid, title, body, kind, object_id, task_id)
+        VALUES (
+            new.id * 3 + 2, substr(new.file, length(rtrim(new.file, replace(new.file, '/', ''))) + 1),
+            new.content_text, 'attachment', new.id, new.task_id
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER tablica_attachment_search_update
+    AFTER UPDATE OF file, content_text, task_id ON tablica_attachment
+    WHEN old.file IS NOT new.file OR old.content_text IS NOT new.content_text
+        OR old.task_id IS NOT new.task_id BEGIN
+        UPDATE tablica_search
+        SET title = substr(new.file, length(rtrim(new.file, replace(new.file, '/', ''))) + 1),
+            body = new.content_text, task_id = new.task_id
+        WHERE rowid = new.id * 3 + 2;
+    END
+    """,
+    """
+    CREATE TRIGGER tablica_attachment_search_delete AFTER DELETE ON tablica_attachment BEGIN
+        DELETE FROM tablica_search WHERE rowid = old.id * 3 + 2;
+    END
+    """,
+    """
+    INSERT INTO tablica_search (rowid, title, body, kind, object_id, task_id)
+    SELECT id * 3, title, description, 'task', id, id FROM tablica_task
+    """,
+    """
+    INSERT INTO tablica_search (rowid, title, body, kind, object_id, task_id)
+    SELECT id * 3 + 1, '', content, 'comment', id, task_id FROM tablica_comment
+    """,
+    """
+    INSERT INTO tablica_search (rowid, title, body, kind, object_id, task_id)
+    SELECT id * 3 + 2, substr(file, length(rtrim(file, replace(file, '/', ''))) + 1),
+        content_text, 'attachment', id, task_id
+    FROM tablica_attachment
+    """,
+]
+
+DROP_SCHEMA = [
+    'DROP TRIGGER IF EXISTS tablica_task_search_insert',
+    'DROP TRIGGER IF EXISTS tablica_task_search_update',
+    'DROP TRIGGER IF EXISTS tablica_task_search_delete',
+    'DROP TRIGGER IF EXISTS tablica_comment_search_insert',
+    'DROP TRIGGER IF EXISTS tablica_comment_search_update',
+    'DROP TRIGGER IF EXISTS tablica_comment_search_delete',
+    'DROP TRIGGER IF EXISTS tablica_attachment_search_insert',
+    'DROP TRIGGER IF EXISTS tablica_attachment_search_update',
+    'DROP TRIGGER IF EXISTS tablica_attachment_search_delete',
+    'DROP TABLE IF EXISTS tablica_search',
+]
+
+
+def create_search(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_SCHEMA + SCHEMA:
+        schema_editor.execute(sql)
+
+
+def restore_search(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_SCHEMA:
+        schema_editor.execute(sql)
+    import_module('tablica.migrations.0007_search').create_search(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tablica', '0007_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attachment',
+            name='content_extracted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='attachment',
+            name='content_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='attachment',
+            index=models.Index(condition=models.Q(('content_extracted_at__isnull', True)), fields=['id'], name='attachment_pending_idx'),
+        ),
+        migrations.RunPython(create_search, restore_search),
+    ]
@@ -0,0 +1,28 @@
+# Generated by ProjektZAI 5.2.1 on 2026-10-17 16:40
+
+import django.db.models.lookups
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tablica', '0009_connection_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_due_idx',
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(django.db.models.lookups.IsNull(models.F('due_date'), True), models.F('due_date'), name='task_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(django.db.models.lookups.IsNull(models.F('due_date'), True), models.OrderBy(models.F('due_date'), descending=True), name='task_due_desc_idx'),
+        ),
+    ]
@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models import F
+from django.db.models.lookups import IsNull
 from django.contrib.auth.models import User
 from django.utils import timezone
 
@@ -11,6 +13,50 @@ class TaskStatus(models.TextChoices):
     IN_PROGRESS = 'INPR', 'In Progress'
     DONE = 'DONE', 'Done'
 
+class AtomicSaveModel(models.Model):
+    """
+    save() w transakcji, żeby odbiorniki post_save (liczniki w projekcie
+    i zadaniu) wykonały się w tej samej transakcji co sam zapis.
+    """
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
+
+class TrackedFieldsMixin:
+    """Zapamiętuje wartości `tracked_fields` z chwili odczytu z bazy."""
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_tracked_fields()
+        return instance
+
+    def remember_tracked_fields(self):
+        deferred = self.get_deferred_fields()
+        self._loaded_values = {
+            name: getattr(self, name) for name in self.tracked_fields if name not in deferred
+        }
+
+    def loaded_value(self, name):
+        return getattr(self, '_loaded_values', {}).get(name)
+
+    def reload_tracked_fields(self, using):
+        """
+        Wartości `tracked_fields` z wiersza w bazie. Wołane w transakcji zapisu
+        (BEGIN IMMEDIATE), więc widzą zapisy innych żądań, a nie stan z odczytu.
+        """
+        row = type(self)._base_manager.using(using).filter(pk=self.pk).values(*self.tracked_fields).first()
+        if row is not None:
+            self._loaded_values = row
+
+
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     bio = models.TextField(blank=True)
@@ -26,17 +72,26 @@ class Project(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
+    task_count = models.PositiveIntegerField(default=0, editable=False)
+    open_task_count = models.PositiveIntegerField(default=0, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    attachment_count = models.PositiveIntegerField(default=0, editable=False)
 
     objects = models.Manager()
     active = ActiveProjectManager()
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='project_created_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
-class Task(models.Model):
+class Task(TrackedFieldsMixin, AtomicSaveModel):
+    tracked_fields = ('project_id', 'status')
+
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='tasks')
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True)
@@ -44,23 +99,73 @@ class Task(models.Model):
     status = models.CharField(max_length=20, choices=TaskStatus.choices, default=TaskStatus.TODO)
     due_date = models.DateField(null=True, blank=True)
     created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    attachment_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        # propozycje z `manage.py advise_indexes`
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='task_status_created_idx'),
+            models.Index(fields=['assigned_to', 'status'], name='task_assignee_status_idx'),
+            models.Index(fields=['created_at'], name='task_created_idx'),
+            # filtry i porządki połączeń GraphQL (tablica/connections.py)
+            models.Index(fields=['project', 'created_at'], name='task_project_created_idx'),
+            models.Index(fields=['assigned_to', 'created_at'], name='task_assignee_created_idx'),
+            # porządek po terminie z NULL-ami na końcu (pagination.nulls_last)
+            models.Index(IsNull(F('due_date'), True), F('due_date'), name='task_due_idx'),
+            models.Index(IsNull(F('due_date'), True), F('due_date').desc(), name='task_due_desc_idx'),
+        ]
 
     def __str__(self):
         return f'{self.title} ({self.project.name})'
 
-class Comment(models.Model):
+class Comment(TrackedFieldsMixin, AtomicSaveModel):
+    tracked_fields = ('task_id',)
+
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='comments')
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['task', 'created_at'], name='comment_task_created_idx'),
+            models.Index(fields=['created_at'], name='comment_created_idx'),
+            models.Index(fields=['author', 'created_at'], name='comment_author_created_idx'),
+        ]
 
     def __str__(self):
         return f'Comment by {self.author.username} on {self.task.title}'
 
-class Attachment(models.Model):
+class Attachment(TrackedFieldsMixin, AtomicSaveModel):
+    tracked_fields = ('task_id', 'file')
+
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='attachments')
     file = models.FileField(upload_to='attachments/')
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # tekst pliku do wyszukiwarki, wypełniany w tle (tablica/extractors.py)
+    content_text = models.TextField(blank=True, default='', editable=False)
+    content_extracted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['id'], condition=models.Q(content_extracted_at__isnull=True),
+                name='attachment_pending_idx',
+            ),
+            models.Index(fields=['task', 'uploaded_at'], name='attachment_task_uploaded_idx'),
+            models.Index(fields=['uploaded_at'], name='attachment_uploaded_idx'),
+        ]
 
     def __str__(self):
         return f'Attachment for {self.task.title}'
+
+class ProjectShard(models.Model):
+    """Katalog shardów: w której bazie z TABLICA['SHARDS'] leży projekt (tablica/sharding.py)."""
+    project_id = models.BigIntegerField(primary_key=True)
+    shard = models.CharField(max_length=64, db_index=True)
+
+    def __str__(self):
+        return f'{self.project_id} -> {self.shard}'
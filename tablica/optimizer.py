@@ -0,0 +1,115 @@
+"""
+Projekcja kolumn w resolverach GraphQL. Z zestawu pól zapytania (razem
+z fragmentami; aliasy wskazują te same pola) budowane są only(),
+select_related i Prefetch dla querysetu resolvera, więc SQLite czyta tylko
+potrzebne kolumny, a Python buduje tylko potrzebne obiekty.
+
+Pola bez odpowiednika w modelu (własne resolvery) są pomijane; relacji,
+których optymalizator nie załadował, pilnuje tablica/loaders.py.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from graphene.utils.str_converters import to_snake_case
+from graphql import FieldNode, FragmentSpreadNode, InlineFragmentNode
+
+
+def selected_fields(info, selection_sets):
+    """{nazwa pola modelu: [zestawy pól pod nim]} z kilku zestawów naraz."""
+    fields = {}
+
+    def collect(selection_set):
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                name = selection.name.value
+                if name.startswith('__'):
+                    continue
+                nested = fields.setdefault(to_snake_case(name), [])
+                if selection.selection_set is not None:
+                    nested.append(selection.selection_set)
+            elif isinstance(selection, InlineFragmentNode):
+                collect(selection.selection_set)
+            elif isinstance(selection, FragmentSpreadNode):
+                fragment = info.fragments.get(selection.name.value)
+                if fragment is not None:
+                    collect(fragment.selection_set)
+
+    for selection_set in selection_sets:
+        collect(selection_set)
+    return fields
+
+
+def plan(model, info, selection_sets, prefix=''):
+    """(pola do only(), ścieżki select_related, obiekty Prefetch) dla `model`."""
+    only = {prefix + model._meta.pk.name}
+    related, prefetches = [], []
+    for name, nested in selected_fields(info, selection_sets).items():
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue
+        path = prefix + name
+        if not field.is_relation:
+            only.add(path)
+        elif field.many_to_one or (field.one_to_one and field.concrete):
+            only.add(path)
+            if nested:
+                related.append(path)
+                nested_only, nested_related, nested_prefetches = plan(
+                    field.related_model, info, nested, path + '__'
+                )
+                only |= nested_only
+                related += nested_related
+                prefetches += nested_prefetches
+        elif field.one_to_many or field.many_to_many:
+            prefetches.append(Prefetch(path, queryset=relation_queryset(model, name, info, nested)))
+    return only, related, prefetches
+
+
+def apply(queryset, info, selection_sets, required=()):
+    only, related, prefetches = plan(queryset.model, info, selection_sets)
+    queryset = queryset.only(*only, *required)
+    if related:
+        queryset = queryset.select_related(*related)
+    if prefetches:
+        queryset = queryset.prefetch_related(*prefetches)
+    return queryset
+
+
+def field_selections(info):
+    return [node.selection_set for node in info.field_nodes if node.selection_set is not None]
+
+
+def node_selections(info):
+    """Zestawy pól pod edges { node } połączenia Relay (tablica/connections.py)."""
+    edges = selected_fields(info, field_selections(info)).get('edges', [])
+    return selected_fields(info, edges).get('node', [])
+
+
+def optimize(queryset, info, ordering=(), selection_sets=None):
+    """
+    `queryset` resolvera ograniczony do pól, o które pyta zapytanie (albo
+    do `selection_sets`); `ordering` - pola potrzebne dodatkowo do scalania
+    wyników z shardów i kursorów.
+    """
+    if selection_sets is None:
+        selection_sets = field_selections(info)
+        if not selection_sets:
+            return queryset
+    return apply(queryset, info, selection_sets, [name.lstrip('-') for name in ordering])
+
+
+def relation_queryset(model, name, info, selection_sets=None):
+    """
+    Queryset obiektów relacji `name` modelu `model` (do Prefetch) z polami
+    z `selection_sets` (domyślnie - pola bieżącego resolvera `info`).
+    Zawiera klucz obcy, po którym prefetch łączy obiekty z rodzicami.
+    """
+    field = model._meta.get_field(name)
+    queryset = field.related_model._default_manager.all()
+    if selection_sets is None:
+        selection_sets = field_selections(info)
+    if not selection_sets:
+        return queryset
+    # odwrotna relacja FK - kolumna wskazująca rodzica
+    required = [field.field.name] if field.one_to_many else []
+    return apply(queryset, info, selection_sets, required)
@@ -0,0 +1,248 @@
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import BooleanField, ExpressionWrapper, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .conf import get_setting
+from .sharding import current_shard, is_sharded, merge_sorted, scatter
+
+
+def encode_cursor(values, reverse=False):
+    payload = json.dumps({'v': values, 'r': int(reverse)}, separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        return list(payload['v']), bool(payload.get('r'))
+    except (ValueError, KeyError, TypeError):
+        raise ValueError('Invalid cursor')
+
+
+def split_ordering(ordering):
+    return [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+
+
+def invert_ordering(ordering):
+    return [name[1:] if name.startswith('-') else '-' + name for name in ordering]
+
+
+NULL_FLAG = '%s_is_null'
+
+
+def nulls_last(queryset, ordering):
+    """
+    (queryset, porządek) z flagą NULL_FLAG przed każdym polem `ordering`,
+    które może być NULL - NULL-e trafiają na koniec w obu kierunkach, a flaga
+    jest częścią klucza (kursora) jak każde inne pole.
+    """
+    result = []
+    for name, descending in split_ordering(ordering):
+        if queryset.model._meta.get_field(name).null:
+            flag = NULL_FLAG % name
+            queryset = queryset.annotate(**{
+                flag: ExpressionWrapper(Q(**{'%s__isnull' % name: True}), output_field=BooleanField())
+            })
+            result.append(flag)
+        result.append('-' + name if descending else name)
+    return queryset, result
+
+
+def keyset_filter(ordering, values):
+    """
+    Warunek "wiersz leży za pozycją `values`" dla porządku `ordering`,
+    np. dla ('created_at', 'id'): created_at > c OR (created_at = c AND id > i).
+    Wartość None pasuje tylko do NULL - kolejność względem wartości
+    wyznacza flaga z nulls_last() przed tym polem.
+    """
+    condition = Q()
+    equal = Q()
+    for (name, descending), value in zip(split_ordering(ordering), values):
+        if value is None:
+            equal &= Q(**{'%s__isnull' % name: True})
+            continue
+        lookup = '%s__lt' % name if descending else '%s__gt' % name
+        condition |= equal & Q(**{lookup: value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+def item_value(item, name):
+    if isinstance(item, dict):
+        return item[name]
+    return getattr(item, name)
+
+
+def item_position(item, ordering):
+    return [item_value(item, name) for name, _ in split_ordering(ordering)]
+
+
+def ordering_field(model, name):
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        # flaga z nulls_last()
+        if name.endswith(NULL_FLAG % ''):
+            return BooleanField()
+        raise
+
+
+def parse_position(model, ordering, values):
+    fields = [ordering_field(model, name) for name, _ in split_ordering(ordering)]
+    if len(values) != len(fields):
+        raise ValueError('Invalid cursor')
+    return [field.to_python(value) for field, value in zip(fields, values)]
+
+
+def paginate_keyset(queryset, ordering, page_size, position=None, reverse=False):
+    """
+    Zwraca (wiersze, czy_są_dalsze) dla strony zaczynającej się za `position`.
+    Przy `reverse` strona jest pobierana wstecz i odwracana z powrotem.
+    """
+    effective = invert_ordering(ordering) if reverse else list(ordering)
+    if position is not None:
+        queryset = queryset.filter(keyset_filter(effective, position))
+    rows = list(queryset.order_by(*effective)[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if reverse:
+        rows.reverse()
+    return rows, has_more
+
+
+def paginate_shards(queryset, ordering, page_size, position=None, reverse=False):
+    """
+    paginate_keyset na wszystkich shardach naraz: każdy zwraca swoją stronę,
+    strony są scalane w porządku `ordering` i przycinane. Wiersze .values()
+    dostają klucz '_shard'.
+    """
+    if not is_sharded():
+        return paginate_keyset(queryset, ordering, page_size, position, reverse)
+
+    def page():
+        rows, has_more = paginate_keyset(queryset.all(), ordering, page_size, position, reverse)
+        for row in rows:
+            if isinstance(row, dict):
+                row['_shard'] = current_shard.get()
+        return rows, has_more
+
+    pages = scatter(page)
+    rows = merge_sorted([rows for rows, _ in pages], ordering)
+    has_more = len(rows) > page_size or any(more for _, more in pages)
+    # wstecz bierzemy wiersze najbliższe kursora, czyli z końca
+    rows = rows[-page_size:] if reverse else rows[:page_size]
+    return rows, has_more
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginacja kursorowa po kluczu `ordering` (bez OFFSET i bez COUNT(*)).
+    Kursor jest nieprzezroczystym tokenem z wartościami klucza ostatniego
+    (lub pierwszego) wiersza strony.
+    """
+    ordering = ('created_at', 'id')
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def get_page_size(self, request):
+        page_size = get_setting('PAGE_SIZE')
+        if self.page_size_query_param in request.query_params:
+            try:
+                page_size = int(request.query_params[self.page_size_query_param])
+            except ValueError:
+                pass
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_position(self, request, model):
+        """(pozycja kursora albo None, czy wstecz) z parametrów żądania."""
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            values, reverse = decode_cursor(cursor)
+            return parse_position(model, self.ordering, values), reverse
+        except ValueError:
+            raise NotFound('Invalid cursor.')
+
+    def page_state(self, queryset, request):
+        """
+        Wersja strony, którą zwróci paginate_queryset - z kluczy i updated_at
+        jej wierszy, jednym zapytaniem z LIMIT po indeksie porządku. Zmienia
+        się też, gdy wiersz ze strony zniknie albo gdy za stroną pojawią się
+        lub znikną wiersze (następna strona).
+        """
+        position, reverse = self.get_position(request, queryset.model)
+        names = {name for name, _ in split_ordering(self.ordering)}
+        rows, has_more = paginate_shards(
+            queryset.values('pk', 'updated_at', *names), self.ordering,
+            self.get_page_size(request), position, reverse,
+        )
+        keys = ','.join('%s@%s' % (row['pk'], row['updated_at'].isoformat()) for row in rows)
+        return '%s|%d' % (keys, has_more)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        position, reverse = self.get_position(request, queryset.model)
+
+        rows, has_more = paginate_shards(
+            queryset, self.ordering, self.page_size, position, reverse
+        )
+        if reverse:
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.first = item_position(rows[0], self.ordering) if rows else None
+        self.last = item_position(rows[-1], self.ordering) if rows else None
+        if not rows and position is not None:
+            # pusta strona za kursorem - linki liczymy od pozycji kursora
+            self.first = self.last = position
+        return rows
+
+    def build_link(self, values, reverse):
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encode_cursor(values, reverse))
+
+    def get_next_link(self):
+        if not self.has_next or self.last is None:
+            return None
+        return self.build_link(self.last, False)
+
+    def get_previous_link(self):
+        if not self.has_previous or self.first is None:
+            return None
+        return self.build_link(self.first, True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class CreatedAtPagination(KeysetPagination):
+    ordering = ('created_at', 'id')
+
+
+class ProjectPagination(KeysetPagination):
+    ordering = ('-created_at', 'id')
@@ -0,0 +1,115 @@
+"""
+Zapytania utrwalone (Automatic Persisted Queries, protokół Apollo) i cache
+sparsowanych dokumentów GraphQL.
+
+Klient wysyła extensions.persistedQuery.sha256Hash bez `query`; przy
+pierwszym chybieniu dostaje błąd PERSISTED_QUERY_NOT_FOUND i ponawia
+z pełnym tekstem, który zapisujemy w cache Django pod tym skrótem. Potem
+wystarcza sam skrót - także w GET, więc odpowiedź może być cache'owana
+po drodze (TABLICA['GRAPHQL_GET_MAX_AGE']).
+
+Dokumenty po parse() i walidacji standardowymi regułami są trzymane w LRU
+w pamięci procesu (TABLICA['GRAPHQL_DOCUMENT_CACHE_SIZE']), po SHA-256
+tekstu. Reguła kosztu (tablica/complexity.py) zależy od zmiennych, więc
+jest sprawdzana przy każdym żądaniu.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from django.core.cache import cache
+from graphql import GraphQLError, parse, specified_rules, validate
+
+from .conf import get_setting
+
+CACHE_PREFIX = 'tablica:graphql:apq:'
+
+
+def query_hash(query):
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+def persisted_query(extensions):
+    """extensions.persistedQuery z żądania (obiekt albo JSON z GET) albo None."""
+    if isinstance(extensions, str):
+        try:
+            extensions = json.loads(extensions)
+        except ValueError:
+            raise GraphQLError('Pole extensions nie jest poprawnym JSON.', extensions={'code': 'BAD_REQUEST'})
+    if not isinstance(extensions, dict) or not isinstance(extensions.get('persistedQuery'), dict):
+        return None
+    return extensions['persistedQuery']
+
+
+def resolve_query(query, extensions):
+    """
+    Tekst zapytania dla żądania z `extensions`: z cache po skrócie albo
+    `query` zarejestrowane pod nim. Bez persistedQuery - `query` bez zmian.
+    """
+    persisted = persisted_query(extensions)
+    if persisted is None:
+        return query
+    if persisted.get('version') != 1:
+        raise GraphQLError(
+            'Nieobsługiwana wersja persistedQuery.', extensions={'code': 'PERSISTED_QUERY_NOT_SUPPORTED'}
+        )
+    digest = str(persisted.get('sha256Hash') or '').lower()
+    if not query:
+        query = cache.get(CACHE_PREFIX + digest)
+        if query is None:
+            # komunikat wg protokołu - klient ponawia z pełnym zapytaniem
+            raise GraphQLError('PersistedQueryNotFound', extensions={'code': 'PERSISTED_QUERY_NOT_FOUND'})
+        return query
+    if query_hash(query) != digest:
+        raise GraphQLError(
+            'sha256Hash nie pasuje do zapytania.', extensions={'code': 'PERSISTED_QUERY_HASH_MISMATCH'}
+        )
+    cache.set(CACHE_PREFIX + digest, query, get_setting('GRAPHQL_PERSISTED_QUERY_TIMEOUT'))
+    return query
+
+
+class DocumentCache:
+    """LRU: SHA-256 tekstu -> [dokument, błędy walidacji albo None przed walidacją]."""
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def entry(self, query):
+        key = query_hash(query)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        # GraphQLError przy błędzie składni - takich nie zapamiętujemy
+        entry = [parse(query), None]
+        with self.lock:
+            self.entries[key] = entry
+            while len(self.entries) > get_setting('GRAPHQL_DOCUMENT_CACHE_SIZE'):
+                self.entries.popitem(last=False)
+        return entry
+
+    def parse(self, query):
+        return self.entry(query)[0]
+
+    def validated(self, schema, query, max_errors=None):
+        """(dokument, błędy walidacji standardowymi regułami)."""
+        entry = self.entry(query)
+        if entry[1] is None:
+            # wyścig dwóch wątków najwyżej zwaliduje dokument dwa razy
+            entry[1] = validate(schema, entry[0], specified_rules, max_errors)
+        return entry[0], entry[1]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+
+
+documents = DocumentCache()
@@ -0,0 +1,44 @@
+from django.db.models import Prefetch
+
+from .fieldsets import wants, expands, join_path
+from .models import Project, Task, Comment, Attachment
+
+
+def defer_unwanted(queryset, selection, path, names):
+    deferred = [name for name in names if not wants(selection, path, name)]
+    return queryset.defer(*deferred) if deferred else queryset
+
+
+def comment_queryset(selection=None, path=''):
+    queryset = Comment.objects.all()
+    if wants(selection, path, 'author'):
+        queryset = queryset.select_related('author')
+    return defer_unwanted(queryset, selection, path, ['content'])
+
+
+def task_queryset(selection=None, path=''):
+    queryset = Task.objects.all()
+    if wants(selection, path, 'assigned_to'):
+        queryset = queryset.select_related('assigned_to')
+    if expands(selection, path, 'comments'):
+        queryset = queryset.prefetch_related(
+            Prefetch('comments', queryset=comment_queryset(selection, join_path(path, 'comments')))
+        )
+    if expands(selection, path, 'attachments'):
+        queryset = queryset.prefetch_related(
+            Prefetch('attachments', queryset=Attachment.objects.defer('content_text'))
+        )
+    return defer_unwanted(queryset, selection, path, ['description'])
+
+
+def project_queryset(selection=None, path=''):
+    queryset = Project.objects.all()
+    if wants(selection, path, 'owner'):
+        queryset = queryset.select_related('owner')
+    if wants(selection, path, 'members'):
+        queryset = queryset.prefetch_related('members')
+    if expands(selection, path, 'tasks'):
+        queryset = queryset.prefetch_related(
+            Prefetch('tasks', queryset=task_queryset(selection, join_path(path, 'tasks')))
+        )
+    return defer_unwanted(queryset, selection, path, ['description'])
@@ -1,8 +1,18 @@
 import graphene
-from django.db.models import Count, Avg
 from graphene_django import DjangoObjectType
-from .models import Project, Task, Comment, Attachment
+from .bulk import update_matching
+from .connections import connection_field, filtered, ordering_value, resolve_connection
+from .filters import AttachmentFilter, CommentFilter, TaskFilter
+from .loaders import batched, related_resolver
+from .models import Project, Task, Comment, Attachment, TaskStatus
+from .optimizer import optimize
+from .search import parse_filters, search
+from .sharding import gather, in_shard, shard_for
+from .stats import average_tasks_per_project, project_stats, status_summary
+from .writer import serialized
 from django.contrib.auth.models import User
+from graphql import GraphQLError
+from rest_framework.exceptions import ValidationError
 
 
 class UserType(DjangoObjectType):
@@ -11,96 +21,230 @@ class UserType(DjangoObjectType):
         fields = ("id", "username", "email")
 
 
+# relacje ładowane paczkami (tablica/loaders.py), listy z Query przez batched();
+# querysety Query ograniczone do zaznaczonych pól (tablica/optimizer.py);
+# długie listy jako połączenia Relay z kursorami (tablica/connections.py)
 class ProjectType(DjangoObjectType):
     class Meta:
         model = Project
         fields = "__all__"
 
+    resolve_owner = related_resolver("owner")
+    resolve_members = related_resolver("members")
+    resolve_tasks = related_resolver("tasks")
+
 class TaskType(DjangoObjectType):
     class Meta:
         model = Task
         fields = "__all__"
 
+    resolve_project = related_resolver("project")
+    resolve_assigned_to = related_resolver("assigned_to")
+    resolve_comments = related_resolver("comments")
+    resolve_attachments = related_resolver("attachments")
+
 class CommentType(DjangoObjectType):
     class Meta:
         model = Comment
         fields = "__all__"
 
+    resolve_task = related_resolver("task")
+    resolve_author = related_resolver("author")
+
 class AttachmentType(DjangoObjectType):
     class Meta:
         model = Attachment
-        fields = "__all__"
+        exclude = ("content_text", "content_extracted_at")
+
+    resolve_task = related_resolver("task")
+
+class StatusCountType(graphene.ObjectType):
+    status = graphene.String()
+    count = graphene.Int()
+
+
+class ProjectStatsType(graphene.ObjectType):
+    id = graphene.ID()
+    name = graphene.String()
+    task_count = graphene.Int()
+    comment_count = graphene.Int()
+    attachment_count = graphene.Int()
+    tasks_by_status = graphene.List(StatusCountType)
+
+    def resolve_tasks_by_status(self, info):
+        return [
+            StatusCountType(status=status, count=self['tasks_by_status'][status])
+            for status in TaskStatus.values
+        ]
+
+class SearchResultType(graphene.ObjectType):
+    type = graphene.String()
+    id = graphene.ID()
+    task_id = graphene.ID()
+    project_id = graphene.ID()
+    status = graphene.String()
+    score = graphene.Float()
+    snippet = graphene.String()
+
+class TaskFilterInput(graphene.InputObjectType):
+    """Warunki jak w TaskFilter (tablica/filters.py)."""
+    id = graphene.List(graphene.Int)
+    project = graphene.Int()
+    status = graphene.List(graphene.String)
+    assigned_to = graphene.Int()
+    unassigned = graphene.Boolean()
+    due_before = graphene.Date()
+    due_after = graphene.Date()
+    created_before = graphene.DateTime()
+    created_after = graphene.DateTime()
+
+
+class CommentFilterInput(graphene.InputObjectType):
+    """Warunki jak w CommentFilter (tablica/filters.py)."""
+    task = graphene.Int()
+    author = graphene.Int()
+    created_before = graphene.DateTime()
+    created_after = graphene.DateTime()
+
+
+class AttachmentFilterInput(graphene.InputObjectType):
+    """Warunki jak w AttachmentFilter (tablica/filters.py)."""
+    task = graphene.Int()
+    uploaded_before = graphene.DateTime()
+    uploaded_after = graphene.DateTime()
+
+
+# porządki połączeń - każdy ma indeks pod filtry z *FilterInput (tablica/models.py)
+class TaskOrder(graphene.Enum):
+    CREATED_AT = ('created_at', 'id')
+    CREATED_AT_DESC = ('-created_at', '-id')
+    DUE_DATE = ('due_date', 'id')
+    # id rosnąco - tak jak w indeksie task_due_desc_idx
+    DUE_DATE_DESC = ('-due_date', 'id')
+
+
+class CommentOrder(graphene.Enum):
+    CREATED_AT = ('created_at', 'id')
+    CREATED_AT_DESC = ('-created_at', '-id')
+
+
+class AttachmentOrder(graphene.Enum):
+    UPLOADED_AT = ('uploaded_at', 'id')
+    UPLOADED_AT_DESC = ('-uploaded_at', '-id')
+
+
+class TaskConnection(graphene.relay.Connection):
+    class Meta:
+        node = TaskType
+
+
+class CommentConnection(graphene.relay.Connection):
+    class Meta:
+        node = CommentType
+
+
+class AttachmentConnection(graphene.relay.Connection):
+    class Meta:
+        node = AttachmentType
+
+
+def task_connection(queryset, info, filter=None, order_by=None, **page):
+    queryset = filtered(TaskFilter, queryset, filter)
+    ordering = ordering_value(order_by, TaskOrder.CREATED_AT.value)
+    return resolve_connection(TaskConnection, queryset, info, ordering, **page)
+
 
 class Query(graphene.ObjectType):
     all_projects = graphene.List(ProjectType)
     project = graphene.Field(ProjectType, id=graphene.Int())
-    all_tasks = graphene.List(TaskType)
+    all_tasks = connection_field(TaskConnection, TaskFilterInput, TaskOrder)
     task = graphene.Field(TaskType, id=graphene.Int())
 
     active_projects = graphene.List(ProjectType)
     inactive_projects = graphene.List(ProjectType)
 
     recent_tasks = graphene.List(TaskType)
-    tasks_by_status = graphene.List(TaskType, status=graphene.String(required=True))
-    tasks_by_user = graphene.List(TaskType, user_id=graphene.Int(required=True))
+    tasks_by_status = connection_field(TaskConnection, TaskFilterInput, TaskOrder, status=graphene.String(required=True))
+    tasks_by_user = connection_field(TaskConnection, TaskFilterInput, TaskOrder, user_id=graphene.Int(required=True))
     task_status_summary = graphene.List(graphene.JSONString)
     average_tasks_per_project = graphene.Float()
+    project_stats = graphene.List(ProjectStatsType)
 
-    all_comments = graphene.List(CommentType)
+    all_comments = connection_field(CommentConnection, CommentFilterInput, CommentOrder)
     comment = graphene.Field(CommentType, id=graphene.Int())
     recent_comments = graphene.List(CommentType)
 
-    all_attachments = graphene.List(AttachmentType)
+    all_attachments = connection_field(AttachmentConnection, AttachmentFilterInput, AttachmentOrder)
     attachment = graphene.Field(AttachmentType, id=graphene.Int())
 
+    search = graphene.List(
+        SearchResultType,
+        q=graphene.String(required=True),
+        project_id=graphene.Int(),
+        status=graphene.String(),
+        type=graphene.String(),
+        limit=graphene.Int(),
+        offset=graphene.Int(),
+    )
+
     def resolve_all_projects(root, info):
-        return Project.objects.select_related("owner").prefetch_related("members").all()
+        return batched(gather(optimize(Project.objects.all(), info, Project._meta.ordering), Project._meta.ordering))
 
     def resolve_project(root, info, id):
-        return Project.objects.get(pk=id)
+        return optimize(Project.objects.using(shard_for(Project, id)), info).get(pk=id)
 
-    def resolve_all_tasks(self, info):
-        return Task.objects.select_related("project", "assigned_to").all()
+    def resolve_all_tasks(self, info, **arguments):
+        return task_connection(Task.objects.all(), info, **arguments)
 
     def resolve_task(self, info, id):
-        return Task.objects.get(pk=id)
+        return optimize(Task.objects.using(shard_for(Task, id)), info).get(pk=id)
 
-    def resolve_all_comments(self, info):
-        return Comment.objects.select_related("task", "author").all()
+    def resolve_all_comments(self, info, filter=None, order_by=None, **page):
+        queryset = filtered(CommentFilter, Comment.objects.all(), filter)
+        ordering = ordering_value(order_by, CommentOrder.CREATED_AT.value)
+        return resolve_connection(CommentConnection, queryset, info, ordering, **page)
 
     def resolve_comment(self, info, id):
-        return Comment.objects.get(pk=id)
+        return optimize(Comment.objects.using(shard_for(Comment, id)), info).get(pk=id)
 
-    def resolve_all_attachments(self, info):
-        return Attachment.objects.select_related("task").all()
+    def resolve_all_attachments(self, info, filter=None, order_by=None, **page):
+        queryset = filtered(AttachmentFilter, Attachment.objects.all(), filter)
+        ordering = ordering_value(order_by, AttachmentOrder.UPLOADED_AT.value)
+        return resolve_connection(AttachmentConnection, queryset, info, ordering, **page)
 
     def resolve_attachment(self, info, id):
-        return Attachment.objects.get(pk=id)
+        return optimize(Attachment.objects.using(shard_for(Attachment, id)), info).get(pk=id)
 
     def resolve_active_projects(self, info):
-        return Project.objects.filter(is_active=True)
+        return batched(gather(optimize(Project.objects.filter(is_active=True), info, Project._meta.ordering), Project._meta.ordering))
 
     def resolve_inactive_projects(self, info):
-        return Project.objects.filter(is_active=False)
+        return batched(gather(optimize(Project.objects.filter(is_active=False), info, Project._meta.ordering), Project._meta.ordering))
 
     def resolve_recent_tasks(self, info):
-        return Task.objects.order_by('-created_at')[:5]
+        return batched(gather(optimize(Task.objects.order_by('-created_at'), info, ['-created_at'])[:5], ['-created_at'], 5))
 
-    def resolve_tasks_by_status(self, info, status):
-        return Task.objects.filter(status=status)
+    def resolve_tasks_by_status(self, info, status, **arguments):
+        return task_connection(Task.objects.filter(status=status), info, **arguments)
 
-    def resolve_tasks_by_user(self, info, user_id):
-        return Task.objects.filter(assigned_to__id=user_id)
+    def resolve_tasks_by_user(self, info, user_id, **arguments):
+        return task_connection(Task.objects.filter(assigned_to_id=user_id), info, **arguments)
 
     def resolve_task_status_summary(self, info):
-        return list(Task.objects.values('status').annotate(count=Count('id')))
+        return status_summary()
 
     def resolve_average_tasks_per_project(self, info):
-        result = Project.objects.annotate(task_count=Count('tasks')).aggregate(avg=Avg('task_count'))
-        return result["avg"]
+        return average_tasks_per_project()
+
+    def resolve_project_stats(self, info):
+        return project_stats()
+
+    def resolve_search(self, info, q, project_id=None, type=None, **params):
+        filters = parse_filters({'project': project_id, 'type': type, **params})
+        return [SearchResultType(**row) for row in search(q, **filters)]
 
     def resolve_recent_comments(self, info):
-        return Comment.objects.order_by('-created_at')[:5]
+        return batched(gather(optimize(Comment.objects.order_by('-created_at'), info, ['-created_at'])[:5], ['-created_at'], 5))
 
 class CreateProject(graphene.Mutation):
     class Arguments:
@@ -112,6 +256,8 @@ class CreateProject(graphene.Mutation):
 
     project = graphene.Field(ProjectType)
 
+    @in_shard()
+    @serialized
     def mutate(self, info, name, owner_id, description=None, is_active=True, member_ids=None):
         owner = User.objects.get(id=owner_id)
         project = Project.objects.create(
@@ -134,6 +280,8 @@ class UpdateProject(graphene.Mutation):
 
     project = graphene.Field(ProjectType)
 
+    @in_shard(Project, 'id')
+    @serialized
     def mutate(self, info, id, name=None, description=None, is_active=None, member_ids=None):
         project = Project.objects.get(pk=id)
         if name is not None:
@@ -155,6 +303,8 @@ class DeleteProject(graphene.Mutation):
 
     ok = graphene.Boolean()
 
+    @in_shard(Project, 'id')
+    @serialized
     def mutate(self, info, id):
         try:
             project = Project.objects.get(pk=id)
@@ -174,6 +324,8 @@ class CreateTask(graphene.Mutation):
 
     task = graphene.Field(TaskType)
 
+    @in_shard(Project, 'project_id')
+    @serialized
     def mutate(self, info, title, project_id, description=None, assigned_to_id=None, status="TO_DO"):
         project = Project.objects.get(id=project_id)
         assigned_to = User.objects.get(id=assigned_to_id) if assigned_to_id else None
@@ -197,6 +349,8 @@ class UpdateTask(graphene.Mutation):
 
     task = graphene.Field(TaskType)
 
+    @in_shard(Task, 'id')
+    @serialized
     def mutate(self, info, id, title=None, description=None, status=None):
         task = Task.objects.get(pk=id)
         if title:
@@ -215,6 +369,8 @@ class DeleteTask(graphene.Mutation):
 
     ok = graphene.Boolean()
 
+    @in_shard(Task, 'id')
+    @serialized
     def mutate(self, info, id):
         Task.objects.get(pk=id).delete()
         return DeleteTask(ok=True)
@@ -227,6 +383,8 @@ class CreateComment(graphene.Mutation):
 
     comment = graphene.Field(CommentType)
 
+    @in_shard(Task, 'task_id')
+    @serialized
     def mutate(self, info, content, task_id, author_id):
         task = Task.objects.get(id=task_id)
         author = User.objects.get(id=author_id)
@@ -240,6 +398,8 @@ class DeleteComment(graphene.Mutation):
 
     ok = graphene.Boolean()
 
+    @in_shard(Comment, 'id')
+    @serialized
     def mutate(self, info, id):
         Comment.objects.get(pk=id).delete()
         return DeleteComment(ok=True)
@@ -253,6 +413,8 @@ class CreateAttachment(graphene.Mutation):
 
     attachment = graphene.Field(AttachmentType)
 
+    @in_shard(Task, 'task_id')
+    @serialized
     def mutate(self, info, task_id, file):
         task = Task.objects.get(id=task_id)
         attachment = Attachment.objects.create(task=task, file=file)
@@ -265,12 +427,44 @@ class DeleteAttachment(graphene.Mutation):
 
     ok = graphene.Boolean()
 
+    @in_shard(Attachment, 'id')
+    @serialized
     def mutate(self, info, id):
         Attachment.objects.get(pk=id).delete()
         return DeleteAttachment(ok=True)
 
 
 
+class TaskChangesInput(graphene.InputObjectType):
+    status = graphene.String()
+    assigned_to = graphene.Int()
+    due_date = graphene.Date()
+
+
+def validation_message(detail):
+    if isinstance(detail, dict):
+        return "; ".join(f"{name}: {validation_message(value)}" for name, value in detail.items())
+    if isinstance(detail, list):
+        return " ".join(validation_message(value) for value in detail)
+    return str(detail)
+
+
+class BulkUpdateTasks(graphene.Mutation):
+    """Zmiana wszystkich zadań pasujących do filtra jednym UPDATE (tablica/bulk.py)."""
+    class Arguments:
+        filter = TaskFilterInput(required=True)
+        set = TaskChangesInput(required=True)
+
+    updated = graphene.Int()
+
+    def mutate(self, info, filter, set):
+        try:
+            updated = update_matching(dict(filter), dict(set))
+        except ValidationError as e:
+            raise GraphQLError(validation_message(e.detail))
+        return BulkUpdateTasks(updated=updated)
+
+
 class Mutation(graphene.ObjectType):
     create_project = CreateProject.Field()
     update_project = UpdateProject.Field()
@@ -282,5 +476,6 @@ class Mutation(graphene.ObjectType):
     delete_comment = DeleteComment.Field()
     create_attachment = CreateAttachment.Field()
     delete_attachment = DeleteAttachment.Field()
+    bulk_update_tasks = BulkUpdateTasks.Field()
 
 schema = graphene.Schema(query=Query, mutation=Mutation)
@@ -0,0 +1,249 @@
+"""
+Wyszukiwanie pełnotekstowe (SQLite FTS5) w zadaniach, komentarzach
+i treści załączników. Tabela `tablica_search` jest utrzymywana triggerami
+na tablica_task, tablica_comment i tablica_attachment, więc obejmuje też
+bulk_create i update() na querysetach.
+rowid: 3 * id dla zadania, 3 * id + 1 dla komentarza, 3 * id + 2 dla załącznika.
+
+Migracja przebudowująca którąś z tych tabel na SQLite (np. AddField
+z wartością domyślną) usuwa jej triggery - odtwarza je create_schema().
+"""
+import html
+import re
+
+from django.db import connections, router
+from django.db.models.expressions import RawSQL
+
+from .models import Project, Task, TaskStatus
+from .sharding import is_sharded, scatter, shard_for
+
+TABLE = 'tablica_search'
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+SNIPPET_TOKENS = 12
+MAX_LIMIT = 100
+KINDS = ('task', 'comment', 'attachment')
+
+# znaczniki trafień w snippet() - po escapowaniu HTML zamieniane na <mark>
+MARK_START, MARK_END = '\x02', '\x03'
+
+# nazwa pliku bez katalogu (upload_to)
+BASENAME = "substr({0}, length(rtrim({0}, replace({0}, '/', ''))) + 1)"
+
+SCHEMA = [
+    f"""
+    CREATE VIRTUAL TABLE {TABLE} USING fts5(
+        title, body, kind UNINDEXED, object_id UNINDEXED, task_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER tablica_task_search_insert AFTER INSERT ON tablica_task BEGIN
+        INSERT INTO {TABLE} (rowid, title, body, kind, object_id, task_id)
+        VALUES (new.id * 3, new.title, new.description, 'task', new.id, new.id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER tablica_task_search_update AFTER UPDATE OF title, description ON tablica_task
+    WHEN old.title IS NOT new.title OR old.description IS NOT new.description BEGIN
+        UPDATE {TABLE} SET title = new.title, body = new.description WHERE rowid = new.id * 3;
+    END
+    """,
+    f"""
+    CREATE TRIGGER tablica_task_search_delete AFTER DELETE ON tablica_task BEGIN
+        DELETE FROM {TABLE} WHERE rowid = old.id * 3;
+    END
+    """,
+    f"""
+    CREATE TRIGGER tablica_comment_search_insert AFTER INSERT ON tablica_comment BEGIN
+        INSERT INTO {TABLE} (rowid, title, body, kind, object_id, task_id)
+        VALUES (new.id * 3 + 1, '', new.content, 'comment', new.id, new.task_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER tablica_comment_search_update AFTER UPDATE OF content, task_id ON tablica_comment
+    WHEN old.content IS NOT new.content OR old.task_id IS NOT new.task_id BEGIN
+        UPDATE {TABLE} SET body = new.content, task_id = new.task_id WHERE rowid = new.id * 3 + 1;
+    END
+    """,
+    f"""
+    CREATE TRIGGER tablica_comment_search_delete AFTER DELETE ON tablica_comment BEGIN
+        DELETE FROM {TABLE} WHERE rowid = old.id * 3 + 1;
+    END
+    """,
+    f"""
+    CREATE TRIGGER tablica_attachment_search_insert AFTER INSERT ON tablica_attachment BEGIN
+        INSERT INTO {TABLE} (rowid, title, body, kind, object_id, task_id)
+        VALUES (new.id * 3 + 2, {BASENAME.format('new.file')}, new.content_text, 'attachment', new.id, new.task_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER tablica_attachment_search_update
+    AFTER UPDATE OF file, content_text, task_id ON tablica_attachment
+    WHEN old.file IS NOT new.file OR old.content_text IS NOT new.content_text
+        OR old.task_id IS NOT new.task_id BEGIN
+        UPDATE {TABLE} SET title = {BASENAME.format('new.file')}, body = new.content_text, task_id = new.task_id
+        WHERE rowid = new.id * 3 + 2;
+    END
+    """,
+    f"""
+    CREATE TRIGGER tablica_attachment_search_delete AFTER DELETE ON tablica_attachment BEGIN
+        DELETE FROM {TABLE} WHERE rowid = old.id * 3 + 2;
+    END
+    """,
+]
+
+DROP_SCHEMA = [
+    f'DROP TRIGGER IF EXISTS tablica_{table}_search_{event}'
+    for table in KINDS for event in ('insert', 'update', 'delete')
+] + [f'DROP TABLE IF EXISTS {TABLE}']
+
+WORD = re.compile(r'\w+')
+
+
+def rebuild_index(connection):
+    """Indeks od zera z bieżącej zawartości tabel (migracja, `manage.py rebuild_search`)."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        cursor.execute(
+            f"INSERT INTO {TABLE} (rowid, title, body, kind, object_id, task_id) "
+            f"SELECT id * 3, title, description, 'task', id, id FROM tablica_task"
+        )
+        cursor.execute(
+            f"INSERT INTO {TABLE} (rowid, title, body, kind, object_id, task_id) "
+            f"SELECT id * 3 + 1, '', content, 'comment', id, task_id FROM tablica_comment"
+        )
+        cursor.execute(
+            f"INSERT INTO {TABLE} (rowid, title, body, kind, object_id, task_id) "
+            f"SELECT id * 3 + 2, {BASENAME.format('file')}, content_text, 'attachment', id, task_id "
+            f"FROM tablica_attachment"
+        )
+
+
+def create_schema(schema_editor):
+    """(Od)tworzenie tabeli FTS5 z triggerami i wypełnienie jej (migracje)."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_SCHEMA + SCHEMA:
+        schema_editor.execute(sql)
+    rebuild_index(schema_editor.connection)
+
+
+def drop_schema(schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_SCHEMA:
+        schema_editor.execute(sql)
+
+
+def is_available(using):
+    return connections[using].vendor == 'sqlite'
+
+
+def fts_query(text):
+    """
+    Słowa z `text` jako zapytanie FTS5: każde w cudzysłowie (składnia FTS5
+    od użytkownika nie przechodzi), wszystkie wymagane, ostatnie jako prefiks.
+    None, gdy nie ma czego szukać.
+    """
+    words = WORD.findall(text or '')
+    if not words:
+        return None
+    terms = ['"%s"' % word for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def highlight(snippet):
+    escaped = html.escape(snippet or '')
+    return escaped.replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+def search_shard(match, project=None, status=None, kind=None, limit=20):
+    using = router.db_for_read(Task)
+    if not is_available(using):
+        return []
+    conditions, params = [f'{TABLE} MATCH %s'], [match]
+    if project is not None:
+        conditions.append('task.project_id = %s')
+        params.append(project)
+    if status is not None:
+        conditions.append('task.status = %s')
+        params.append(status)
+    if kind is not None:
+        conditions.append(f'{TABLE}.kind = %s')
+        params.append(kind)
+    sql = f"""
+        SELECT {TABLE}.kind, {TABLE}.object_id, {TABLE}.task_id, task.project_id, task.status,
+               bm25({TABLE}, {TITLE_WEIGHT}, {BODY_WEIGHT}) AS rank,
+               snippet({TABLE}, -1, %s, %s, %s, {SNIPPET_TOKENS})
+        FROM {TABLE} JOIN tablica_task AS task ON task.id = {TABLE}.task_id
+        WHERE {' AND '.join(conditions)}
+        ORDER BY rank
+        LIMIT %s
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql, [MARK_START, MARK_END, '…', *params, limit])
+        rows = cursor.fetchall()
+    return [
+        {
+            'type': kind, 'id': object_id, 'task_id': task_id, 'project_id': project_id,
+            'status': status, 'score': -rank, 'snippet': highlight(snippet),
+        }
+        for kind, object_id, task_id, project_id, status, rank, snippet in rows
+    ]
+
+
+def search(text, project=None, status=None, kind=None, limit=20, offset=0):
+    """
+    Zadania, komentarze i załączniki pasujące do `text`, od najtrafniejszych
+    (BM25, tytuł zadania / nazwa pliku waży więcej niż treść). Filtry: projekt,
+    status zadania, rodzaj ('task' / 'comment' / 'attachment'). Przy shardingu - ze wszystkich shardów
+    (albo tylko z shardu projektu).
+    """
+    match = fts_query(text)
+    if match is None:
+        return []
+    aliases = None
+    if project is not None and is_sharded():
+        aliases = [shard_for(Project, project)]
+    pages = scatter(lambda: search_shard(match, project, status, kind, limit + offset), aliases)
+    rows = sorted((row for rows in pages for row in rows), key=lambda row: -row['score'])
+    return rows[offset:offset + limit]
+
+
+def parse_filters(params):
+    """Filtry wyszukiwania z parametrów żądania; ValueError z opisem przy błędnych."""
+    filters = {}
+    if params.get('project'):
+        try:
+            filters['project'] = int(params['project'])
+        except ValueError:
+            raise ValueError('project: oczekiwano liczby.')
+    if params.get('status'):
+        if params['status'] not in TaskStatus.values:
+            raise ValueError('status: dostępne %s.' % ', '.join(TaskStatus.values))
+        filters['status'] = params['status']
+    if params.get('type'):
+        if params['type'] not in KINDS:
+            raise ValueError('type: dostępne %s.' % ', '.join(KINDS))
+        filters['kind'] = params['type']
+    try:
+        filters['limit'] = max(1, min(int(params.get('limit') or 20), MAX_LIMIT))
+        filters['offset'] = max(0, int(params.get('offset') or 0))
+    except ValueError:
+        raise ValueError('limit/offset: oczekiwano liczby.')
+    return filters
+
+
+def matching(queryset, text, kind):
+    """
+    `queryset` zawężony do obiektów rodzaju `kind` pasujących do `text`
+    (podzapytanie na indeksie FTS5, bez listy id w Pythonie).
+    """
+    match = fts_query(text)
+    if match is None:
+        return queryset
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT object_id FROM {TABLE} WHERE {TABLE} MATCH %s AND kind = %s', [match, kind]
+    ))
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 
+from .fieldsets import SparseFieldsMixin
 from .models import UserProfile, Project, Task, Comment, Attachment
 
 class UserSerializer(serializers.ModelSerializer):
@@ -30,7 +31,7 @@ class RegisterSerializer(serializers.ModelSerializer):
             )
             return user
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     author = serializers.CharField(source='author.username', read_only=True)
 
     class Meta:
@@ -40,9 +41,10 @@ class CommentSerializer(serializers.ModelSerializer):
 class AttachmentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Attachment
-        fields = '__all__'
+        exclude = ['content_text', 'content_extracted_at']
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = ('comments', 'attachments')
     assigned_to = serializers.PrimaryKeyRelatedField(
         queryset=User.objects.all(),
         required=False,
@@ -58,12 +60,14 @@ class TaskSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         rep = super().to_representation(instance)
-        if instance.assigned_to:
+        if 'assigned_to' in rep and instance.assigned_to:
             rep['assigned_to'] = UserSerializer(instance.assigned_to).data
-        rep['project'] = instance.project.id
+        if 'project' in rep:
+            rep['project'] = instance.project_id
         return rep
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = ('tasks',)
     owner = UserSerializer(read_only=True)
     members = serializers.PrimaryKeyRelatedField(
         many=True,
@@ -78,6 +82,8 @@ class ProjectSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         rep = super().to_representation(instance)
-        rep['members'] = UserSerializer(instance.members.all(), many=True).data
-        rep['owner'] = UserSerializer(instance.owner).data
-        return rep
\ No newline at end of file
+        if 'members' in rep:
+            rep['members'] = UserSerializer(instance.members.all(), many=True).data
+        if 'owner' in rep:
+            rep['owner'] = UserSerializer(instance.owner).data
+        return rep
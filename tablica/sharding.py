@@ -0,0 +1,381 @@
+"""
+Sharding po projektach. Projekt razem z zadaniami, komentarzami
+i załącznikami leży w jednej bazie z TABLICA['SHARDS']; katalog
+ProjectShard (w "default") mówi, w której. Klucze główne na shardzie k
+zaczynają się od k << SHARD_BITS (sqlite_sequence ustawia
+`manage.py init_shards`), więc shard zadania/komentarza wynika z samego id.
+Użytkownicy żyją w "default" i są kopiowani na wszystkie shardy, żeby
+klucze obce i select_related działały lokalnie.
+
+Przy jednym shardzie (domyślnie) nic nie jest przekierowywane.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar, copy_context
+from functools import cmp_to_key, wraps
+
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Count
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from .conf import get_setting
+from .models import Project, ProjectShard, Task, Comment, Attachment
+
+# 2**27 id na shard; 16 shardów mieści się w 32-bitowym Int argumentów GraphQL
+SHARD_BITS = 27
+
+current_shard = ContextVar('tablica_shard', default=None)
+# execute_wrapper'y żądania (np. licznik zapytań z budgets.py) - zakładane
+# też na połączenia w wątkach puli scatter(), które mają własne połączenia
+query_wrappers = ContextVar('tablica_query_wrappers', default=())
+
+_directory = {}
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def shards():
+    return list(get_setting('SHARDS'))
+
+
+def is_sharded():
+    return len(shards()) > 1
+
+
+def shard_index(alias):
+    return shards().index(alias)
+
+
+def first_id(alias):
+    return shard_index(alias) << SHARD_BITS
+
+
+def shard_for_pk(pk):
+    try:
+        return shards()[int(pk) >> SHARD_BITS]
+    except (TypeError, ValueError, IndexError):
+        return DEFAULT_DB_ALIAS
+
+
+def shard_for_project(project_id):
+    try:
+        project_id = int(project_id)
+    except (TypeError, ValueError):
+        return DEFAULT_DB_ALIAS
+    if project_id not in _directory:
+        entry = ProjectShard.objects.using(DEFAULT_DB_ALIAS).filter(project_id=project_id).first()
+        if entry is None:
+            return shard_for_pk(project_id)
+        _directory[project_id] = entry.shard
+    return _directory[project_id]
+
+
+def shard_for(model, pk):
+    """Alias dla obiektu `model` o kluczu `pk`; None bez shardingu (decyduje router)."""
+    if not is_sharded():
+        return None
+    if model is Project:
+        return shard_for_project(pk)
+    return shard_for_pk(pk)
+
+
+def choose_shard():
+    """Shard dla nowego projektu: ten z najmniejszą liczbą projektów w katalogu."""
+    aliases = shards()
+    if len(aliases) == 1:
+        return aliases[0]
+    counts = dict.fromkeys(aliases, 0)
+    # GROUP BY po indeksie na shard - jeden wiersz na shard, nie na projekt
+    rows = ProjectShard.objects.using(DEFAULT_DB_ALIAS).values('shard').annotate(n=Count('pk')).order_by()
+    for row in rows:
+        if row['shard'] in counts:
+            counts[row['shard']] = row['n']
+    return min(aliases, key=lambda alias: counts[alias])
+
+
+def register_projects(project_ids, alias):
+    if not is_sharded():
+        return
+    ProjectShard.objects.using(DEFAULT_DB_ALIAS).bulk_create(
+        [ProjectShard(project_id=pk, shard=alias) for pk in project_ids],
+        update_conflicts=True, update_fields=['shard'], unique_fields=['project_id'],
+    )
+    _directory.update(dict.fromkeys(project_ids, alias))
+
+
+def forget_project(project_id):
+    _directory.pop(project_id, None)
+    ProjectShard.objects.using(DEFAULT_DB_ALIAS).filter(project_id=project_id).delete()
+
+
+@contextmanager
+def use_shard(alias):
+    token = current_shard.set(alias)
+    try:
+        yield
+    finally:
+        current_shard.reset(token)
+
+
+@contextmanager
+def wrap_queries(wrapper):
+    """`wrapper` obejmuje też zapytania wykonane w wątkach scatter() w tym bloku."""
+    token = query_wrappers.set(query_wrappers.get() + (wrapper,))
+    try:
+        yield
+    finally:
+        query_wrappers.reset(token)
+
+
+def in_shard(model=None, argument=None):
+    """
+    Dekorator (mutacje GraphQL): funkcja działa w shardzie obiektu `model`
+    o kluczu z argumentu `argument`, a bez niego w shardzie dla nowego projektu.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not is_sharded():
+                return func(*args, **kwargs)
+            alias = shard_for(model, kwargs[argument]) if argument else choose_shard()
+            with use_shard(alias):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def bind_shard(iterable):
+    """Iteracja (np. strumień odpowiedzi) w shardzie bieżącym w chwili wywołania."""
+    alias = current_shard.get()
+
+    def iterate():
+        iterator = iter(iterable)
+        while True:
+            with use_shard(alias):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+    return iterate()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(get_setting('SHARD_WORKERS'), thread_name_prefix='tablica-shard')
+        return _executor
+
+
+def run_in_shard(alias, func):
+    try:
+        with use_shard(alias), ExitStack() as stack:
+            for wrapper in query_wrappers.get():
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(wrapper))
+            return func()
+    finally:
+        # wątek z puli - sprzątamy połączenie jak po żądaniu
+        connections[alias].close_if_unusable_or_obsolete()
+
+
+def scatter(func, aliases=None):
+    """
+    Wywołuje `func()` w każdym shardzie (równolegle, w puli wątków)
+    i zwraca listę wyników w kolejności shardów. Bez shardingu - jedno
+    wywołanie w bieżącym wątku, bez zmiany routingu. W otwartej transakcji
+    shardy są odpytywane po kolei w bieżącym wątku, żeby widziała ona
+    własne zapisy.
+    """
+    if not is_sharded():
+        return [func()]
+    aliases = aliases or shards()
+    if any(connections[alias].in_atomic_block for alias in aliases):
+        results = []
+        for alias in aliases:
+            with use_shard(alias):
+                results.append(func())
+        return results
+    executor = get_executor()
+    futures = [
+        executor.submit(copy_context().run, run_in_shard, alias, func)
+        for alias in aliases
+    ]
+    return [future.result() for future in futures]
+
+
+def row_value(row, name):
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+
+def compare_by(ordering):
+    fields = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+
+    def compare(a, b):
+        for name, descending in fields:
+            left, right = row_value(a, name), row_value(b, name)
+            if left != right:
+                result = -1 if left < right else 1
+                return -result if descending else result
+        return 0
+    return cmp_to_key(compare)
+
+
+def merge_sorted(lists, ordering):
+    return sorted((row for rows in lists for row in rows), key=compare_by(ordering))
+
+
+def gather(queryset, ordering=None, limit=None):
+    """
+    Wiersze `queryset` ze wszystkich shardów. Z `ordering` wyniki są
+    scalane w tym porządku, z `limit` przycinane (np. "ostatnie 5").
+    """
+    if not is_sharded():
+        return list(queryset)
+    results = scatter(lambda: list(queryset.all()))
+    rows = merge_sorted(results, ordering) if ordering else [row for rows in results for row in rows]
+    return rows[:limit] if limit is not None else rows
+
+
+def row_shard(row):
+    if isinstance(row, dict):
+        return row.get('_shard')
+    return row._state.db
+
+
+BOARD_MODELS = (Project, Task, Comment, Attachment, Project.members.through)
+
+
+def shard_of(obj):
+    """Shard obiektu tablicy z jego własnych kluczy (działa też dla nowych obiektów)."""
+    if isinstance(obj, Project):
+        return shard_for_project(obj.pk) if obj.pk is not None else None
+    if isinstance(obj, Project.members.through):
+        return shard_for_project(obj.project_id) if obj.project_id is not None else None
+    if isinstance(obj, Task):
+        if obj.project_id is not None:
+            return shard_for_project(obj.project_id)
+        return shard_for_pk(obj.pk) if obj.pk is not None else None
+    if isinstance(obj, (Comment, Attachment)):
+        if obj.task_id is not None:
+            return shard_for_pk(obj.task_id)
+        return shard_for_pk(obj.pk) if obj.pk is not None else None
+    return None
+
+
+def mirror_users(users):
+    """Kopie użytkowników z "default" na pozostałych shardach."""
+    fields = [field.attname for field in User._meta.concrete_fields]
+    for alias in shards():
+        if alias == DEFAULT_DB_ALIAS:
+            continue
+        User.objects.using(alias).bulk_create(
+            [User(**{name: getattr(user, name) for name in fields}) for user in users],
+            update_conflicts=True, unique_fields=['id'],
+            update_fields=[name for name in fields if name != 'id'],
+        )
+
+
+def seed_sequences(alias):
+    """
+    Liczniki AUTOINCREMENT tabel tablicy na shardzie startują od
+    first_id(alias) (jeśli nie są już dalej). Tylko SQLite.
+    """
+    start = first_id(alias)
+    if not start:
+        return
+    with connections[alias].cursor() as cursor:
+        for model in BOARD_MODELS:
+            table = model._meta.db_table
+            cursor.execute(
+                'UPDATE sqlite_sequence SET seq = %s WHERE name = %s AND seq < %s', [start, table, start]
+            )
+            cursor.execute(
+                'INSERT INTO sqlite_sequence (name, seq) SELECT %s, %s '
+                'WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = %s)',
+                [table, start, table],
+            )
+
+
+def forget_users(user_ids):
+    for alias in shards():
+        if alias != DEFAULT_DB_ALIAS:
+            User.objects.using(alias).filter(pk__in=user_ids).delete()
+
+
+class ShardRouter:
+    """
+    Modele tablicy: shard wyliczony z obiektu z podpowiedzi `instance`,
+    a bez niej shard ustawiony przez use_shard() (widok, resolver, scatter).
+    Pozostałe modele (użytkownicy, katalog) - "default". Bez shardingu
+    router nic nie decyduje (przechodzi do kolejnych, np. replik).
+    """
+
+    def route(self, model, hints):
+        if not is_sharded():
+            return None
+        instance = hints.get('instance')
+        if isinstance(instance, BOARD_MODELS):
+            # także użytkownicy powiązani z obiektem tablicy (owner, members)
+            return shard_of(instance) or instance._state.db or current_shard.get() or DEFAULT_DB_ALIAS
+        if not issubclass(model, BOARD_MODELS):
+            return DEFAULT_DB_ALIAS
+        return current_shard.get() or DEFAULT_DB_ALIAS
+
+    def db_for_read(self, model, **hints):
+        return self.route(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self.route(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if not is_sharded():
+            return None
+        # użytkownicy są na każdym shardzie
+        if not isinstance(obj1, BOARD_MODELS) or not isinstance(obj2, BOARD_MODELS):
+            return True
+        return None
+
+
+class ShardRoutingMixin:
+    """
+    Widok DRF działający w shardzie obiektu: z `pk` w URL (albo
+    `shard_url_kwarg`), przy tworzeniu z pól `shard_data_fields` w danych.
+    Listy bez takiego klucza idą przez scatter/gather.
+    """
+    shard_model = None
+    shard_url_kwarg = 'pk'
+    shard_data_fields = {}
+
+    def get_shard(self, request):
+        value = self.kwargs.get(self.shard_url_kwarg)
+        if value is not None:
+            return shard_for(self.shard_model or self.queryset.model, value)
+        if request.method not in SAFE_METHODS and hasattr(request.data, 'get'):
+            for field, model in self.shard_data_fields.items():
+                value = request.data.get(field)
+                if value:
+                    return shard_for(model, value)
+        return None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        alias = self.get_shard(request) if is_sharded() else None
+        self._shard_token = current_shard.set(alias) if alias else None
+
+    def list(self, request, *args, **kwargs):
+        if self.paginator is not None or not is_sharded():
+            return super().list(request, *args, **kwargs)
+        # lista bez paginacji - wiersze ze wszystkich shardów
+        queryset = gather(self.filter_queryset(self.get_queryset()))
+        return Response(self.get_serializer(queryset, many=True).data)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if getattr(self, '_shard_token', None) is not None:
+            current_shard.reset(self._shard_token)
+            self._shard_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
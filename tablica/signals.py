@@ -0,0 +1,123 @@
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS
+from django.db.backends.signals import connection_created
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from .conditional import bump_users_version
+from .counters import bump_project, bump_task, is_open, recount
+from .extractors import schedule_extraction
+from .models import Project, Task, Comment, Attachment
+from .sharding import forget_project, forget_users, is_sharded, mirror_users, register_projects
+from .timeouts import install_progress_handler
+
+# Liczniki w Project/Task są utrzymywane przyrostowo (F() + n) w tej samej
+# transakcji co zapis; ten sam UPDATE podbija updated_at używane w ETag.
+
+
+@receiver(pre_save, sender=Task)
+def task_saving(sender, instance, raw, using, **kwargs):
+    # stan sprzed zapisu z bazy, nie z chwili odczytu - równoległe zapisy
+    # tego samego zadania nie mogą policzyć tej samej zmiany dwa razy
+    if not raw and not instance._state.adding and instance.pk is not None:
+        instance.reload_tracked_fields(using)
+
+
+@receiver(post_save, sender=Task)
+def task_saved(sender, instance, created, using, **kwargs):
+    if created:
+        bump_project(instance.project_id, using, task_count=1, open_task_count=int(is_open(instance.status)))
+    elif 'project_id' not in getattr(instance, '_loaded_values', {}):
+        # nie wiemy, jaki był stan przed zapisem - przeliczamy projekt od zera
+        recount([instance.project_id], using)
+        bump_project(instance.project_id, using)
+    elif instance.loaded_value('project_id') != instance.project_id:
+        projects = [instance.loaded_value('project_id'), instance.project_id]
+        recount(projects, using)
+        for project_id in projects:
+            bump_project(project_id, using)
+    else:
+        delta = int(is_open(instance.status)) - int(is_open(instance.loaded_value('status')))
+        bump_project(instance.project_id, using, open_task_count=delta)
+    instance.remember_tracked_fields()
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted(sender, instance, using, **kwargs):
+    # komentarze i załączniki usuwane kaskadowo odejmują się same
+    bump_project(instance.project_id, using, task_count=-1, open_task_count=-int(is_open(instance.status)))
+
+
+def task_child_saved(instance, created, using, counter):
+    previous = instance.loaded_value('task_id')
+    if created:
+        bump_task(instance.task_id, using, **{counter: 1})
+    elif previous is not None and previous != instance.task_id:
+        bump_task(previous, using, **{counter: -1})
+        bump_task(instance.task_id, using, **{counter: 1})
+    else:
+        bump_task(instance.task_id, using)
+    instance.remember_tracked_fields()
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, using, **kwargs):
+    task_child_saved(instance, created, using, 'comment_count')
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, using, **kwargs):
+    bump_task(instance.task_id, using, comment_count=-1)
+
+
+@receiver(post_save, sender=Attachment)
+def attachment_saved(sender, instance, created, using, **kwargs):
+    if created or instance.loaded_value('file') != instance.file:
+        # nowy plik - tekst do wyszukiwarki wyciągany w tle
+        schedule_extraction(instance.pk, using)
+    task_child_saved(instance, created, using, 'attachment_count')
+
+
+@receiver(post_delete, sender=Attachment)
+def attachment_deleted(sender, instance, using, **kwargs):
+    bump_task(instance.task_id, using, attachment_count=-1)
+
+
+@receiver(m2m_changed, sender=Project.members.through)
+def project_members_changed(sender, instance, action, using, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear') and isinstance(instance, Project):
+        bump_project(instance.pk, using)
+
+
+@receiver(post_save, sender=Project)
+def project_saved(sender, instance, created, using, **kwargs):
+    if created and is_sharded():
+        register_projects([instance.pk], using)
+
+
+@receiver(post_delete, sender=Project)
+def project_deleted(sender, instance, using, **kwargs):
+    if is_sharded():
+        forget_project(instance.pk)
+
+
+# użytkownicy są w "default", shardy trzymają ich kopie (klucze obce)
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, using, raw=False, update_fields=None, **kwargs):
+    # logowanie zapisuje tylko last_login - nie zmienia danych w odpowiedziach
+    if update_fields is None or set(update_fields) - {'last_login'}:
+        bump_users_version()
+    if using == DEFAULT_DB_ALIAS and is_sharded() and not raw:
+        mirror_users([instance])
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, using, **kwargs):
+    bump_users_version()
+    if using == DEFAULT_DB_ALIAS and is_sharded():
+        forget_users([instance.pk])
+
+
+# budżety czasu SQL: handler postępu na każdym nowym połączeniu SQLite
+connection_created.connect(install_progress_handler, dispatch_uid='tablica_sql_time_budget')
@@ -0,0 +1,54 @@
+from django.db.models import Count, Sum
+
+from .counters import count_of
+from .models import Project, Task, Comment, Attachment, TaskStatus
+from .sharding import scatter
+
+
+def project_stats(projects=None):
+    """Statystyki projektów ze wszystkich shardów (shard_project_stats w każdym)."""
+    return [row for rows in scatter(lambda: shard_project_stats(projects)) for row in rows]
+
+
+def shard_project_stats(projects=None):
+    """
+    Statystyki wszystkich projektów w dwóch zapytaniach: jedno GROUP BY
+    (project, status) po zadaniach oraz projekty z podzapytaniami
+    skorelowanymi dla komentarzy i załączników. Bez złączeń wielu tabel,
+    które mnożą wiersze przed Count().
+    """
+    if projects is None:
+        projects = Project.objects.all()
+    rows = list(projects.values('id', 'name').annotate(
+        comment_count=count_of(Comment.objects.all(), 'task__project'),
+        attachment_count=count_of(Attachment.objects.all(), 'task__project'),
+    ))
+
+    by_status = {row['id']: dict.fromkeys(TaskStatus.values, 0) for row in rows}
+    tasks = Task.objects.filter(project__in=projects.order_by().values('pk'))
+    for row in tasks.values('project_id', 'status').annotate(count=Count('pk')).order_by():
+        if row['project_id'] in by_status:
+            by_status[row['project_id']][row['status']] = row['count']
+
+    for row in rows:
+        row['tasks_by_status'] = by_status[row['id']]
+        row['task_count'] = sum(by_status[row['id']].values())
+    return rows
+
+
+def status_summary():
+    """Liczba zadań w każdym statusie: [{'status': ..., 'count': ...}]."""
+    counts = {}
+    for rows in scatter(lambda: list(Task.objects.values('status').annotate(count=Count('id')))):
+        for row in rows:
+            counts[row['status']] = counts.get(row['status'], 0) + row['count']
+    return [{'status': status, 'count': count} for status, count in sorted(counts.items())]
+
+
+def average_tasks_per_project():
+    """Średnia liczba zadań na projekt (None bez projektów), liczona z sum po shardach."""
+    states = scatter(lambda: Project.objects.aggregate(total=Sum('task_count'), projects=Count('pk')))
+    projects = sum(state['projects'] for state in states)
+    if not projects:
+        return None
+    return sum(state['total'] or 0 for state in states) / projects
@@ -1,12 +1,48 @@
+import csv
+import io
+import json
+import os
+import sqlite3
 import tempfile
+import threading
+import time
 from datetime import timedelta
+from types import SimpleNamespace
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.utils import timezone
-from django.test import TestCase
+from django.utils.http import http_date
+from django.db import IntegrityError, connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import cache
 from django.contrib.auth.models import User
+from django.core.management import call_command
+from trelloboard.sqlite3.base import DatabaseWrapper, RetryPolicy
 from rest_framework import status
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from graphql import OperationType
+import graphene
+from asgiref.sync import async_to_sync
+from .checks import shared_cache_check
+from .conditional import USERS_VERSION_KEY
 from .models import Project, Task, Comment, Attachment
+from .extractors import extract_rtf
+from .importer import BoardImporter, ImportFormatError, JsonStream, iter_file_records
+from .persisted import documents, query_hash
+from .serializers import CommentSerializer, TaskSerializer
+from .schema import schema
+from .indexes import IndexAdvisor
+from . import writer
+from .writer import WriteQueue
+from .dbrouters import ReplicaMiddleware, ReplicaRouter
+from .graphql_view import AsyncTablicaGraphQLView, TablicaGraphQLView, operation_type
+from . import sharding
+from .sharding import choose_shard, current_shard, forget_project, merge_sorted, scatter, shard_for
+from . import metrics
+from .budgets import QueryBudgetExceeded
+from .views import ProjectViewSet
+from .timeouts import QueryTimeout, time_budget
 from rest_framework.test import force_authenticate
 
 class ProjectAPITest(TestCase):
@@ -29,7 +65,7 @@ class ProjectAPITest(TestCase):
     def test_get_projects_list(self):
         response = self.client.get("/api/projects/")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertGreaterEqual(len(response.data), 1)
+        self.assertGreaterEqual(len(response.data['results']), 1)
 
     def test_get_single_project(self):
         response = self.client.get(f"/api/projects/{self.project.id}/")
@@ -112,7 +148,7 @@ class TaskActionTests(TestCase):
     def test_filter_by_status(self):
         response = self.client.get("/api/tasks/by-status/?status=TODO")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertTrue(all(task['status'] == 'TODO' for task in response.data))
+        self.assertTrue(all(task['status'] == 'TODO' for task in response.data['results']))
 
     def test_filter_by_user(self):
         response = self.client.get(f"/api/tasks/by-user/?user_id={self.user2.id}")
@@ -161,7 +197,7 @@ class TaskCRUDTests(TestCase):
     def test_get_task_list(self):
         response = self.client.get("/api/tasks/")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertGreaterEqual(len(response.data), 1)
+        self.assertGreaterEqual(len(response.data['results']), 1)
 
     def test_get_single_task(self):
         response = self.client.get(f"/api/tasks/{self.task.id}/")
@@ -241,7 +277,7 @@ class CommentCRUDTests(TestCase):
     def test_get_comment_list(self):
         response = self.client.get("/api/comments/")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertGreaterEqual(len(response.data), 1)
+        self.assertGreaterEqual(len(response.data['results']), 1)
 
     def test_get_single_comment(self):
         response = self.client.get(f"/api/comments/{self.comment.id}/")
@@ -347,4 +383,1354 @@ class AttachmentCRUDTests(TestCase):
     def test_delete_attachment(self):
         response = self.client.delete(f"/api/attachments/{self.attachment.id}/")
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
-        self.assertFalse(Attachment.objects.filter(id=self.attachment.id).exists())
\ No newline at end of file
+        self.assertFalse(Attachment.objects.filter(id=self.attachment.id).exists())
+
+
+@override_settings(TABLICA={'QUERY_BUDGET_STRICT': True})
+class QueryBudgetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.other_user = User.objects.create_user(username='other', password='pass')
+        self.client.force_authenticate(user=self.user)
+
+    def create_board(self, name):
+        project = Project.objects.create(name=name, owner=self.user)
+        project.members.set([self.user, self.other_user])
+        for i in range(3):
+            task = Task.objects.create(
+                title=f"{name} {i}", project=project, assigned_to=self.other_user
+            )
+            Comment.objects.create(task=task, author=self.other_user, content="Komentarz")
+            Attachment.objects.create(task=task, file="attachments/test.txt")
+        return project
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries)
+
+    def test_project_list_queries_do_not_grow_with_projects(self):
+        self.create_board("Pierwszy")
+        single = self.count_queries("/api/projects/")
+        for i in range(5):
+            self.create_board(f"Projekt {i}")
+        self.assertEqual(self.count_queries("/api/projects/"), single)
+
+    def test_task_list_queries_do_not_grow_with_tasks(self):
+        self.create_board("Pierwszy")
+        single = self.count_queries("/api/tasks/")
+        for i in range(5):
+            self.create_board(f"Projekt {i}")
+        self.assertEqual(self.count_queries("/api/tasks/by-status/?status=TODO"), single)
+        self.assertEqual(self.count_queries("/api/tasks/"), single)
+
+    def test_project_retrieve_within_budget(self):
+        project = self.create_board("Pierwszy")
+        self.count_queries(f"/api/projects/{project.id}/")
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name="Projekt", owner=self.user)
+        created_at = timezone.now()
+        # część zadań ma identyczny created_at, żeby sprawdzić rozstrzyganie po id
+        self.tasks = [
+            Task.objects.create(
+                title=f"Zadanie {i}", project=self.project,
+                created_at=created_at + timedelta(seconds=i // 2)
+            )
+            for i in range(7)
+        ]
+
+    def collect(self, url):
+        ids, pages = [], 0
+        while url:
+            # walidator ETag, zadania, komentarze, załączniki
+            with self.assertNumQueries(4):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(task['id'] for task in response.data['results'])
+            url = response.data['next']
+            pages += 1
+        return ids, pages
+
+    def test_walks_all_tasks_in_created_at_id_order(self):
+        ids, pages = self.collect("/api/tasks/?page_size=3")
+        self.assertEqual(ids, [task.id for task in self.tasks])
+        self.assertEqual(pages, 3)
+
+    def test_previous_link_returns_previous_page(self):
+        first = self.client.get("/api/tasks/?page_size=3")
+        second = self.client.get(first.data['next'])
+        self.assertIsNone(first.data['previous'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(
+            [task['id'] for task in back.data['results']],
+            [task['id'] for task in first.data['results']],
+        )
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/tasks/?cursor=nie-kursor")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_projects_newest_first(self):
+        older = Project.objects.create(name="Starszy", owner=self.user)
+        Project.objects.filter(pk=older.pk).update(created_at=timezone.now() - timedelta(days=1))
+        response = self.client.get("/api/projects/?page_size=1")
+        self.assertEqual(response.data['results'][0]['id'], self.project.id)
+        response = self.client.get(response.data['next'])
+        self.assertEqual(response.data['results'][0]['id'], older.id)
+        self.assertIsNone(response.data['next'])
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name="Projekt", description="Długi opis", owner=self.user)
+        self.task = Task.objects.create(title="Zadanie", description="Opis zadania", project=self.project)
+        Comment.objects.create(task=self.task, author=self.user, content="Treść")
+
+    def test_fields_limit_response_and_sql(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/projects/?fields=id,name")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [{'id': self.project.id, 'name': "Projekt"}])
+        # walidator ETag + lista projektów, bez prefetchu relacji
+        self.assertEqual(len(ctx.captured_queries), 2)
+        for query in ctx.captured_queries:
+            self.assertNotIn('"description"', query['sql'])
+
+    def test_expand_nested_relations(self):
+        response = self.client.get(
+            f"/api/projects/{self.project.id}/?fields=id,tasks.id,tasks.title,tasks.comments&expand=tasks.comments"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        task = response.data['tasks'][0]
+        self.assertEqual(set(task), {'id', 'title', 'comments'})
+        self.assertEqual(task['comments'][0]['content'], "Treść")
+
+    def test_unexpanded_relations_are_not_prefetched(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/tasks/?expand=")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('comments', response.data['results'][0])
+        self.assertNotIn('attachments', response.data['results'][0])
+        self.assertEqual(len(ctx.captured_queries), 2)
+
+    def test_writes_ignore_field_selection(self):
+        response = self.client.patch(
+            f"/api/tasks/{self.task.id}/?fields=id", {"status": "DONE"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], "DONE")
+
+
+class FastTaskSerializerTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='user', password='pass', email='user@example.com')
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name="Projekt", owner=self.user)
+        self.task = Task.objects.create(
+            title="Zadanie", description="Opis", project=self.project,
+            assigned_to=self.user, status="INPR", due_date=timezone.now().date()
+        )
+        Task.objects.create(title="Bez osoby", project=self.project)
+        Comment.objects.create(task=self.task, author=self.user, content="Komentarz")
+        Attachment.objects.create(task=self.task, file="attachments/test.txt")
+
+    def test_list_matches_task_serializer(self):
+        response = self.client.get("/api/tasks/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        request = response.wsgi_request
+        expected = TaskSerializer(
+            Task.objects.order_by('created_at', 'id'), many=True, context={'request': request}
+        ).data
+        self.assertEqual(response.json()['results'], [dict(item) for item in expected])
+
+    def test_list_respects_field_selection(self):
+        comment = self.task.comments.get()
+        response = self.client.get("/api/tasks/by-status/?status=INPR&fields=id,assigned_to,comments")
+        self.assertEqual(response.json()['results'], [{
+            'id': self.task.id,
+            'assigned_to': {'id': self.user.id, 'username': 'user', 'email': 'user@example.com'},
+            'comments': [dict(CommentSerializer(comment).data)],
+        }])
+
+
+class ProjectExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name="Projekt", owner=self.user)
+        self.project.members.add(self.user)
+        self.task = Task.objects.create(title="Zadanie", project=self.project, assigned_to=self.user)
+        Comment.objects.create(task=self.task, author=self.user, content="Zażółć, \"gęślą\"")
+        Attachment.objects.create(task=self.task, file="attachments/test.txt")
+
+    def read(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson_export(self):
+        response = self.client.get(f"/api/projects/{self.project.id}/export/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        records = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual([r['type'] for r in records], ['project', 'task', 'comment', 'attachment'])
+        self.assertEqual(records[0]['members'], ['user'])
+        self.assertEqual(records[1]['assigned_to'], 'user')
+        self.assertEqual(records[2]['content'], "Zażółć, \"gęślą\"")
+
+    def test_csv_export(self):
+        response = self.client.get(f"/api/projects/{self.project.id}/export/?output=csv")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = list(csv.DictReader(io.StringIO(self.read(response))))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[2]['content'], "Zażółć, \"gęślą\"")
+
+    def test_unknown_project_and_format(self):
+        self.assertEqual(self.client.get("/api/projects/999/export/").status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(f"/api/projects/{self.project.id}/export/?output=xml")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BoardImportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.other_user = User.objects.create_user(username='other', password='pass')
+        self.client.force_authenticate(user=self.user)
+
+    def upload(self, content, name, **params):
+        query = '&'.join(f'{key}={value}' for key, value in params.items())
+        return self.client.post(
+            f"/api/projects/import/?{query}",
+            {'file': SimpleUploadedFile(name, content.encode())},
+            format='multipart',
+        )
+
+    def test_export_import_round_trip(self):
+        project = Project.objects.create(name="Źródło", owner=self.other_user)
+        project.members.set([self.user, self.other_user])
+        task = Task.objects.create(title="Zadanie", project=project, assigned_to=self.other_user, status="INPR")
+        Comment.objects.create(task=task, author=self.other_user, content="Komentarz")
+        exported = b''.join(self.client.get(f"/api/projects/{project.id}/export/").streaming_content)
+
+        response = self.upload(exported.decode(), 'board.ndjson')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['tasks'], 1)
+        imported = Project.objects.get(pk=response.data['project_ids'][0])
+        self.assertEqual(imported.owner, self.other_user)
+        self.assertEqual((imported.task_count, imported.open_task_count, imported.comment_count), (1, 1, 1))
+        self.assertEqual(set(imported.members.all()), {self.user, self.other_user})
+        imported_task = imported.tasks.get()
+        self.assertEqual((imported_task.status, imported_task.assigned_to), ("INPR", self.other_user))
+        self.assertEqual(imported_task.comments.get().content, "Komentarz")
+
+    def test_trello_import(self):
+        board = {
+            "id": "b1", "name": "Trello", "desc": "Opis",
+            "actions": [{
+                "type": "commentCard", "idMemberCreator": "m1",
+                "data": {"card": {"id": "c2"}, "text": "Z Trello"},
+            }],
+            "cards": [
+                {"id": "c1", "name": "Pierwsza", "idList": "l1", "idMembers": [], "due": None},
+                {"id": "c2", "name": "Druga", "idList": "l2", "idMembers": ["m1"], "due": "2025-06-01T10:00:00.000Z"},
+            ],
+            "lists": [{"id": "l1", "name": "To Do"}, {"id": "l2", "name": "Done"}],
+            "members": [{"id": "m1", "username": "other"}],
+        }
+        response = self.upload(json.dumps(board, indent=1), 'trello.json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        project = Project.objects.get(pk=response.data['project_ids'][0])
+        tasks = {task.title: task for task in project.tasks.all()}
+        self.assertEqual(tasks["Pierwsza"].status, "TODO")
+        self.assertEqual(tasks["Druga"].status, "DONE")
+        self.assertEqual(tasks["Druga"].assigned_to, self.other_user)
+        self.assertEqual(str(tasks["Druga"].due_date), "2025-06-01")
+        self.assertEqual(tasks["Druga"].comments.get().author, self.other_user)
+
+    def test_json_stream_reads_small_chunks(self):
+        text = '{"a": 12345, "list": [{"x": "zażółć"}, 678, []], "b": {"c": true}}'
+        stream = JsonStream(io.BytesIO(text.encode()), chunk_size=3)
+        self.assertEqual(list(stream.members()), [
+            ('a', 12345, False),
+            ('list', {'x': 'zażółć'}, True), ('list', 678, True), ('list', [], True),
+            ('b', {'c': True}, False),
+        ])
+
+    def test_invalid_file(self):
+        response = self.upload("to nie jest json", 'board.txt')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_error_discards_imported_projects(self):
+        lines = ['{"type": "project", "id": 1, "name": "Częściowy"}']
+        lines += ['{"type": "task", "project": 1, "title": "T%d"}' % i for i in range(5)]
+        lines.append('{"type": "task", "project": 1, "title": ')
+        with self.assertRaises(ImportFormatError):
+            BoardImporter(self.user, batch_size=2).run(iter_file_records(io.StringIO('\n'.join(lines)), 'ndjson'))
+        self.assertFalse(Project.objects.filter(name="Częściowy").exists())
+        self.assertFalse(Task.objects.exists())
+
+    def test_invalid_field_values(self):
+        for record in (
+            '{"type": "task", "title": 5}',
+            '{"type": "task", "title": "A", "created_at": "2025-13-45T10:00:00"}',
+            '{"type": "task", "title": "A", "due_date": "jutro"}',
+            '{"type": "task", "title": "A", "assigned_to": ["other"]}',
+        ):
+            with self.subTest(record=record):
+                content = '{"type": "project", "name": "Zły"}\n' + record
+                response = self.upload(content, 'board.ndjson')
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertFalse(Project.objects.filter(name="Zły").exists())
+
+    def test_management_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as f:
+            f.write('{"type": "project", "id": 1, "name": "Z pliku"}\n')
+            f.write('{"type": "task", "id": 5, "project": 1, "title": "A", "assigned_to": "other"}\n')
+            f.write('{"type": "comment", "task": 5, "author": "nieznany", "content": "B"}\n')
+        call_command('import_board', f.name, owner='user', stdout=io.StringIO())
+        os.unlink(f.name)
+        project = Project.objects.get(name="Z pliku")
+        self.assertEqual(project.owner, self.user)
+        self.assertEqual(project.tasks.get().comments.get().author, self.user)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name="Projekt", owner=self.user)
+        self.task = Task.objects.create(title="Zadanie", project=self.project)
+
+    def assertNotModifiedUntil(self, url, change):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        with self.assertNumQueries(1):
+            cached = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+        change()
+        fresh = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(fresh.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(fresh['ETag'], etag)
+
+    def test_last_modified(self):
+        response = self.client.get(f"/api/projects/{self.project.id}/")
+        cached = self.client.get(
+            f"/api/projects/{self.project.id}/", HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_project_detail_changes_with_comment(self):
+        self.assertNotModifiedUntil(
+            f"/api/projects/{self.project.id}/",
+            lambda: Comment.objects.create(task=self.task, author=self.user, content="Nowy"),
+        )
+
+    def test_task_list_changes_with_status(self):
+        def change():
+            self.task.status = "DONE"
+            self.task.save()
+        self.assertNotModifiedUntil("/api/tasks/", change)
+
+    def test_task_list_changes_with_delete(self):
+        other = Task.objects.create(title="Drugie", project=self.project)
+        self.assertNotModifiedUntil("/api/tasks/by-status/?status=TODO", other.delete)
+
+    def test_task_comments_change_with_new_comment(self):
+        self.assertNotModifiedUntil(
+            f"/api/tasks/{self.task.id}/comments/",
+            lambda: Comment.objects.create(task=self.task, author=self.user, content="Nowy"),
+        )
+
+    def test_list_changes_with_embedded_user(self):
+        self.task.assigned_to = self.user
+        self.task.save()
+
+        def rename():
+            self.user.username = 'nowa-nazwa'
+            self.user.save()
+        self.assertNotModifiedUntil("/api/tasks/", rename)
+
+    def test_process_local_cache_warning(self):
+        locmem = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        with override_settings(CACHES=locmem):
+            self.assertEqual([e.id for e in shared_cache_check(None)], ['tablica.W001'])
+        self.assertEqual(shared_cache_check(None), [])
+
+    def test_list_if_modified_since_after_delete(self):
+        old = Task.objects.create(title="Stare", project=self.project)
+        Task.objects.filter(pk=old.pk).update(updated_at=timezone.now() - timedelta(days=1))
+        response = self.client.get("/api/tasks/")
+        self.assertNotIn('Last-Modified', response)
+        old.delete()
+        since = http_date(time.time() + 60)
+        fresh = self.client.get("/api/tasks/", HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(fresh.status_code, status.HTTP_200_OK)
+        self.assertNotIn(old.pk, [task['id'] for task in fresh.data['results']])
+
+    def test_detail_last_modified_follows_users(self):
+        yesterday = timezone.now() - timedelta(days=1)
+        Project.objects.filter(pk=self.project.pk).update(updated_at=yesterday)
+        cache.set(USERS_VERSION_KEY, int(yesterday.timestamp()) * 10 ** 9)
+        response = self.client.get(f"/api/projects/{self.project.id}/")
+        self.user.username = 'nowa-nazwa'
+        self.user.save()
+        fresh = self.client.get(
+            f"/api/projects/{self.project.id}/", HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(fresh.status_code, status.HTTP_200_OK)
+        self.assertEqual(fresh.data['owner']['username'], 'nowa-nazwa')
+
+    def test_list_validator_reads_only_the_page(self):
+        for i in range(3):
+            Task.objects.create(title=f"Zadanie {i}", project=self.project)
+        response = self.client.get("/api/tasks/?page_size=2")
+        with CaptureQueriesContext(connection) as queries:
+            cached = self.client.get("/api/tasks/?page_size=2", HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertNotIn('COUNT(', queries[0]['sql'])
+        self.assertIn('LIMIT 3', queries[0]['sql'])
+        # zmiana wiersza spoza strony nie unieważnia jej
+        last = Task.objects.order_by('-created_at').first()
+        last.title = "Zmienione"
+        last.save()
+        cached = self.client.get("/api/tasks/?page_size=2", HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_depends_on_query(self):
+        first = self.client.get("/api/tasks/?fields=id")
+        second = self.client.get("/api/tasks/?fields=id,title", HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+
+
+class CounterTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name="Projekt", owner=self.user)
+        self.other_project = Project.objects.create(name="Inny", owner=self.user)
+
+    def assertCounts(self, project, **expected):
+        project.refresh_from_db()
+        self.assertEqual({name: getattr(project, name) for name in expected}, expected)
+
+    def test_rest_writes_keep_counters_exact(self):
+        response = self.client.post("/api/tasks/", {"title": "A", "project": self.project.id}, format="json")
+        task_id = response.data['id']
+        self.client.post("/api/tasks/", {"title": "B", "project": self.project.id, "status": "DONE"}, format="json")
+        self.client.post("/api/comments/", {"task": task_id, "content": "K"}, format="json")
+        self.client.post(
+            "/api/attachments/",
+            {"task": task_id, "file": SimpleUploadedFile("a.txt", b"x", content_type="text/plain")},
+            format="multipart",
+        )
+        self.assertCounts(self.project, task_count=2, open_task_count=1, comment_count=1, attachment_count=1)
+        task = Task.objects.get(pk=task_id)
+        self.assertEqual((task.comment_count, task.attachment_count), (1, 1))
+
+        self.client.patch(f"/api/tasks/{task_id}/", {"status": "DONE"}, format="json")
+        self.assertCounts(self.project, open_task_count=0)
+
+        self.client.patch(f"/api/tasks/{task_id}/", {"project": self.other_project.id}, format="json")
+        self.assertCounts(self.project, task_count=1, comment_count=0, attachment_count=0)
+        self.assertCounts(self.other_project, task_count=1, open_task_count=0, comment_count=1, attachment_count=1)
+
+        self.client.delete(f"/api/tasks/{task_id}/")
+        self.assertCounts(self.other_project, task_count=0, comment_count=0, attachment_count=0)
+
+    def test_graphql_mutations_keep_counters_exact(self):
+        result = schema.execute(
+            'mutation($p: Int!, $u: Int!) { createTask(title: "A", projectId: $p, status: "INPR") { task { id } } '
+            'createComment(content: "K", taskId: 0, authorId: $u) { comment { id } } }',
+            variable_values={'p': self.project.id, 'u': self.user.id},
+        )
+        self.assertEqual(result.errors[0].path, ['createComment'])
+        task_id = int(result.data['createTask']['task']['id'])
+        schema.execute(
+            'mutation($t: Int!, $u: Int!) { createComment(content: "K", taskId: $t, authorId: $u) { comment { id } } }',
+            variable_values={'t': task_id, 'u': self.user.id},
+        )
+        self.assertCounts(self.project, task_count=1, open_task_count=1, comment_count=1)
+        schema.execute('mutation($t: Int!) { deleteTask(id: $t) { ok } }', variable_values={'t': task_id})
+        self.assertCounts(self.project, task_count=0, open_task_count=0, comment_count=0)
+
+    def test_stale_instances_do_not_count_twice(self):
+        Task.objects.create(title="A", project=self.project)
+        # dwa równoległe PATCH: obie instancje wczytane przed zapisem
+        first, second = Task.objects.get(), Task.objects.get()
+        first.status = second.status = 'DONE'
+        first.save()
+        second.save()
+        self.assertCounts(self.project, task_count=1, open_task_count=0)
+        first.status = 'TODO'
+        first.save()
+        self.assertCounts(self.project, open_task_count=1)
+
+    def test_count_endpoints_read_counters(self):
+        task = Task.objects.create(title="A", project=self.project)
+        Comment.objects.create(task=task, author=self.user, content="K")
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/projects/with-comment-count/")
+        counts = {row['id']: row['comment_count'] for row in response.data}
+        self.assertEqual(counts[self.project.id], 1)
+        response = self.client.get("/api/tasks/average-per-project/")
+        self.assertEqual(response.data['avg'], 0.5)
+
+    def test_recount_repairs_drift(self):
+        task = Task.objects.create(title="A", project=self.project)
+        Comment.objects.create(task=task, author=self.user, content="K")
+        Project.objects.update(task_count=7, comment_count=7)
+        Task.objects.update(comment_count=7)
+        call_command('recount', stdout=io.StringIO())
+        self.assertCounts(self.project, task_count=1, open_task_count=1, comment_count=1)
+        task.refresh_from_db()
+        self.assertEqual(task.comment_count, 1)
+
+
+class ProjectStatsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name="Projekt", owner=self.user)
+        self.empty = Project.objects.create(name="Pusty", owner=self.user, is_active=False)
+        for task_status in ("TODO", "TODO", "DONE"):
+            task = Task.objects.create(title="Zadanie", project=self.project, status=task_status)
+            Comment.objects.create(task=task, author=self.user, content="A")
+            Comment.objects.create(task=task, author=self.user, content="B")
+        Attachment.objects.create(task=task, file="attachments/test.txt")
+
+    def test_rest_stats(self):
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/projects/stats/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stats = {row['id']: row for row in response.data}
+        self.assertEqual(stats[self.project.id]['tasks_by_status'], {'TODO': 2, 'INPR': 0, 'DONE': 1})
+        self.assertEqual(stats[self.project.id]['task_count'], 3)
+        self.assertEqual(stats[self.project.id]['comment_count'], 6)
+        self.assertEqual(stats[self.project.id]['attachment_count'], 1)
+        self.assertEqual(stats[self.empty.id]['task_count'], 0)
+
+    def test_rest_stats_active_filter(self):
+        response = self.client.get("/api/projects/stats/?active=false")
+        self.assertEqual([row['id'] for row in response.data], [self.empty.id])
+
+    def test_graphql_stats(self):
+        result = schema.execute(
+            '{ projectStats { id taskCount commentCount tasksByStatus { status count } } }'
+        )
+        self.assertIsNone(result.errors)
+        stats = {int(row['id']): row for row in result.data['projectStats']}
+        self.assertEqual(stats[self.project.id]['commentCount'], 6)
+        self.assertIn({'status': 'DONE', 'count': 1}, stats[self.project.id]['tasksByStatus'])
+
+
+class IndexAdvisorTests(TestCase):
+
+    def advise(self, queryset):
+        advisor = IndexAdvisor()
+        with CaptureQueriesContext(connection) as captured:
+            list(queryset)
+        advisor.observe('test', captured.captured_queries)
+        return advisor
+
+    def test_status_filter_uses_index(self):
+        advisor = self.advise(Task.objects.filter(status='TODO').order_by('created_at'))
+        self.assertEqual(advisor.findings, {})
+
+    def test_task_comments_use_index(self):
+        advisor = self.advise(Comment.objects.filter(task_id=1).order_by('created_at'))
+        self.assertEqual(advisor.findings, {})
+
+    def test_proposes_composite_index(self):
+        advisor = self.advise(Task.objects.filter(title='x').order_by('updated_at'))
+        kinds = {kind for kind, *_ in advisor.findings['test']}
+        self.assertIn('full scan', kinds)
+        self.assertEqual(
+            [(model, fields) for model, fields, _ in advisor.suggestions()],
+            [(Task, ['title', 'updated_at'])]
+        )
+
+
+class SQLiteBackendTests(TestCase):
+
+    def test_pragmas_and_immediate_transactions(self):
+        with tempfile.TemporaryDirectory() as directory:
+            wrapper = DatabaseWrapper({
+                **connection.settings_dict,
+                'NAME': os.path.join(directory, 'db.sqlite3'),
+                'OPTIONS': {'pragmas': {'cache_size': -1000}},
+            }, alias='pragmas')
+            try:
+                with wrapper.cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode')
+                    self.assertEqual(cursor.fetchone()[0], 'wal')
+                    cursor.execute('PRAGMA synchronous')
+                    self.assertEqual(cursor.fetchone()[0], 1)
+                    cursor.execute('PRAGMA cache_size')
+                    self.assertEqual(cursor.fetchone()[0], -1000)
+                self.assertEqual(wrapper.transaction_mode, 'IMMEDIATE')
+                with wrapper.deferred_transactions():
+                    self.assertIsNone(wrapper.transaction_mode)
+                self.assertEqual(wrapper.transaction_mode, 'IMMEDIATE')
+            finally:
+                wrapper.close()
+
+    def test_retry_policy_retries_only_lock_errors(self):
+        policy = RetryPolicy(retries=3, backoff=0)
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise sqlite3.OperationalError('database is locked')
+            return 'ok'
+        self.assertEqual(policy.call(flaky), 'ok')
+        self.assertEqual(len(calls), 3)
+
+        def broken():
+            raise sqlite3.OperationalError('no such table: x')
+        with self.assertRaises(sqlite3.OperationalError):
+            policy.call(broken)
+
+
+class WriteQueueTests(TransactionTestCase):
+
+    def test_group_commit_isolates_failing_job(self):
+        queue = WriteQueue()
+        futures = [
+            queue.submit(User.objects.create, username=username)
+            for username in ('a', 'b', 'a', 'c')
+        ]
+        queue.start()
+        queue.stop()
+        self.assertEqual(queue.batches, 1)
+        self.assertEqual(queue.jobs, 4)
+        self.assertIsInstance(futures[2].exception(), IntegrityError)
+        self.assertEqual([futures[i].result().username for i in (0, 1, 3)], ['a', 'b', 'c'])
+        self.assertEqual(
+            list(User.objects.order_by('pk').values_list('username', flat=True)), ['a', 'b', 'c']
+        )
+
+    def test_synchronous_call(self):
+        queue = WriteQueue().start()
+        try:
+            self.assertEqual(queue.call(User.objects.create, username='x').username, 'x')
+            with self.assertRaises(ValueError):
+                queue.call(int, 'nie liczba')
+        finally:
+            queue.stop()
+
+
+class SerializedWritesTests(TestCase):
+
+    @override_settings(TABLICA={'SERIALIZED_WRITES': True})
+    def test_open_transaction_writes_directly(self):
+        owner = User.objects.create_user(username='writer', password='pass')
+        project = writer.run_write(Project.objects.create, name='P', owner=owner)
+        self.assertTrue(Project.objects.filter(pk=project.pk).exists())
+        self.assertEqual(writer._writers, {})
+
+
+@override_settings(TABLICA={'READ_REPLICAS': ['replica']})
+class ReplicaRoutingTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def route(self, request):
+        seen = []
+
+        def get_response(request):
+            seen.append(ReplicaRouter().db_for_read(Task))
+            return None
+        ReplicaMiddleware(get_response)(request)
+        return seen[0]
+
+    def request(self, method, user_id=None, **extra):
+        request = getattr(self.factory, method)('/api/tasks/', **extra)
+        request.user = SimpleNamespace(is_authenticated=user_id is not None, pk=user_id)
+        return request
+
+    def test_reads_go_to_replica_and_writes_to_primary(self):
+        self.assertEqual(self.route(self.request('get')), 'replica')
+        self.assertIsNone(self.route(self.request('post')))
+        self.assertEqual(ReplicaRouter().db_for_write(Task), 'default')
+
+    def test_reads_stick_to_primary_after_write(self):
+        self.assertIsNone(self.route(self.request('patch', user_id=1)))
+        self.assertIsNone(self.route(self.request('get', user_id=1)))
+        self.assertEqual(self.route(self.request('get', user_id=2)), 'replica')
+
+    def test_jwt_user_is_sticky(self):
+        token = str(AccessToken.for_user(SimpleNamespace(id=5, pk=5)))
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+        self.route(self.request('delete', **auth))
+        self.assertIsNone(self.route(self.request('get', **auth)))
+
+    def test_process_local_cache_warning(self):
+        locmem = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        with override_settings(CACHES=locmem):
+            self.assertIn('tablica.W002', [e.id for e in shared_cache_check(None)])
+
+    @override_settings(TABLICA={'READ_REPLICAS': []})
+    def test_without_replicas_everything_goes_to_primary(self):
+        self.assertIsNone(self.route(self.request('get')))
+
+    def test_graphql_operation_type(self):
+        self.assertEqual(operation_type('{ allTasks { id } }'), OperationType.QUERY)
+        self.assertEqual(
+            operation_type('query A { allTasks { id } } mutation B { deleteTask(id: 1) { ok } }', 'B'),
+            OperationType.MUTATION
+        )
+        self.assertIsNone(operation_type('{ niepoprawne'))
+
+
+@override_settings(TABLICA={'SHARDS': ['default', 'shard_1']})
+class ShardingTests(TestCase):
+    databases = {'default', 'shard_1'}
+
+    def setUp(self):
+        sharding._directory.clear()
+        sharding.seed_sequences('shard_1')
+        self.owner = User.objects.create_user(username='owner', password='ownerpass')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.owner)
+        self.projects = []
+        for alias in ('default', 'shard_1'):
+            with sharding.use_shard(alias):
+                project = Project.objects.create(name=f'Projekt {alias}', owner=self.owner)
+                project.members.add(self.owner)
+                Task.objects.create(title=f'Zadanie {alias}', project=project, status='TODO')
+            self.projects.append(project)
+
+    def test_project_tree_lives_on_its_shard(self):
+        first, second = self.projects
+        self.assertLess(first.pk, 1 << 27)
+        self.assertGreaterEqual(second.pk, 1 << 27)
+        self.assertEqual(shard_for(Project, second.pk), 'shard_1')
+        task = Task.objects.using('shard_1').get(project=second)
+        self.assertEqual(shard_for(Task, task.pk), 'shard_1')
+        self.assertTrue(User.objects.using('shard_1').filter(username='owner').exists())
+        self.assertEqual(Project.objects.using('shard_1').get().task_count, 1)
+
+    def test_api_routes_by_id_and_payload(self):
+        second = self.projects[1]
+        response = self.client.get(f'/api/projects/{second.pk}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['name'], 'Projekt shard_1')
+
+        response = self.client.post('/api/tasks/', {'title': 'Nowe', 'project': second.pk}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        task_id = response.data['id']
+        self.assertTrue(Task.objects.using('shard_1').filter(pk=task_id).exists())
+
+        response = self.client.post('/api/comments/', {'task': task_id, 'content': 'Hej'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.get(f'/api/tasks/{task_id}/comments/')
+        self.assertEqual([c['content'] for c in response.data['results']], ['Hej'])
+
+    def test_new_projects_go_to_least_loaded_shard(self):
+        Project.objects.using('shard_1').filter(pk=self.projects[1].pk).delete()
+        forget_project(self.projects[1].pk)
+        response = self.client.post('/api/projects/', {'name': 'Nowy', 'members': [self.owner.pk]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Project.objects.using('shard_1').filter(pk=response.data['id']).exists())
+
+    def test_choose_shard_counts_in_database(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertIn(choose_shard(), ('default', 'shard_1'))
+        self.assertEqual(len(queries), 1)
+        self.assertIn('GROUP BY', queries[0]['sql'])
+
+    def test_lists_and_aggregates_cover_all_shards(self):
+        response = self.client.get('/api/tasks/?page_size=1')
+        self.assertEqual([t['title'] for t in response.data['results']], ['Zadanie default'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([t['title'] for t in response.data['results']], ['Zadanie shard_1'])
+        self.assertIsNone(response.data['next'])
+
+        response = self.client.get('/api/tasks/status-summary/')
+        self.assertEqual(list(response.data), [{'status': 'TODO', 'count': 2}])
+        response = self.client.get('/api/tasks/average-per-project/')
+        self.assertEqual(response.data['avg'], 1)
+        response = self.client.get('/api/projects/stats/')
+        self.assertEqual(sorted(row['task_count'] for row in response.data), [1, 1])
+        response = self.client.get('/api/projects/')
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_graphql_reads_and_mutates_across_shards(self):
+        second = self.projects[1]
+        response = self.client.post('/graphql/', {'query': '{ allProjects { name owner { username } } }'}, format='json')
+        names = sorted(p['name'] for p in response.json()['data']['allProjects'])
+        self.assertEqual(names, ['Projekt default', 'Projekt shard_1'])
+        mutation = 'mutation { createTask(title: "GQL", projectId: %d, status: "TODO") { task { id } } }' % second.pk
+        response = self.client.post('/graphql/', {'query': mutation}, format='json')
+        task_id = int(response.json()['data']['createTask']['task']['id'])
+        self.assertTrue(Task.objects.using('shard_1').filter(pk=task_id, title='GQL').exists())
+
+    def test_graphql_connection_pages_across_shards(self):
+        query = 'query($after: String) { allTasks(first: 1, after: $after) { edges { node { title } } pageInfo { hasNextPage endCursor } } }'
+        titles, after = [], None
+        for _ in range(2):
+            response = self.client.post('/graphql/', {'query': query, 'variables': {'after': after}}, format='json')
+            page = response.json()['data']['allTasks']
+            titles += [edge['node']['title'] for edge in page['edges']]
+            after = page['pageInfo']['endCursor']
+        self.assertEqual(titles, ['Zadanie default', 'Zadanie shard_1'])
+        self.assertFalse(page['pageInfo']['hasNextPage'])
+
+
+@override_settings(TABLICA={'SHARDS': ['default', 'shard_1']})
+class ScatterTests(SimpleTestCase):
+    databases = {'default', 'shard_1'}
+
+    def test_scatter_runs_each_shard_in_pool(self):
+        results = scatter(lambda: (current_shard.get(), threading.current_thread().name))
+        self.assertEqual([alias for alias, _ in results], ['default', 'shard_1'])
+        self.assertTrue(all(name.startswith('tablica-shard') for _, name in results))
+        merged = merge_sorted([[{'n': 1}, {'n': 4}], [{'n': 2}, {'n': 3}]], ['-n'])
+        self.assertEqual([row['n'] for row in merged], [4, 3, 2, 1])
+
+    @override_settings(TABLICA={'SHARDS': ['default', 'shard_1'], 'QUERY_BUDGET_STRICT': True})
+    def test_query_budget_counts_shard_threads(self):
+        request = RequestFactory().get('/api/projects/active/')
+        force_authenticate(request, user=SimpleNamespace(is_authenticated=True, pk=1, is_active=True))
+        view = ProjectViewSet.as_view({'get': 'active_projects'}, query_budgets={'active_projects': 0})
+        with self.assertRaises(QueryBudgetExceeded):
+            view(request)
+
+
+class SQLTimeBudgetTests(TransactionTestCase):
+    # poza TestCase - w otwartej transakcji zapytania nie są przerywane
+
+    def setUp(self):
+        metrics.reset()
+        self.owner = User.objects.create_user(username='owner', password='ownerpass', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.owner)
+        project = Project.objects.create(name='Duży', owner=self.owner)
+        Task.objects.bulk_create(Task(title=f'Zadanie {i}', project=project) for i in range(2000))
+
+    def test_time_budget_interrupts_slow_query(self):
+        slow = (
+            'WITH RECURSIVE r(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM r WHERE n < 100000000) '
+            'SELECT count(*) FROM r'
+        )
+        with self.assertRaises(QueryTimeout):
+            with time_budget(0.05, 'test'), connection.cursor() as cursor:
+                cursor.execute(slow)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+    @override_settings(TABLICA={'SQL_TIME_BUDGETS': {'ProjectViewSet.stats': 1e-6}})
+    def test_view_over_budget_returns_503_and_counts_overrun(self):
+        response = self.client.get('/api/projects/stats/')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response.data['code'], 'query_timeout')
+        self.assertEqual(self.client.get('/api/projects/').status_code, status.HTTP_200_OK)
+        response = self.client.get('/api/metrics/')
+        self.assertEqual(response.data['sql_time_budget_overruns'], {'ProjectViewSet.stats': 1})
+
+    @override_settings(TABLICA={'GRAPHQL_TIME_BUDGETS': {'Query.taskStatusSummary': 1e-6}})
+    def test_graphql_resolver_budget(self):
+        # strona allTasks to LIMIT z indeksu - za krótko na przerwanie
+        response = self.client.post('/graphql/', {'query': '{ taskStatusSummary allProjects { id } }'}, format='json')
+        body = response.json()
+        self.assertEqual(body['errors'][0]['extensions']['code'], 'QUERY_TIMEOUT')
+        self.assertEqual(body['errors'][0]['path'], ['taskStatusSummary'])
+        self.assertEqual(len(body['data']['allProjects']), 1)
+
+
+class FullTextSearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', password='ownerpass', is_staff=True, is_superuser=True)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name='Projekt', owner=self.user)
+        self.other = Project.objects.create(name='Inny', owner=self.user)
+        self.report = Task.objects.create(
+            title='Raport kwartalny', description='Zebrać dane sprzedaży', project=self.project
+        )
+        self.bug = Task.objects.create(
+            title='Błąd logowania', description='Raport <b>użytkownika</b>', project=self.project, status='DONE'
+        )
+        self.elsewhere = Task.objects.create(title='Raport roczny', project=self.other)
+        self.comment = Comment.objects.create(task=self.bug, author=self.user, content='Dołączam raport z konsoli')
+
+    def search(self, **params):
+        response = self.client.get('/api/search/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(row['type'], row['id']) for row in response.data['results']]
+
+    def test_ranking_prefix_and_filters(self):
+        results = self.search(q='rapor')
+        # trafienie w tytule waży więcej niż w treści
+        self.assertEqual(set(results[:2]), {('task', self.report.pk), ('task', self.elsewhere.pk)})
+        self.assertEqual(len(results), 4)
+        self.assertEqual(set(self.search(q='raport', project=self.project.pk, status='DONE')),
+                         {('task', self.bug.pk), ('comment', self.comment.pk)})
+        self.assertEqual(self.search(q='raport', type='comment'), [('comment', self.comment.pk)])
+        self.assertEqual(self.search(q='   '), [])
+        self.assertEqual(self.client.get('/api/search/', {'q': 'x', 'status': 'NOPE'}).status_code, 400)
+
+    def test_snippet_is_escaped_and_highlighted(self):
+        response = self.client.get('/api/search/', {'q': 'użytkownika'})
+        snippet = response.data['results'][0]['snippet']
+        self.assertIn('<mark>użytkownika</mark>', snippet)
+        self.assertIn('&lt;b&gt;', snippet)
+
+    def test_index_follows_updates_and_deletes(self):
+        self.report.title = 'Podsumowanie'
+        self.report.save()
+        Comment.objects.filter(pk=self.comment.pk).update(content='bez słów kluczowych')
+        self.assertNotIn(('task', self.report.pk), self.search(q='kwartalny'))
+        self.assertIn(('task', self.report.pk), self.search(q='podsumowanie'))
+        self.assertEqual(self.search(q='konsoli'), [])
+        self.bug.delete()
+        self.assertEqual(self.search(q='logowania'), [])
+
+    def test_graphql_and_admin_use_index(self):
+        query = '{ search(q: "raport", type: "task", projectId: %d) { type id snippet } }' % self.other.pk
+        response = self.client.post('/graphql/', {'query': query}, format='json')
+        self.assertEqual(response.json()['data']['search'][0]['id'], str(self.elsewhere.pk))
+        self.client.force_login(self.user)
+        response = self.client.get('/admin/tablica/task/', {'q': 'roczny'})
+        self.assertContains(response, 'Raport roczny')
+        self.assertNotContains(response, 'Raport kwartalny')
+
+
+@override_settings(TABLICA={'ATTACHMENT_EXTRACT_WORKERS': 0})
+class AttachmentContentTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', password='ownerpass')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name='Projekt', owner=self.user)
+        self.task = Task.objects.create(title='Zadanie', project=self.project)
+
+    def upload(self, name, content):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/attachments/', {'task': self.task.pk, 'file': SimpleUploadedFile(name, content)}
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('content_text', response.data)
+        return Attachment.objects.get(pk=response.data['id'])
+
+    def test_uploaded_text_is_searchable(self):
+        attachment = self.upload('notatki.txt', 'Spotkanie z dostawcą w środę'.encode('cp1250'))
+        self.assertIsNotNone(attachment.content_extracted_at)
+        response = self.client.get('/api/search/', {'q': 'dostawca', 'type': 'attachment'})
+        self.assertEqual(
+            [(row['type'], row['id'], row['task_id']) for row in response.data['results']],
+            [('attachment', attachment.pk, self.task.pk)],
+        )
+        # nazwa pliku też jest w indeksie
+        self.assertEqual(len(self.client.get('/api/search/', {'q': 'notatki'}).data['results']), 1)
+
+    def test_unsupported_file_is_marked_extracted(self):
+        attachment = self.upload('obraz.png', b'\x89PNG\r\n\x1a\n\x00\x00')
+        self.assertEqual(attachment.content_text, '')
+        self.assertIsNotNone(attachment.content_extracted_at)
+
+    def test_rtf_extraction(self):
+        with open('attachments/Lista_granatow_Mirage.rtf', 'rb') as stream:
+            text = extract_rtf(stream.read())
+        self.assertTrue(text.startswith('SMOKE TT\n'))
+        self.assertNotIn('Calibri', text)
+        self.assertNotIn('Riched20', text)
+        self.assertEqual(extract_rtf(rb"{\rtf1\ansi\ansicpg1250 Za\'bf\'f3\'b3\u263? g\'eal\par}"), 'Zażółć gęl')
+
+
+class BulkTaskTests(TestCase):
+    url = '/api/tasks/bulk/'
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', password='ownerpass')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(name='Projekt', owner=self.user)
+        self.other = Project.objects.create(name='Inny', owner=self.user)
+
+    def test_create_batch_with_per_item_results(self):
+        items = [
+            {'title': f'Zadanie {i}', 'project': self.project.pk if i % 2 else self.other.pk,
+             'assigned_to': self.user.pk, 'status': 'DONE' if i < 3 else 'TODO'}
+            for i in range(20)
+        ]
+        items += [{'title': 'Bez projektu', 'project': 999999}, {'project': self.project.pk}]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, items, format='json')
+        self.assertLess(len(queries), 20)
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        results = response.data['results']
+        self.assertEqual([result['status'] for result in results], [201] * 20 + [400, 400])
+        self.assertIn('project', results[20]['errors'])
+        self.assertIn('title', results[21]['errors'])
+        self.assertEqual(results[1]['data']['title'], 'Zadanie 1')
+        self.assertEqual(results[1]['data']['assigned_to']['username'], 'owner')
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.task_count, self.project.open_task_count), (10, 9))
+
+    def test_update_and_delete(self):
+        tasks = [Task.objects.create(title=f'T{i}', project=self.project) for i in range(4)]
+        Comment.objects.create(task=tasks[0], author=self.user, content='Komentarz')
+        changes = [
+            {'id': tasks[0].pk, 'status': 'DONE'},
+            {'id': tasks[1].pk, 'project': self.other.pk, 'title': 'Przeniesione'},
+            {'id': tasks[2].pk, 'status': 'NOPE'},
+            {'id': 999999, 'status': 'DONE'},
+        ]
+        response = self.client.patch(self.url, changes, format='json')
+        self.assertEqual([result['status'] for result in response.data['results']], [200, 200, 400, 404])
+        self.assertEqual(Task.objects.get(pk=tasks[1].pk).project_id, self.other.pk)
+        self.project.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual((self.project.task_count, self.project.open_task_count), (3, 2))
+        self.assertEqual((self.other.task_count, self.other.open_task_count), (1, 1))
+
+        response = self.client.delete(self.url, [tasks[0].pk, tasks[3].pk, 999999], format='json')
+        self.assertEqual([result['status'] for result in response.data['results']], [204, 204, 404])
+        self.assertFalse(Comment.objects.exists())
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.task_count, self.project.comment_count), (1, 0))
+        self.assertEqual(self.client.delete(self.url, {'id': 1}, format='json').status_code, 400)
+
+    def test_delete_removes_search_rows_and_counters(self):
+        task = Task.objects.create(title='Szukane', project=self.project, status='DONE')
+        kept = Task.objects.create(title='Zostaje', project=self.project)
+        Comment.objects.create(task=task, author=self.user, content='Komentarz')
+        Attachment.objects.create(task=task, file=SimpleUploadedFile('a.txt', b'tekst'))
+        response = self.client.delete(self.url, [task.pk], format='json')
+        self.assertEqual(response.data['results'][0]['status'], 204)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT object_id FROM tablica_search')
+            self.assertEqual([row[0] for row in cursor.fetchall()], [kept.pk])
+        self.project.refresh_from_db()
+        self.assertEqual(
+            (self.project.task_count, self.project.open_task_count,
+             self.project.comment_count, self.project.attachment_count),
+            (1, 1, 0, 0),
+        )
+
+    def test_filtered_update_is_one_statement(self):
+        helper = User.objects.create_user(username='helper', password='helperpass')
+        for i in range(6):
+            Task.objects.create(title=f'T{i}', project=self.project, assigned_to=self.user,
+                                status='INPR' if i < 4 else 'TODO')
+        Task.objects.create(title='Inny', project=self.other, assigned_to=self.user, status='INPR')
+        payload = {'filter': {'project': self.project.pk, 'assigned_to': self.user.pk, 'status': 'INPR'},
+                   'set': {'status': 'DONE'}}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/tasks/bulk-update/', payload, format='json')
+        self.assertEqual(response.data, {'updated': 4})
+        self.assertEqual(len([q for q in queries if q['sql'].startswith('UPDATE "tablica_task"')]), 1)
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.task_count, self.project.open_task_count), (6, 2))
+        self.assertEqual(Task.objects.filter(project=self.other, status='INPR').count(), 1)
+
+        query = '''mutation { bulkUpdateTasks(filter: {assignedTo: %d, status: ["TODO", "INPR"]},
+                                              set: {assignedTo: %d}) { updated } }''' % (self.user.pk, helper.pk)
+        response = self.client.post('/graphql/', {'query': query}, format='json')
+        self.assertEqual(response.json()['data']['bulkUpdateTasks']['updated'], 3)
+        self.assertEqual(Task.objects.filter(assigned_to=helper).count(), 3)
+
+        for payload in ({'filter': {}, 'set': {'status': 'DONE'}},
+                        {'filter': {'status': 'NOPE'}, 'set': {'status': 'DONE'}},
+                        {'filter': {'project': self.project.pk}, 'set': {'assigned_to': 999999}}):
+            self.assertEqual(self.client.post('/api/tasks/bulk-update/', payload, format='json').status_code, 400)
+        query = 'mutation { bulkUpdateTasks(filter: {}, set: {status: "DONE"}) { updated } }'
+        response = self.client.post('/graphql/', {'query': query}, format='json')
+        self.assertIn('filter', response.json()['errors'][0]['message'])
+
+
+class GraphQLBatchingTests(TestCase):
+    query = '''{ allProjects { name owner { username } members { username }
+        tasks { title assignedTo { username } project { name }
+                comments { content author { username } task { title } }
+                attachments { id task { id } } } } }'''
+
+    def setUp(self):
+        self.client = APIClient()
+        self.users = [User.objects.create_user(username=f'user{i}', password='pass') for i in range(3)]
+
+    def add_projects(self, count):
+        for i in range(count):
+            project = Project.objects.create(name=f'Projekt {i}', owner=self.users[i % 3])
+            project.members.set(self.users)
+            for j in range(3):
+                task = Task.objects.create(title=f'Zadanie {j}', project=project, assigned_to=self.users[j])
+                Comment.objects.create(task=task, author=self.users[j], content='Komentarz')
+                Attachment.objects.create(task=task, file='attachments/test.txt')
+
+    def run_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/graphql/', {'query': self.query}, format='json')
+        self.assertNotIn('errors', response.json())
+        return response.json()['data']['allProjects'], len(queries)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.add_projects(2)
+        projects, few = self.run_query()
+        self.add_projects(4)
+        projects, many = self.run_query()
+        self.assertEqual(few, many)
+        self.assertEqual(len(projects), 6)
+        task = projects[0]['tasks'][1]
+        self.assertEqual(task['assignedTo']['username'], 'user1')
+        self.assertEqual(task['comments'][0]['author']['username'], 'user1')
+        self.assertEqual(task['comments'][0]['task']['title'], 'Zadanie 1')
+        self.assertEqual(len(projects[0]['members']), 3)
+
+
+class GraphQLCostTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def post(self, query, variables=None):
+        return self.client.post('/graphql/', {'query': query, 'variables': variables or {}}, format='json').json()
+
+    def test_cost_in_extensions(self):
+        # allProjects: 1 + 10 * (tasks: 1 + 10 * (assignedTo: 1))
+        response = self.post('{ allProjects { name tasks { title assignedTo { username } } } }')
+        self.assertEqual(response['extensions']['cost']['requested'], 111)
+        self.assertEqual(response['extensions']['cost']['depth'], 4)
+        response = self.post('query Q($n: Int) { search(q: "x", limit: $n) { id } }', {'n': 3})
+        self.assertEqual(response['extensions']['cost']['requested'], 1)
+
+    @override_settings(TABLICA={'GRAPHQL_MAX_COST': 1000, 'GRAPHQL_FIELD_COSTS': {'Query.search': 50}})
+    def test_costly_and_deep_queries_are_rejected(self):
+        query = '{ allProjects { tasks { project { tasks { comments { author { username } } } } } } }'
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(query)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(response['errors'][0]['extensions']['code'], 'QUERY_TOO_COSTLY')
+        self.assertGreater(response['extensions']['cost']['requested'], 1000)
+        self.assertEqual(self.post('{ search(q: "x") { id } }')['extensions']['cost']['requested'], 50)
+        deep = '''fragment T on TaskType { project { tasks { project { tasks { id } } } } }
+                  { allTasks { edges { node { ...T } } } }'''
+        with override_settings(TABLICA={'GRAPHQL_MAX_COST': None, 'GRAPHQL_MAX_DEPTH': 7}):
+            response = self.post(deep)
+        self.assertEqual(response['errors'][0]['extensions']['code'], 'QUERY_TOO_DEEP')
+        self.assertEqual(response['extensions']['cost']['depth'], 8)
+
+
+class PersistedQueryTests(TestCase):
+    query = '{ allProjects { name } }'
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        documents.clear()
+        user = User.objects.create_user(username='owner', password='ownerpass')
+        Project.objects.create(name='Projekt', owner=user)
+
+    def extensions(self, digest=None):
+        return {'persistedQuery': {'version': 1, 'sha256Hash': digest or query_hash(self.query)}}
+
+    def test_register_on_miss_then_get_by_hash(self):
+        response = self.client.post('/graphql/', {'extensions': self.extensions()}, format='json').json()
+        self.assertEqual(response['errors'][0]['extensions']['code'], 'PERSISTED_QUERY_NOT_FOUND')
+        response = self.client.post('/graphql/', {'query': self.query, 'extensions': self.extensions()}, format='json')
+        self.assertEqual(response.json()['data']['allProjects'], [{'name': 'Projekt'}])
+
+        response = self.client.get('/graphql/', {'extensions': json.dumps(self.extensions())},
+                                   HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['allProjects'], [{'name': 'Projekt'}])
+        self.assertIn('max-age=60', response['Cache-Control'])
+        # tekst sparsowany raz, potem z LRU
+        self.assertEqual((documents.misses, documents.hits), (1, 1))
+
+        response = self.client.post('/graphql/', {'query': self.query, 'extensions': self.extensions('0' * 64)},
+                                    format='json').json()
+        self.assertEqual(response['errors'][0]['extensions']['code'], 'PERSISTED_QUERY_HASH_MISMATCH')
+        mutation = 'mutation { deleteProject(id: 1) { ok } }'
+        response = self.client.get('/graphql/', {'query': mutation}, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 405)
+        self.assertNotIn('Cache-Control', response)
+
+
+class GraphQLProjectionTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        user = User.objects.create_user(username='owner', password='ownerpass')
+        project = Project.objects.create(name='Projekt', description='Długi opis', owner=user)
+        task = Task.objects.create(title='Zadanie', description='Długi opis zadania', project=project, assigned_to=user)
+        Comment.objects.create(task=task, author=user, content='Treść komentarza')
+
+    def run_query(self, query):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/graphql/', {'query': query}, format='json').json()
+        self.assertNotIn('errors', response)
+        return response['data'], [q['sql'] for q in queries if q['sql'].startswith('SELECT')]
+
+    def test_only_selected_columns_are_read(self):
+        data, queries = self.run_query('{ allTasks { edges { node { id name: title } } } }')
+        self.assertEqual(data['allTasks']['edges'], [{'node': {'id': str(Task.objects.get().pk), 'name': 'Zadanie'}}])
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"description"', queries[0])
+        self.assertNotIn('"status"', queries[0])
+
+    def test_fragments_relations_and_nested_lists(self):
+        query = '''fragment C on CommentType { content author { username } }
+            { allTasks { edges { node { title ... on TaskType { assignedTo { username } } comments { ...C } } } } }'''
+        data, queries = self.run_query(query)
+        task = data['allTasks']['edges'][0]['node']
+        self.assertEqual(task['assignedTo']['username'], 'owner')
+        self.assertEqual(task['comments'], [{'content': 'Treść komentarza', 'author': {'username': 'owner'}}])
+        # zadania z JOIN na użytkownika, komentarze z JOIN na autora
+        self.assertEqual(len(queries), 2)
+        self.assertIn('JOIN "auth_user"', queries[0])
+        self.assertNotIn('"password"', queries[0])
+        self.assertNotIn('"description"', queries[0])
+        self.assertIn('JOIN "auth_user"', queries[1])
+
+
+class GraphQLConnectionTests(TestCase):
+    query = '''query($first: Int, $after: String, $last: Int, $before: String, $filter: TaskFilterInput, $order: TaskOrder) {
+        allTasks(first: $first, after: $after, last: $last, before: $before, filter: $filter, orderBy: $order) {
+            edges { cursor node { title } }
+            pageInfo { hasNextPage hasPreviousPage startCursor endCursor } } }'''
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='owner', password='ownerpass')
+        self.project = Project.objects.create(name='Projekt', owner=self.user)
+        start = timezone.now()
+        for i in range(5):
+            Task.objects.create(
+                title=f'Zadanie {i}', project=self.project, created_at=start + timedelta(minutes=i),
+                status='DONE' if i % 2 else 'TODO', assigned_to=self.user if i < 2 else None,
+                due_date=(start + timedelta(days=5 - i)).date() if i < 3 else None,
+            )
+
+    def post(self, query=None, **variables):
+        return self.client.post('/graphql/', {'query': query or self.query, 'variables': variables}, format='json').json()
+
+    def page(self, **variables):
+        response = self.post(**variables)
+        self.assertNotIn('errors', response)
+        connection = response['data']['allTasks']
+        return [edge['node']['title'] for edge in connection['edges']], connection['pageInfo']
+
+    def test_pages_forward_and_backward(self):
+        titles, info = self.page(first=2)
+        self.assertEqual(titles, ['Zadanie 0', 'Zadanie 1'])
+        self.assertEqual((info['hasNextPage'], info['hasPreviousPage']), (True, False))
+        titles, info = self.page(first=2, after=info['endCursor'])
+        self.assertEqual(titles, ['Zadanie 2', 'Zadanie 3'])
+        self.assertEqual((info['hasNextPage'], info['hasPreviousPage']), (True, True))
+        titles, info = self.page(last=3, before=info['endCursor'])
+        self.assertEqual(titles, ['Zadanie 0', 'Zadanie 1', 'Zadanie 2'])
+        self.assertEqual((info['hasNextPage'], info['hasPreviousPage']), (True, False))
+        titles, info = self.page(last=2)
+        self.assertEqual(titles, ['Zadanie 3', 'Zadanie 4'])
+        self.assertEqual((info['hasNextPage'], info['hasPreviousPage']), (False, True))
+
+    def test_filters_and_ordering(self):
+        titles, _ = self.page(filter={'status': ['DONE']}, order='CREATED_AT_DESC')
+        self.assertEqual(titles, ['Zadanie 3', 'Zadanie 1'])
+        # zadania bez terminu na końcu, w obu kierunkach
+        titles, _ = self.page(order='DUE_DATE')
+        self.assertEqual(titles, ['Zadanie 2', 'Zadanie 1', 'Zadanie 0', 'Zadanie 3', 'Zadanie 4'])
+        titles, _ = self.page(order='DUE_DATE_DESC')
+        self.assertEqual(titles, ['Zadanie 0', 'Zadanie 1', 'Zadanie 2', 'Zadanie 3', 'Zadanie 4'])
+        titles, _ = self.page(filter={'unassigned': True, 'createdAfter': Task.objects.get(title='Zadanie 3').created_at.isoformat()})
+        self.assertEqual(titles, ['Zadanie 3', 'Zadanie 4'])
+        response = self.post('{ tasksByUser(userId: %d, filter: {status: ["TODO"]}) { edges { node { title } } } }' % self.user.pk)
+        self.assertEqual(response['data']['tasksByUser']['edges'], [{'node': {'title': 'Zadanie 0'}}])
+
+    def test_pages_across_null_values(self):
+        titles, after = [], None
+        for _ in range(3):
+            page, info = self.page(first=2, after=after, order='DUE_DATE')
+            titles.append(page)
+            after = info['endCursor']
+        self.assertEqual(titles, [['Zadanie 2', 'Zadanie 1'], ['Zadanie 0', 'Zadanie 3'], ['Zadanie 4']])
+        self.assertFalse(info['hasNextPage'])
+        page, info = self.page(last=3, before=after, order='DUE_DATE')
+        self.assertEqual(page, ['Zadanie 1', 'Zadanie 0', 'Zadanie 3'])
+        self.assertTrue(info['hasPreviousPage'])
+
+    def test_invalid_arguments(self):
+        self.assertIn('kursor', self.post(after='nie-kursor')['errors'][0]['message'])
+        self.assertIn('status', self.post(filter={'status': ['XXX']})['errors'][0]['message'])
+        self.assertIn('errors', self.post(first=1, last=1))
+
+    def test_page_is_one_query_with_limit(self):
+        with CaptureQueriesContext(connection) as queries:
+            titles, info = self.page(first=2, filter={'project': self.project.pk})
+        self.assertEqual(len(queries), 1)
+        self.assertIn('LIMIT 3', queries[0]['sql'])
+        self.assertNotIn('"description"', queries[0]['sql'])
+        response = self.post('{ allTasks(first: 3) { edges { node { comments { id } } } pageInfo { hasNextPage } } }')
+        # allTasks 1 + edges (1 + 3 * (node 1 + comments 1)) + pageInfo 1
+        self.assertEqual(response['extensions']['cost']['requested'], 9)
+
+
+class AsyncGraphQLTests(TransactionTestCase):
+    # pola liczą się w wątkach z własnymi połączeniami - dane muszą być zatwierdzone
+
+    def setUp(self):
+        owner = User.objects.create_user(username='owner', password='ownerpass')
+        project = Project.objects.create(name='Projekt', owner=owner)
+        for i in range(3):
+            Task.objects.create(title=f'Zadanie {i}', project=project, status='DONE' if i else 'TODO')
+
+    def post(self, view_class, query, **initkwargs):
+        request = RequestFactory().post('/graphql/', {'query': query}, content_type='application/json')
+        view = view_class.as_view(**initkwargs)
+        response = async_to_sync(view)(request) if view_class.view_is_async else view(request)
+        return json.loads(response.content)
+
+    def test_same_result_as_sync_view(self):
+        query = '''{ activeProjects { name tasks { title } } recentTasks { title project { name } }
+            taskStatusSummary allTasks(first: 2) { edges { node { title } } pageInfo { hasNextPage } }
+            task(id: 999999) { id } }'''
+        result = self.post(AsyncTablicaGraphQLView, query)
+        self.assertEqual(result['data'], self.post(TablicaGraphQLView, query)['data'])
+        self.assertEqual(len(result['data']['recentTasks']), 3)
+        self.assertEqual([error['path'] for error in result['errors']], [['task']])
+
+    def test_top_level_fields_run_concurrently(self):
+
+        def slow(root, info):
+            time.sleep(0.3)
+            return threading.current_thread().name
+
+        class SlowQuery(graphene.ObjectType):
+            first = graphene.String(resolver=slow)
+            second = graphene.String(resolver=slow)
+            third = graphene.String(resolver=slow)
+
+        started = time.monotonic()
+        data = self.post(AsyncTablicaGraphQLView, '{ first second third }', schema=graphene.Schema(query=SlowQuery))['data']
+        self.assertLess(time.monotonic() - started, 0.6)
+        self.assertEqual(len(set(data.values())), 3)
+        self.assertTrue(all(name.startswith('tablica-graphql') for name in data.values()))
+
+    def test_mutations_use_base_view(self):
+        project = Project.objects.get()
+        mutation = 'mutation { a: createTask(title: "A", projectId: %d) { task { id } } b: deleteTask(id: %d) { ok } }' % (
+            project.pk, Task.objects.order_by('pk').first().pk
+        )
+        result = self.post(AsyncTablicaGraphQLView, mutation)
+        self.assertNotIn('errors', result)
+        self.assertEqual(Project.objects.get().task_count, 3)
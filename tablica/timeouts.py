@@ -0,0 +1,160 @@
+"""
+Budżety czasu zapytań SQL. Termin (deadline) żądania albo resolvera jest
+w zmiennej kontekstowej; handler postępu SQLite sprawdza go co
+PROGRESS_INTERVAL instrukcji maszyny wirtualnej i po jego upływie
+przerywa bieżące zapytanie (poza transakcją). Przerwanie zamieniamy
+na QueryTimeout (503) i liczymy w metrykach (tablica/metrics.py).
+"""
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import DatabaseError
+from graphql import GraphQLError
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from . import metrics
+from .conf import get_setting
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_INTERVAL = 10000
+
+# (termin wg time.monotonic(), budżet w sekundach) albo None
+current_budget = ContextVar('tablica_sql_budget', default=None)
+
+
+class QueryTimeout(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_code = 'query_timeout'
+
+    def __init__(self, budget, label=''):
+        self.budget = budget
+        self.label = label
+        super().__init__({
+            'detail': f'Przekroczono budżet czasu zapytań SQL ({budget:g} s).',
+            'code': self.default_code,
+            'budget': budget,
+        })
+
+
+def deadline_passed():
+    budget = current_budget.get()
+    return budget is not None and time.monotonic() >= budget[0]
+
+
+def install_progress_handler(sender, connection, **kwargs):
+    """
+    Odbiornik connection_created: handler postępu na każdym połączeniu SQLite.
+    W otwartej transakcji nie przerywamy - przerwany INSERT/UPDATE/DELETE
+    wycofuje w SQLite całą transakcję (np. całą paczkę kolejki zapisów).
+    """
+    if connection.vendor != 'sqlite':
+        return
+    raw = connection.connection
+
+    def progress():
+        # niezerowy wynik przerywa zapytanie ("interrupted")
+        return not raw.in_transaction and deadline_passed()
+    raw.set_progress_handler(progress, PROGRESS_INTERVAL)
+
+
+def start_budget(seconds):
+    """Ustawia budżet (termin nie później niż już obowiązujący); zwraca token do reset_budget."""
+    if not seconds:
+        return None
+    budget = (time.monotonic() + seconds, seconds)
+    previous = current_budget.get()
+    return current_budget.set(budget if previous is None else min(previous, budget))
+
+
+def reset_budget(token):
+    if token is not None:
+        current_budget.reset(token)
+
+
+def timed_out(exc):
+    """Czy `exc` to zapytanie przerwane po upływie obowiązującego terminu."""
+    return isinstance(exc, DatabaseError) and 'interrupted' in str(exc) and deadline_passed()
+
+
+def overrun(label):
+    budget = current_budget.get()[1]
+    metrics.incr('sql_time_budget_overruns', label)
+    logger.warning('%s: SQL time budget of %gs exceeded', label, budget)
+    return QueryTimeout(budget, label)
+
+
+@contextmanager
+def time_budget(seconds, label=''):
+    """Blok z budżetem czasu SQL; przerwane zapytanie -> QueryTimeout."""
+    token = start_budget(seconds)
+    try:
+        yield
+    except DatabaseError as exc:
+        if timed_out(exc):
+            raise overrun(label) from exc
+        raise
+    finally:
+        reset_budget(token)
+
+
+class TimeBudgetMixin:
+    """
+    Budżet czasu SQL akcji widoku: TABLICA['SQL_TIME_BUDGETS']["Widok.akcja"],
+    potem `time_budgets` (akcja -> sekundy), domyślnie TABLICA['SQL_TIME_BUDGET'].
+    Obejmuje wszystko do zbudowania odpowiedzi (bez strumieniowanej treści,
+    np. eksportu).
+    """
+    time_budgets = {}
+
+    def time_budget_label(self, request):
+        action = getattr(self, 'action', None) or request.method.lower()
+        return '%s.%s' % (type(self).__name__, action), action
+
+    def get_time_budget(self, request):
+        label, action = self.time_budget_label(request)
+        configured = get_setting('SQL_TIME_BUDGETS')
+        if label in configured:
+            return configured[label]
+        return self.time_budgets.get(action, get_setting('SQL_TIME_BUDGET'))
+
+    def initial(self, request, *args, **kwargs):
+        self._time_budget_token = start_budget(self.get_time_budget(request))
+        super().initial(request, *args, **kwargs)
+
+    def handle_exception(self, exc):
+        if timed_out(exc):
+            exc = overrun(self.time_budget_label(self.request)[0])
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        reset_budget(getattr(self, '_time_budget_token', None))
+        self._time_budget_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class TimeBudgetMiddleware:
+    """
+    Middleware graphene: resolver z wpisem w TABLICA['GRAPHQL_TIME_BUDGETS']
+    (klucz "Typ.pole", np. "Query.allComments") dostaje własny, krótszy
+    budżet; cała operacja ma budżet domyślny (TablicaGraphQLView).
+    Przerwane zapytanie zwraca błąd z extensions.code = QUERY_TIMEOUT.
+    """
+
+    def resolve(self, next, root, info, **args):
+        budgets = get_setting('GRAPHQL_TIME_BUDGETS')
+        token = start_budget(budgets.get(f'{info.parent_type.name}.{info.field_name}')) if budgets else None
+        try:
+            return next(root, info, **args)
+        except DatabaseError as exc:
+            if not timed_out(exc):
+                raise
+            timeout = overrun(f'{info.parent_type.name}.{info.field_name}')
+            raise GraphQLError(
+                timeout.detail['detail'], extensions={'code': 'QUERY_TIMEOUT', 'budget': timeout.budget}
+            ) from exc
+        finally:
+            reset_budget(token)
@@ -1,15 +1,17 @@
 from django.urls import path, include
 from django.views.decorators.csrf import csrf_exempt
-from graphene_django.views import GraphQLView
-from graphene_file_upload.django import FileUploadGraphQLView
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
+from .conf import get_setting
+from .graphql_view import AsyncTablicaGraphQLView, TablicaGraphQLView
 from .views import (
     ProjectViewSet, TaskViewSet, CommentViewSet, AttachmentViewSet,
-    RegisterView, TaskCommentListView
+    RegisterView, TaskCommentListView, MetricsView, SearchView
 )
 
+graphql_view = AsyncTablicaGraphQLView if get_setting('GRAPHQL_ASYNC') else TablicaGraphQLView
+
 router = DefaultRouter()
 router.register(r'projects', ProjectViewSet)
 router.register(r'tasks', TaskViewSet)
@@ -18,10 +20,11 @@ router.register(r'attachments', AttachmentViewSet)
 
 urlpatterns = [
     path('api/register/', RegisterView.as_view(), name='register'),
+    path('api/metrics/', MetricsView.as_view(), name='metrics'),
+    path('api/search/', SearchView.as_view(), name='search'),
     path('api/', include(router.urls)),
     path('api/tasks/<int:task_id>/comments/', TaskCommentListView.as_view(), name='task-comments'),
-    path("graphql/", csrf_exempt(GraphQLView.as_view(graphiql=True))),
-    path("graphql/", FileUploadGraphQLView.as_view(graphiql=True)),
+    path("graphql/", csrf_exempt(graphql_view.as_view(graphiql=True))),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 
@@ -1,10 +1,26 @@
-from django.db.models import Count, Avg
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from rest_framework import viewsets, permissions, status
 from rest_framework.generics import ListAPIView
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from . import bulk
+from .budgets import QueryBudgetMixin
+from .conditional import ConditionalGetMixin
+from .export import EXPORT_FORMATS
+from .fastpath import FastTaskSerializer
+from .importer import BoardImporter, ImportFormatError, iter_file_records
+from .fieldsets import FieldSelection
 from .models import Project, Task, Comment, Attachment
+from .pagination import CreatedAtPagination, ProjectPagination
+from .queries import project_queryset, task_queryset, comment_queryset
+from .search import parse_filters, search
+from .sharding import ShardRoutingMixin, choose_shard, bind_shard, gather
+from .stats import average_tasks_per_project, project_stats, status_summary
+from .timeouts import TimeBudgetMixin
+from . import metrics
+from .writer import SerializedWritesMixin, run_write
 from .serializers import ProjectSerializer, TaskSerializer, CommentSerializer, AttachmentSerializer, RegisterSerializer
 
 
@@ -14,70 +30,167 @@ class RegisterView(APIView):
     def post(self, request):
         serializer = RegisterSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            run_write(serializer.save)
             return Response({"message": "User created successfully"}, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class ProjectViewSet(viewsets.ModelViewSet):
+class MetricsView(APIView):
+    """Liczniki procesu (np. przekroczenia budżetów czasu SQL) - do strojenia ustawień."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(metrics.snapshot())
+
+class SearchView(TimeBudgetMixin, APIView):
+    """
+    Wyszukiwanie pełnotekstowe w zadaniach i komentarzach, od najtrafniejszych.
+    Przykład: /api/search/?q=raport&project=1&status=TODO&type=task&limit=20
+    """
+
+    def get(self, request):
+        try:
+            filters = parse_filters(request.query_params)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'results': search(request.query_params.get('q', ''), **filters)})
+
+class ProjectViewSet(ShardRoutingMixin, TimeBudgetMixin, SerializedWritesMixin, QueryBudgetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Project.objects.all()
     serializer_class = ProjectSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ProjectPagination
+    query_budgets = {
+        'list': 8,
+        'retrieve': 8,
+        'active_projects': 8,
+        'inactive_projects': 8,
+    }
+
+    def get_queryset(self):
+        return project_queryset(FieldSelection.from_request(self.request))
+
+    def get_shard(self, request):
+        if self.action in ('create', 'import_board'):
+            return choose_shard()
+        return super().get_shard(request)
 
     def perform_create(self, serializer):
-        serializer.save(owner=self.request.user)
+        run_write(serializer.save, owner=self.request.user)
 
     @action(detail=False, methods=['get'], url_path='with-task-count')
     def with_task_count(self, request):
-        projects = Project.objects.annotate(task_count=Count('tasks'))
-        data = [
-            {
-                'id': p.id,
-                'name': p.name,
-                'task_count': p.task_count
-            }
-            for p in projects
-        ]
-        return Response(data)
+        return Response(gather(Project.objects.values('id', 'name', 'task_count')))
 
     @action(detail=False, methods=['get'], url_path='with-comment-count')
     def with_comment_count(self, request):
-        projects = Project.objects.annotate(comment_count=Count('tasks__comments'))
-        data = [
-            {
-                'id': p.id,
-                'name': p.name,
-                'comment_count': p.comment_count
-            }
-            for p in projects
-        ]
-        return Response(data)
+        return Response(gather(Project.objects.values('id', 'name', 'comment_count')))
+
+    @action(detail=False, methods=['get'], url_path='stats')
+    def stats(self, request):
+        """
+        Dla każdego projektu: liczba zadań w każdym statusie, liczba komentarzy
+        i załączników. Opcjonalnie ?active=true|false
+        """
+        projects = Project.objects.all()
+        active = request.query_params.get('active')
+        if active in ('true', 'false'):
+            projects = projects.filter(is_active=active == 'true')
+        return Response(project_stats(projects))
+
+    @action(detail=True, methods=['get'], url_path='export')
+    def export(self, request, pk=None):
+        """
+        Strumieniowy eksport tablicy (projekt, zadania, komentarze, załączniki).
+        Format: ?output=ndjson (domyślnie) albo ?output=csv
+        """
+        project = get_object_or_404(Project.objects.only('id'), pk=pk)
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            return Response(
+                {'output': f'Nieobsługiwany format, dostępne: {", ".join(EXPORT_FORMATS)}'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        generate, content_type = EXPORT_FORMATS[output]
+        response = StreamingHttpResponse(bind_shard(generate(project.pk)), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="project-{project.pk}.{output}"'
+        return response
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_board(self, request):
+        """
+        Import tablic z pliku (pole `file`): NDJSON z eksportu, tablica JSON
+        takich rekordów albo eksport JSON z Trello. Format: ?input=auto|ndjson|json|trello
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'file': 'Brak pliku.'}, status=status.HTTP_400_BAD_REQUEST)
+        import_format = request.query_params.get('input', 'auto')
+        try:
+            records = iter_file_records(upload, import_format, upload.name)
+            result = BoardImporter(owner=request.user).run(records)
+        except ImportFormatError as e:
+            return Response({'file': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_201_CREATED)
 
     @action(detail=False, methods=['get'], url_path='active')
     def active_projects(self, request):
-        projects = Project.objects.filter(is_active=True)
+        projects = gather(self.get_queryset().filter(is_active=True), Project._meta.ordering)
         serializer = self.get_serializer(projects, many=True)
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'], url_path='unactive')
     def inactive_projects(self, request):
-        projects = Project.objects.filter(is_active=False)
+        projects = gather(self.get_queryset().filter(is_active=False), Project._meta.ordering)
         serializer = self.get_serializer(projects, many=True)
         return Response(serializer.data)
 
-class TaskCommentListView(ListAPIView):
+class TaskCommentListView(ShardRoutingMixin, TimeBudgetMixin, ConditionalGetMixin, ListAPIView):
+    queryset = Comment.objects.all()
     serializer_class = CommentSerializer
+    pagination_class = CreatedAtPagination
+    shard_model = Task
+    shard_url_kwarg = 'task_id'
+
+    def get_state_queryset(self):
+        return Comment.objects.filter(task_id=self.kwargs['task_id'])
 
     def get_queryset(self):
         task_id = self.kwargs['task_id']
-        return Comment.objects.filter(task_id=task_id)
+        return comment_queryset(FieldSelection.from_request(self.request)).filter(task_id=task_id)
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(ShardRoutingMixin, TimeBudgetMixin, SerializedWritesMixin, QueryBudgetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Task.objects.all()
     serializer_class = TaskSerializer
+    pagination_class = CreatedAtPagination
+    shard_data_fields = {'project': Project}
+    query_budgets = {
+        'list': 5,
+        'retrieve': 5,
+        'recent_tasks': 5,
+        'filter_by_status': 5,
+        'filter_by_user': 5,
+    }
+
+    def get_queryset(self):
+        return task_queryset(FieldSelection.from_request(self.request))
+
+    def list(self, request, *args, **kwargs):
+        return self.fast_list(Task.objects.all())
+
+    def fast_list(self, queryset):
+        """
+        Listy zadań serializowane z wierszy .values() zamiast TaskSerializer
+        (ten sam kształt odpowiedzi, bez tworzenia instancji modeli).
+        """
+        def render():
+            serializer = FastTaskSerializer(context=self.get_serializer_context())
+            page = self.paginate_queryset(serializer.values(queryset))
+            return self.get_paginated_response(serializer.serialize(page))
+        return self.conditional_get(self.request, self.list_state(queryset), render)
 
     @action(detail=False, methods=['get'], url_path='recent')
     def recent_tasks(self, request):
-        recent_tasks = Task.objects.order_by('-created_at')[:5]
+        recent_tasks = gather(self.get_queryset().order_by('-created_at')[:5], ['-created_at'], 5)
         serializer = self.get_serializer(recent_tasks, many=True)
         return Response(serializer.data)
 
@@ -89,12 +202,10 @@ class TaskViewSet(viewsets.ModelViewSet):
         Przykład: /api/tasks/by-status/?status=TODO
         """
         status = request.query_params.get('status')
+        tasks = Task.objects.all()
         if status:
-            tasks = Task.objects.filter(status=status)
-        else:
-            tasks = Task.objects.all()
-        serializer = self.get_serializer(tasks, many=True)
-        return Response(serializer.data)
+            tasks = tasks.filter(status=status)
+        return self.fast_list(tasks)
 
     @action(detail=False, methods=['get'], url_path='by-user')
     def filter_by_user(self, request):
@@ -105,38 +216,71 @@ class TaskViewSet(viewsets.ModelViewSet):
         """
         user_id = request.query_params.get('user_id')
         if user_id:
-            tasks = Task.objects.filter(assigned_to__id=user_id)
+            tasks = gather(self.get_queryset().filter(assigned_to__id=user_id))
         else:
             tasks = Task.objects.none()
         serializer = self.get_serializer(tasks, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['post', 'patch', 'delete'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Zbiorcze operacje na zadaniach, wynik dla każdego elementu:
+        POST - lista nowych zadań, PATCH - lista zmian z `id`, DELETE - lista id.
+        Kod odpowiedzi 207, gdy część elementów się nie udała.
+        """
+        context = self.get_serializer_context()
+        if request.method == 'POST':
+            results = bulk.create_tasks(request.data, context)
+            return Response({'results': results}, status=bulk.response_status(results, status.HTTP_201_CREATED))
+        if request.method == 'PATCH':
+            results = bulk.update_tasks(request.data, context)
+        else:
+            results = bulk.delete_tasks(request.data)
+        return Response({'results': results}, status=bulk.response_status(results))
+
+    @action(detail=False, methods=['post'], url_path='bulk-update')
+    def bulk_update(self, request):
+        """
+        Zmiana wszystkich zadań pasujących do filtra jednym UPDATE.
+        Przykład: {"filter": {"project": 1, "assigned_to": 3, "status": "INPR"}, "set": {"status": "DONE"}}
+        Warunki filtra: id, project, status, assigned_to, unassigned, due_before/due_after,
+        created_before/created_after. Pola `set`: status, assigned_to, due_date.
+        """
+        data = request.data if hasattr(request.data, 'get') else {}
+        updated = bulk.update_matching(data.get('filter'), data.get('set'))
+        return Response({'updated': updated})
+
     @action(detail=False, methods=['get'], url_path='status-summary')
     def status_summary(self, request):
-        summary = Task.objects.values('status').annotate(count=Count('id'))
-        return Response(summary)
+        return Response(status_summary())
 
     @action(detail=False, methods=['get'], url_path='average-per-project')
     def average_tasks_per_project(self, request):
-        summary = Project.objects.annotate(task_count=Count('tasks')).aggregate(avg=Avg('task_count'))
-        return Response(summary)
+        return Response({'avg': average_tasks_per_project()})
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ShardRoutingMixin, TimeBudgetMixin, SerializedWritesMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtPagination
+    shard_data_fields = {'task': Task}
+
+    def get_queryset(self):
+        return comment_queryset(FieldSelection.from_request(self.request))
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        run_write(serializer.save, author=self.request.user)
 
     @action(detail=False, methods=['get'], url_path='recent')
     def recent_comments(self, request):
-        recent_comments = Comment.objects.order_by('-created_at')[:5]
+        recent_comments = gather(self.get_queryset().order_by('-created_at')[:5], ['-created_at'], 5)
         serializer = self.get_serializer(recent_comments, many=True)
         return Response(serializer.data)
 
-class AttachmentViewSet(viewsets.ModelViewSet):
-    queryset = Attachment.objects.all()
+class AttachmentViewSet(ShardRoutingMixin, TimeBudgetMixin, SerializedWritesMixin, viewsets.ModelViewSet):
+    queryset = Attachment.objects.defer('content_text')
     serializer_class = AttachmentSerializer
+    shard_data_fields = {'task': Task}
     # permission_classes = [permissions.IsAuthenticated]
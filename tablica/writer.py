@@ -0,0 +1,144 @@
+import queue
+import threading
+from concurrent.futures import Future
+from contextvars import copy_context
+from functools import wraps
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from .conf import get_setting
+from .sharding import current_shard
+
+STOP = object()
+
+
+class WriteQueue:
+    """
+    Jeden wątek z własnym połączeniem, który wykonuje wszystkie zapisy.
+    Zadania czekające w kolejce są zatwierdzane razem (group commit): jedna
+    transakcja na paczkę, każde zadanie we własnym savepoincie, więc błąd
+    jednego nie wycofuje pozostałych. Wynik (albo wyjątek) wraca do
+    wywołującego dopiero po COMMIT.
+    """
+
+    def __init__(self, using=DEFAULT_DB_ALIAS, max_size=1000, batch_size=100):
+        self.using = using
+        self.batch_size = batch_size
+        self.queue = queue.Queue(max_size)
+        self.thread = threading.Thread(target=self.run, name='tablica-writer-%s' % using, daemon=True)
+        self.batches = 0
+        self.jobs = 0
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.queue.put(STOP)
+        self.thread.join()
+
+    def submit(self, func, *args, **kwargs):
+        future = Future()
+        # pełna kolejka blokuje wywołującego (backpressure)
+        self.queue.put((func, args, kwargs, future))
+        return future
+
+    def call(self, func, *args, **kwargs):
+        return self.submit(func, *args, **kwargs).result()
+
+    def run(self):
+        try:
+            while True:
+                batch = [self.queue.get()]
+                while len(batch) < self.batch_size and batch[-1] is not STOP:
+                    try:
+                        batch.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+                jobs = [job for job in batch if job is not STOP]
+                if jobs:
+                    self.commit(jobs)
+                if len(jobs) < len(batch):
+                    break
+        finally:
+            connections[self.using].close()
+
+    def commit(self, jobs):
+        connection = connections[self.using]
+        # połączenie wątku piszącego żyje cały czas (CONN_MAX_AGE go nie dotyczy),
+        # zamykamy je tylko po błędzie
+        if connection.errors_occurred:
+            if not connection.is_usable():
+                connection.close()
+            connection.errors_occurred = False
+        outcomes = []
+        try:
+            with transaction.atomic(using=self.using):
+                for func, args, kwargs, future in jobs:
+                    try:
+                        with transaction.atomic(using=self.using):
+                            outcomes.append((future, func(*args, **kwargs), None))
+                    except Exception as exc:
+                        outcomes.append((future, None, exc))
+        except Exception as exc:
+            # nieudany COMMIT całej paczki
+            for _, _, _, future in jobs:
+                future.set_exception(exc)
+            return
+        self.batches += 1
+        self.jobs += len(jobs)
+        for future, result, exc in outcomes:
+            if exc is None:
+                future.set_result(result)
+            else:
+                future.set_exception(exc)
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(using=DEFAULT_DB_ALIAS):
+    with _writers_lock:
+        if using not in _writers:
+            _writers[using] = WriteQueue(
+                using,
+                max_size=get_setting('WRITE_QUEUE_SIZE'),
+                batch_size=get_setting('WRITE_BATCH_SIZE'),
+            ).start()
+        return _writers[using]
+
+
+def run_write(func, *args, **kwargs):
+    """
+    Wykonuje zapis przez kolejkę, gdy TABLICA['SERIALIZED_WRITES'] jest
+    włączone. Bezpośrednio, gdy tryb jest wyłączony albo gdy jesteśmy
+    w otwartej transakcji - także w samym wątku piszącym. Zapisy takiej
+    transakcji muszą zostać w niej, a czekanie na wątek piszący by ją
+    zakleszczyło. Każdy shard ma własny wątek piszący; zadanie wykonuje
+    się w kontekście wywołującego (bieżący shard).
+    """
+    using = current_shard.get() or DEFAULT_DB_ALIAS
+    if not get_setting('SERIALIZED_WRITES') or connections[using].in_atomic_block:
+        return func(*args, **kwargs)
+    return get_writer(using).call(copy_context().run, func, *args, **kwargs)
+
+
+def serialized(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        return run_write(func, *args, **kwargs)
+    return wrapper
+
+
+class SerializedWritesMixin:
+    """perform_create/update/destroy widoku przez run_write."""
+
+    def perform_create(self, serializer):
+        run_write(super().perform_create, serializer)
+
+    def perform_update(self, serializer):
+        run_write(super().perform_update, serializer)
+
+    def perform_destroy(self, instance):
+        run_write(super().perform_destroy, instance)
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'trelloboard.settings')
+# pod ASGI /graphql/ liczy niezależne pola równolegle (AsyncTablicaGraphQLView)
+os.environ.setdefault('TABLICA_GRAPHQL_ASYNC', '1')
 
 application = get_asgi_application()
@@ -35,6 +35,7 @@ INSTALLED_APPS = [
     'tablica',
     "graphene_django",
     "graphene_file_upload",
+    'django_filters',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -50,6 +51,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'tablica.dbrouters.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -82,7 +84,8 @@ REST_FRAMEWORK = {
 }
 
 GRAPHENE = {
-    "SCHEMA": "tablica.schema.schema"
+    "SCHEMA": "tablica.schema.schema",
+    "MIDDLEWARE": ["tablica.timeouts.TimeBudgetMiddleware"],
 }
 
 
@@ -94,9 +97,49 @@ WSGI_APPLICATION = 'trelloboard.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # SQLite z WAL, BEGIN IMMEDIATE i ponawianiem blokad (trelloboard/sqlite3/base.py)
+        'ENGINE': 'trelloboard.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+        },
+    },
+    # Replika do odczytów - kopia odświeżana przez `manage.py sync_replica`.
+    # Włączenie: odkomentować i dodać 'replica' do TABLICA['READ_REPLICAS'].
+    # 'replica': {
+    #     'ENGINE': 'trelloboard.sqlite3',
+    #     'NAME': BASE_DIR / 'db.replica.sqlite3',
+    #     'TEST': {'MIRROR': 'default'},
+    # },
+    # Drugi shard projektów - używany dopiero po dodaniu do TABLICA['SHARDS']
+    # i `manage.py init_shards`.
+    'shard_1': {
+        'ENGINE': 'trelloboard.sqlite3',
+        'NAME': BASE_DIR / 'db.shard_1.sqlite3',
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+        },
+    },
+}
+
+DATABASE_ROUTERS = ['tablica.sharding.ShardRouter', 'tablica.dbrouters.ReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/ref/settings/#caches
+# Musi być wspólny dla wszystkich procesów serwera: trzyma wersję użytkowników
+# z ETagów (tablica/conditional.py) i znaczniki read-your-writes dla replik
+# (tablica/dbrouters.py). LocMemCache (domyślny) jest osobny w każdym
+# procesie - sprawdza to `manage.py check` (tablica.W001, tablica.W002).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
 }
 
 
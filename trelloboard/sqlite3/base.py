@@ -0,0 +1,113 @@
+"""
+Backend SQLite z profilem "produkcyjnym":
+
+- PRAGMA ustawiane dla każdego nowego połączenia (WAL, synchronous=NORMAL,
+  mmap, cache, temp_store, busy_timeout), nadpisywalne przez
+  OPTIONS['pragmas'],
+- transakcje domyślnie BEGIN IMMEDIATE - blokada zapisu brana od razu,
+  więc nie ma zakleszczeń przy podnoszeniu blokady w środku transakcji,
+- ponawianie "database is locked" z losowym (jitter) wykładniczym
+  opóźnieniem dla zapytań poza transakcją (w tym samego BEGIN), bo tylko
+  te można bezpiecznie powtórzyć w całości.
+"""
+import random
+import time
+from contextlib import contextmanager
+
+from django.db.backends.sqlite3 import base
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+LOCK_RETRIES = 5
+LOCK_BACKOFF = 0.05
+LOCK_MAX_BACKOFF = 1.0
+CUSTOM_OPTIONS = ('pragmas', 'lock_retries', 'lock_backoff', 'lock_max_backoff')
+
+
+def is_locked(error):
+    message = str(error)
+    return 'database is locked' in message or 'database table is locked' in message
+
+
+class RetryPolicy:
+    def __init__(self, retries=LOCK_RETRIES, backoff=LOCK_BACKOFF, max_backoff=LOCK_MAX_BACKOFF):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def delay(self, attempt):
+        # "full jitter": losowo z [0, backoff * 2^attempt]
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def call(self, func, *args):
+        attempt = 0
+        while True:
+            try:
+                return func(*args)
+            except base.Database.OperationalError as exc:
+                if not is_locked(exc) or attempt >= self.retries:
+                    raise
+            time.sleep(self.delay(attempt))
+            attempt += 1
+
+
+class SQLiteCursorWrapper(base.SQLiteCursorWrapper):
+    retry_policy = None
+
+    def execute(self, query, params=None):
+        if self.retry_policy is None or self.connection.in_transaction:
+            return super().execute(query, params)
+        return self.retry_policy.call(super().execute, query, params)
+
+    def executemany(self, query, param_list):
+        if self.retry_policy is None or self.connection.in_transaction:
+            return super().executemany(query, param_list)
+        return self.retry_policy.call(super().executemany, query, list(param_list))
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        options = {name: kwargs.pop(name) for name in CUSTOM_OPTIONS if name in kwargs}
+        if 'transaction_mode' not in self.settings_dict['OPTIONS']:
+            self.transaction_mode = 'IMMEDIATE'
+        self.pragmas = {**DEFAULT_PRAGMAS, **options.get('pragmas', {})}
+        self.retry_policy = RetryPolicy(
+            retries=options.get('lock_retries', LOCK_RETRIES),
+            backoff=options.get('lock_backoff', LOCK_BACKOFF),
+            max_backoff=options.get('lock_max_backoff', LOCK_MAX_BACKOFF),
+        )
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            if name == 'journal_mode' and self.is_in_memory_db():
+                continue
+            conn.execute('PRAGMA %s = %s' % (name, value))
+        return conn
+
+    def create_cursor(self, name=None):
+        cursor = self.connection.cursor(factory=SQLiteCursorWrapper)
+        cursor.retry_policy = self.retry_policy
+        return cursor
+
+    @contextmanager
+    def deferred_transactions(self):
+        """
+        Bloki atomic() otwarte wewnątrz zaczynają się od BEGIN DEFERRED -
+        dla długich transakcji tylko do odczytu (np. eksport), które
+        w WAL nie powinny blokować zapisujących.
+        """
+        mode, self.transaction_mode = self.transaction_mode, None
+        try:
+            yield
+        finally:
+            self.transaction_mode = mode